@@ -3,6 +3,8 @@
 
 包含用户绑定、解绑、扫码登录等认证相关命令
 """
+import os
+
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.message_components import Plain, Image
 from astrbot.api import logger  # [修复 C-1] 添加 logger 导入
@@ -68,6 +70,9 @@ class AuthCommands:
             )
             return
 
+        # 扫码流程可能持续数分钟，提前绑定用户标识，成功后直接复用
+        platform, user_id = self.plugin._get_user_id(event)
+
         yield event.plain_result("⏳ 正在获取二维码，请稍候...")
 
         try:
@@ -94,9 +99,14 @@ class AuthCommands:
                 return
 
             # 发送二维码图片和登录提示
+            # generate_qr_code 通过 os.replace 原子落盘，这里只需 stat 一次
             qr_path = self.plugin.output_dir / "taptap_qr.png"
+            try:
+                qr_ready = os.stat(qr_path).st_size > 0
+            except OSError:
+                qr_ready = False
 
-            if qr_path.exists():
+            if qr_ready:
                 try:
                     # 方法1: 使用 fromFileSystem
                     from astrbot.api.message_components import Image
@@ -150,7 +160,6 @@ class AuthCommands:
                     return
 
                 # 自动绑定
-                platform, user_id = self.plugin._get_user_id(event)
                 await self.plugin.user_data.bind_user(platform, user_id, session_token, taptap_version)
 
                 # 验证 token 并获取 RKS
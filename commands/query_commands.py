@@ -3,11 +3,23 @@
 
 包含存档查询、Best30、RKS历史等查询相关命令
 """
+import re
+
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.message_components import Plain, Image
 
 from ..core.exceptions import PhigrosAPIError, NetworkError
 
+# 新曲速递 Markdown 精简：一次扫描完成标题前缀替换与加粗/斜体符号去除
+# 标题前缀只在行首替换（行中的 "# " 保持原样），"## " 先于 "# " 匹配，二级标题不会被误转成 "#• "
+_MD_STRIP_RE = re.compile(r'^## |^# |\*+')
+_MD_STRIP_MAP = {"## ": "  ", "# ": "• "}
+
+
+def _strip_markdown(line: str) -> str:
+    """将单行 Markdown 转为纯文本（标题转为项目符号，去除 * 号）"""
+    return _MD_STRIP_RE.sub(lambda m: _MD_STRIP_MAP.get(m.group(), ""), line)
+
 
 class QueryCommands:
     """
@@ -57,7 +69,7 @@ class QueryCommands:
                 event, 
                 self.plugin.renderer.render_save_data if self.plugin.renderer else None,
                 data, 
-                f"save_{session_token[:8]}.png"
+                self.plugin._output_filename(f"save_{session_token[:8]}")
             ):
                 yield result
 
@@ -103,7 +115,7 @@ class QueryCommands:
 
             # 首先尝试使用 /save API 获取数据，然后本地渲染
             render_success = False
-            output_path = self.plugin.output_dir / f"b30_{session_token[:8]}.png"
+            output_path = self.plugin.output_dir / self.plugin._output_filename(f"b30_{session_token[:8]}")
 
             if hasattr(self.plugin, 'renderer') and self.plugin.renderer:
                 try:
@@ -132,6 +144,8 @@ class QueryCommands:
             convert_success = False
             if not render_success:
                 self.plugin.logger.info("🔄 使用 SVG 转换作为回退方案")
+                # SVG 转换器只输出 PNG
+                output_path = output_path.with_suffix(".png")
                 # 调用 API 获取 SVG
                 svg_data = await self.plugin.api_client.get_bestn_image(
                     session_token=session_token,
@@ -288,7 +302,7 @@ class QueryCommands:
                 event,
                 self.plugin.renderer.render_leaderboard if self.plugin.renderer else None,
                 data,
-                "leaderboard.png"
+                self.plugin._output_filename("leaderboard")
             ):
                 yield result
 
@@ -559,8 +573,7 @@ class QueryCommands:
             for line in lines[:20]:
                 line = line.strip()
                 if line and not line.startswith("---"):
-                    line = line.replace("# ", "• ").replace("## ", "  ")
-                    line = line.replace("**", "").replace("*", "")
+                    line = _strip_markdown(line)
                     if line:
                         msg_parts.append(f"{line}\n")
             msg_parts.append("\n")
@@ -155,7 +155,7 @@ CACHE_CLEAN_INTERVAL = 600  # 10 分钟
 
 # 图片配置
 DEFAULT_IMAGE_QUALITY = 95
-DEFAULT_IMAGE_FORMAT = "PNG"
+DEFAULT_IMAGE_FORMAT = "webp"  # webp / jpeg / png
 PNG_COMPRESS_LEVEL = 1  # 1-9, 1 为最快
 
 # 路径配置
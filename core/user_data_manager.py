@@ -7,14 +7,29 @@
 import json
 import shutil
 import os
+import sys
 import time
-from datetime import datetime
-from typing import Dict, Optional, Any
+from dataclasses import dataclass, asdict, field, fields
+from typing import Dict, Optional, Any, Tuple
 from pathlib import Path
 
 from astrbot.api import logger
 
 
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    """单个绑定用户的记录（session_token 为混淆后的值）"""
+    session_token: str
+    taptap_version: str = "cn"
+    bind_time: str = ""
+    # 磁盘记录中本类不认识的其他字段，写回时原样保留
+    extra: Dict[str, Any] = field(default_factory=dict, compare=False)
+
+
+# UserRecord 在磁盘上对应的字段名
+_RECORD_FIELDS = frozenset(f.name for f in fields(UserRecord)) - {"extra"}
+
+
 class UserDataManager:
     """
     👤 用户数据管理器
@@ -28,7 +43,8 @@ class UserDataManager:
         self.data_dir = data_dir
         self.data_file = data_dir / "user_data.json"
         self.backup_dir = data_dir / "backups"
-        self._data: Dict[str, Dict[str, str]] = {}
+        # 内存中以 (platform, user_id) 元组为键，磁盘上仍保存为 "platform:user_id"
+        self._data: Dict[Tuple[str, str], UserRecord] = {}
         self._lock = None  # 异步锁，在 initialize 中初始化
         self._load_data()
         # 初始化备份目录
@@ -44,7 +60,7 @@ class UserDataManager:
         if self.data_file.exists():
             try:
                 with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self._data = json.load(f)
+                    self._data = self._from_disk(json.load(f))
                 logger.info(f"已加载 {len(self._data)} 个用户的数据")
             except Exception as e:
                 logger.error(f"加载用户数据失败: {e}")
@@ -60,6 +76,40 @@ class UserDataManager:
             else:
                 self._data = {}
 
+    @staticmethod
+    def _make_key(platform: str, user_id: str) -> Tuple[str, str]:
+        """构造内存键，平台名驻留后比较只需比对指针"""
+        return sys.intern(platform), user_id
+
+    @classmethod
+    def _from_disk(cls, raw: Dict[str, Dict[str, str]]) -> Dict[Tuple[str, str], UserRecord]:
+        """将磁盘格式 {"platform:user_id": {...}} 转换为元组键和 UserRecord
+
+        缺少 session_token 等损坏的条目只记录日志并跳过，不影响其他用户的绑定。
+        """
+        data = {}
+        for key, value in raw.items():
+            if not isinstance(value, dict) or not isinstance(value.get("session_token"), str):
+                logger.warning(f"⚠️ 跳过无效的用户数据条目: {key}")
+                continue
+            platform, _, user_id = key.partition(":")
+            data[cls._make_key(platform, user_id)] = UserRecord(
+                session_token=value["session_token"],
+                taptap_version=value.get("taptap_version", "cn"),
+                bind_time=value.get("bind_time", ""),
+                extra={k: v for k, v in value.items() if k not in _RECORD_FIELDS}
+            )
+        return data
+
+    def _to_disk(self) -> Dict[str, Dict[str, Any]]:
+        """将元组键转换回磁盘格式，保持文件格式不变（未知字段原样写回）"""
+        result = {}
+        for (platform, user_id), record in self._data.items():
+            entry = asdict(record)
+            entry.update(entry.pop("extra"))
+            result[f"{platform}:{user_id}"] = entry
+        return result
+
     def _create_backup(self):
         """创建用户数据备份"""
         try:
@@ -70,7 +120,7 @@ class UserDataManager:
             self.backup_dir.mkdir(parents=True, exist_ok=True)
             
             # 生成备份文件名，包含时间戳
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
             backup_file = self.backup_dir / f"user_data_{timestamp}.json"
             
             # 复制数据到备份文件
@@ -133,7 +183,7 @@ class UserDataManager:
                 json.dump(backup_data, f, ensure_ascii=False, indent=2)
             
             # 重新加载数据
-            self._data = backup_data
+            self._data = self._from_disk(backup_data)
             logger.info(f"✅ 从备份恢复成功，加载了 {len(self._data)} 个用户的数据")
             return True
         except Exception as e:
@@ -151,7 +201,7 @@ class UserDataManager:
                 old_umask = os.umask(0o077)
             try:
                 with open(self.data_file, 'w', encoding='utf-8') as f:
-                    json.dump(self._data, f, ensure_ascii=False, indent=2)
+                    json.dump(self._to_disk(), f, ensure_ascii=False, indent=2)
                 # 设置文件权限
                 if os.name != 'nt':
                     os.chmod(self.data_file, stat.S_IRUSR | stat.S_IWUSR)
@@ -193,12 +243,12 @@ class UserDataManager:
             bool: 是否绑定成功
         """
         async with self._lock:
-            key = f"{platform}:{user_id}"
-            self._data[key] = {
-                "session_token": self._encrypt_token(session_token),
-                "taptap_version": taptap_version,
-                "bind_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            key = self._make_key(platform, user_id)
+            self._data[key] = UserRecord(
+                session_token=self._encrypt_token(session_token),
+                taptap_version=taptap_version,
+                bind_time=time.strftime("%Y-%m-%d %H:%M:%S")
+            )
             self._save_data()
         return True
 
@@ -214,7 +264,7 @@ class UserDataManager:
             bool: 是否解绑成功
         """
         async with self._lock:
-            key = f"{platform}:{user_id}"
+            key = self._make_key(platform, user_id)
             if key in self._data:
                 del self._data[key]
                 self._save_data()
@@ -232,18 +282,17 @@ class UserDataManager:
         Returns:
             Dict 或 None: 包含 session_token 和 taptap_version 的字典
         """
-        key = f"{platform}:{user_id}"
-        data = self._data.get(key)
-        if data:
+        key = self._make_key(platform, user_id)
+        record = self._data.get(key)
+        if record:
             # 解密 token
             return {
-                "session_token": self._decrypt_token(data["session_token"]),
-                "taptap_version": data.get("taptap_version", "cn"),
-                "bind_time": data.get("bind_time", "")
+                "session_token": self._decrypt_token(record.session_token),
+                "taptap_version": record.taptap_version,
+                "bind_time": record.bind_time
             }
         return None
 
     def is_user_bound(self, platform: str, user_id: str) -> bool:
         """检查用户是否已绑定"""
-        key = f"{platform}:{user_id}"
-        return key in self._data
+        return self._make_key(platform, user_id) in self._data
@@ -24,6 +24,11 @@ except ImportError:
 
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 
+try:
+    from .utils import save_image, draw_text_with_glow
+except ImportError:
+    from utils import save_image, draw_text_with_glow
+
 
 class PhigrosDesignSystem:
     """
@@ -122,6 +127,8 @@ class PhigrosDesignSystem:
         self._illustration_cache: Dict[str, Image.Image] = {}
         self._avatar_cache: Dict[str, Image.Image] = {}
         self._rating_cache: Dict[str, Image.Image] = {}
+        # 缩放后的评级图片，键为 (评级, 目标高度)
+        self._rating_resize_cache: Dict[Tuple[str, int], Image.Image] = {}
         self._bg_cache: Optional[Image.Image] = None
         
         # 线程池
@@ -189,6 +196,7 @@ class PhigrosDesignSystem:
         self._font_cache.clear()
         self._avatar_cache.clear()
         self._rating_cache.clear()
+        self._rating_resize_cache.clear()
         self._bg_cache = None
         self._processed_illust_cache.clear()
         self._executor.shutdown(wait=False)
@@ -492,6 +500,21 @@ class PhigrosDesignSystem:
 
         return None
     
+    def _get_rating_image_scaled(self, rating: str, target_height: int) -> Optional[Image.Image]:
+        """获取缩放到指定高度的评级图片（按评级和高度缓存，调用方不得原地修改）"""
+        key = (rating, target_height)
+        scaled = self._rating_resize_cache.get(key)
+        if scaled is not None:
+            return scaled
+        
+        rating_img = self._get_rating_image(rating)
+        if rating_img is None:
+            return None
+        target_width = int(target_height * rating_img.width / rating_img.height)
+        scaled = rating_img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+        self._rating_resize_cache[key] = scaled
+        return scaled
+    
     def _get_rating_image(self, rating: str) -> Optional[Image.Image]:
         """获取评级图片"""
         if rating in self._rating_cache:
@@ -607,59 +630,6 @@ class PhigrosDesignSystem:
         draw.rounded_rectangle([0, 0, size[0], size[1]], radius=radius, fill=color)
         return img
     
-    def _draw_text_with_glow(self, img: Image.Image, x: int, y: int, text: str, 
-                              text_color: str, font: ImageFont.FreeTypeFont, 
-                              glow_color: Tuple[int, int, int] = (255, 255, 255),
-                              glow_radius: int = 4, anchor: str = None):
-        """绘制带发光效果的文字"""
-        draw = ImageDraw.Draw(img)
-        
-        # 计算文本边界框
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        # 确定发光层的大小和位置
-        padding = glow_radius * 2
-        layer_width = text_width + padding * 2
-        layer_height = text_height + padding * 2
-        
-        # 计算发光层的粘贴位置
-        if anchor == 'mm':
-            layer_x = x - layer_width // 2
-            layer_y = y - layer_height // 2
-        else:
-            layer_x = x - padding
-            layer_y = y - padding
-        
-        # 绘制发光效果
-        for offset in range(glow_radius, 0, -1):
-            alpha = int(40 - offset * 8)
-            if alpha <= 0:
-                continue
-            # 创建一个只包含文本区域的图层
-            glow_layer = Image.new('RGBA', (layer_width, layer_height), (0, 0, 0, 0))
-            glow_draw = ImageDraw.Draw(glow_layer)
-            
-            # 调整文本在发光层中的位置
-            text_x = padding
-            text_y = padding
-            
-            for dx, dy in [(-offset, 0), (offset, 0), (0, -offset), (0, offset),
-                          (-offset, -offset), (offset, -offset), (-offset, offset), (offset, offset)]:
-                glow_draw.text((text_x + dx, text_y + dy), text, fill=(*glow_color, alpha), font=font)
-            
-            # 模糊发光层
-            glow_layer = glow_layer.filter(ImageFilter.GaussianBlur(radius=offset))
-            
-            # 粘贴到目标位置
-            img.paste(glow_layer, (int(layer_x), int(layer_y)), glow_layer)
-        
-        if anchor:
-            draw.text((x, y), text, fill=text_color, font=font, anchor=anchor)
-        else:
-            draw.text((x, y), text, fill=text_color, font=font)
-    
     # ========== 可重用组件 ==========
     
     def draw_header(self, img: Image.Image, draw: ImageDraw.Draw, gameuser: Dict):
@@ -849,8 +819,8 @@ class PhigrosDesignSystem:
                 text_x = logo_x + logo_size // 2
                 text_y = logo_y + logo_size + 12
                 # 使用发光效果
-                self._draw_text_with_glow(img, text_x, text_y, logo_text, '#aaaaaa', font_logo_text,
-                                         glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+                draw_text_with_glow(img, text_x, text_y, logo_text, '#aaaaaa', font_logo_text,
+                                    glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
             except Exception as e:
                 logger.warning(f"加载logo失败: {e}")
     
@@ -930,14 +900,14 @@ class PhigrosDesignSystem:
         if len(song_name) > 14:
             song_name = song_name[:12] + '...'
         # 增强发光效果
-        self._draw_text_with_glow(img, info_x + 10, info_y + 6, song_name, 'white', font_song,
-                                  glow_color=(50, 150, 255), glow_radius=2)
+        draw_text_with_glow(img, info_x + 10, info_y + 6, song_name, 'white', font_song,
+                             glow_color=(50, 150, 255), glow_radius=2)
         
         font_score = self._get_font(self.FONT_CONFIG['sizes']['md'], bold=True)
         score = record.get('score', 0)
         # 分数发光效果增强
-        self._draw_text_with_glow(img, info_x + 10, info_y + 28, f"{score:,}", '#ffd700', font_score,
-                                  glow_color=(255, 215, 0), glow_radius=2)
+        draw_text_with_glow(img, info_x + 10, info_y + 28, f"{score:,}", '#ffd700', font_score,
+                             glow_color=(255, 215, 0), glow_radius=2)
         
         # 增强 Acc 和 RKS 文字
         font_acc = self._get_font(self.FONT_CONFIG['sizes']['xs'], bold=False)
@@ -951,11 +921,10 @@ class PhigrosDesignSystem:
         
         # 评级图片
         rating = self._calculate_rating(score, acc, record.get('fc', False))
-        rating_img = self._get_rating_image(rating)
-        if rating_img:
-            rating_height = 40
-            rating_width = int(rating_height * rating_img.width / rating_img.height)
-            rating_resized = rating_img.resize((rating_width, rating_height), Image.Resampling.LANCZOS)
+        rating_height = 40
+        rating_resized = self._get_rating_image_scaled(rating, rating_height)
+        if rating_resized:
+            rating_width = rating_resized.width
             rating_x = info_x + info_width - rating_width - 10
             rating_y = info_y + (info_height - rating_height) // 2
             # 直接粘贴评级图片
@@ -999,9 +968,9 @@ class PhigrosDesignSystem:
         
         # Overflow 文字
         font_title = self._get_font(self.FONT_CONFIG['sizes']['lg'], bold=True)
-        self._draw_text_with_glow(img, center_x, title_y + title_height // 2, 
-                                  "OVER FLOW", '#ffffff', font_title,
-                                  glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+        draw_text_with_glow(img, center_x, title_y + title_height // 2, 
+                             "OVER FLOW", '#ffffff', font_title,
+                             glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
         
         # 绘制 Overflow 记录卡片
         card_start_y = title_y + title_height + 10
@@ -1018,8 +987,8 @@ class PhigrosDesignSystem:
         """绘制底部"""
         text = "phigros插件——飞翔的死猪提供技术支持"
         font = self._get_font(self.FONT_CONFIG['sizes']['sm'], bold=False)
-        self._draw_text_with_glow(img, self.LAYOUT['width'] // 2, y, text, '#aaaaaa', font,
-                                  glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+        draw_text_with_glow(img, self.LAYOUT['width'] // 2, y, text, '#aaaaaa', font,
+                             glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
     
     # ========== 模板系统 ==========
     
@@ -1091,7 +1060,7 @@ class PhigrosDesignSystem:
             
             # 保存图片
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 渲染成功: {output_path}")
             return True
             
@@ -1149,7 +1118,7 @@ class PhigrosDesignSystem:
             
             # 保存图片
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 单曲成绩渲染成功: {output_path}")
             return True
             
@@ -1188,9 +1157,9 @@ class PhigrosDesignSystem:
             
             # 绘制标题
             title_font = self._get_font(self.FONT_CONFIG['sizes']['xl'], bold=True)
-            self._draw_text_with_glow(img, self.LAYOUT['width'] // 2, 60, 
-                                      "🏆 Phigros RKS 排行榜", '#ffffff', title_font,
-                                      glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+            draw_text_with_glow(img, self.LAYOUT['width'] // 2, 60, 
+                                 "🏆 Phigros RKS 排行榜", '#ffffff', title_font,
+                                 glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
             
             # 绘制排行榜项
             y_offset = 120
@@ -1220,12 +1189,12 @@ class PhigrosDesignSystem:
                 
                 # 玩家信息
                 font_alias = self._get_font(self.FONT_CONFIG['sizes']['md'], bold=True)
-                self._draw_text_with_glow(img, 160, y_offset + 8, alias, '#ffffff', font_alias,
-                                          glow_color=(100, 200, 255), glow_radius=2)
+                draw_text_with_glow(img, 160, y_offset + 8, alias, '#ffffff', font_alias,
+                                     glow_color=(100, 200, 255), glow_radius=2)
                 
                 font_rks = self._get_font(self.FONT_CONFIG['sizes']['sm'], bold=True)
-                self._draw_text_with_glow(img, 700, y_offset + 12, f"RKS: {score:.4f}", '#ffd700', font_rks,
-                                          glow_color=(255, 215, 0), glow_radius=2)
+                draw_text_with_glow(img, 700, y_offset + 12, f"RKS: {score:.4f}", '#ffd700', font_rks,
+                                     glow_color=(255, 215, 0), glow_radius=2)
                 
                 y_offset += 70
             
@@ -1235,7 +1204,7 @@ class PhigrosDesignSystem:
             
             # 保存图片
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 排行榜渲染成功: {output_path}")
             return True
             
@@ -1300,7 +1269,7 @@ class PhigrosDesignSystem:
             
             # 保存图片
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ RKS 历史趋势图渲染成功: {output_path}")
             return True
             
@@ -1388,7 +1357,7 @@ class PhigrosDesignSystem:
             
             # 保存图片
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 存档数据渲染成功: {output_path}")
             return True
             
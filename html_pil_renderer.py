@@ -16,6 +16,11 @@ from astrbot.api import logger
 
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 
+try:
+    from .utils import save_image
+except ImportError:
+    from utils import save_image
+
 
 class HtmlPilRenderer:
     """
@@ -169,7 +174,7 @@ class HtmlPilRenderer:
                      fill='#666666', font=font, anchor='mm')
             
             # 保存
-            img.save(output_path, 'PNG', quality=self.image_quality)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 渲染成功: {output_path}")
             return True
             
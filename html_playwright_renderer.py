@@ -15,6 +15,11 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime
 from astrbot.api import logger
 
+try:
+    from .utils import save_image
+except ImportError:
+    from utils import save_image
+
 try:
     from playwright.async_api import async_playwright, Page, Browser
     PLAYWRIGHT_AVAILABLE = True
@@ -354,6 +359,28 @@ class HtmlPlaywrightRenderer:
         
         return html
     
+    async def _screenshot(self, page: "Page", output_path: Path):
+        """按输出文件扩展名截图保存
+
+        Playwright 只能直接输出 PNG / JPEG，.webp 先截 PNG 再用 Pillow 转码。
+        """
+        suffix = Path(output_path).suffix.lower()
+        if suffix in ('.jpg', '.jpeg'):
+            await page.screenshot(path=str(output_path), full_page=True,
+                                  type='jpeg', quality=self.image_quality)
+        elif suffix == '.webp':
+            png_bytes = await page.screenshot(full_page=True, type='png')
+            await asyncio.to_thread(self._png_to_webp, png_bytes, output_path)
+        else:
+            await page.screenshot(path=str(output_path), full_page=True, type='png')
+
+    def _png_to_webp(self, png_bytes: bytes, output_path: Path):
+        """将 PNG 截图转码为 WebP（同步，供 to_thread 调用）"""
+        from io import BytesIO
+        from PIL import Image
+        with Image.open(BytesIO(png_bytes)) as img:
+            save_image(img, output_path, self.image_quality)
+
     async def render_b30(self, data: Dict[str, Any], output_path: Path) -> bool:
         """
         渲染 Best30 成绩图
@@ -385,12 +412,8 @@ class HtmlPlaywrightRenderer:
                 # 获取页面高度
                 height = await page.evaluate('document.body.scrollHeight')
                 
-                # 截图
-                await page.screenshot(
-                    path=str(output_path),
-                    full_page=True,
-                    type='png'
-                )
+                # 截图（按输出文件扩展名选择格式）
+                await self._screenshot(page, output_path)
                 
                 await page.close()
                 
@@ -7,6 +7,7 @@
 import aiohttp
 import asyncio
 import json
+import sys
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from pathlib import Path
@@ -22,7 +23,7 @@ from .config import (
     BASE_URL, DEFAULT_API_TOKEN,
     HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_SOCK_READ_TIMEOUT,
     HTTP_POOL_SIZE, HTTP_POOL_PER_HOST,
-    DEFAULT_ILLUSTRATION_PATH, DEFAULT_TAPTAP_VERSION,
+    DEFAULT_ILLUSTRATION_PATH, DEFAULT_TAPTAP_VERSION, DEFAULT_IMAGE_FORMAT,
     DEFAULT_SEARCH_LIMIT, DEFAULT_HISTORY_LIMIT,
     CACHE_TTL, QR_LOGIN_TIMEOUT
 )
@@ -209,6 +210,12 @@ class PhigrosPlugin(Star):
             95, 
             "image_quality"
         )
+        self.image_format = str(ConfigManager.get_config(
+            self.plugin_config,
+            "IMAGE_FORMAT",
+            DEFAULT_IMAGE_FORMAT,
+            "image_format"
+        )).lower()
         self.default_taptap_version = ConfigManager.get_config(
             self.plugin_config, 
             "TAPTAP_VERSION", 
@@ -516,11 +523,20 @@ class PhigrosPlugin(Star):
             else:
                 yield event.plain_result(f"❌ 图片渲染失败: {str(e)}")
 
+    def _output_filename(self, stem: str) -> str:
+        """根据 image_format / image_quality 生成渲染输出文件名
+
+        渲染器按扩展名选择编码器；质量为 100 时视为要求无损，始终使用 PNG。
+        """
+        if self.image_format == "png" or self.image_quality >= 100:
+            return f"{stem}.png"
+        if self.image_format in ("jpeg", "jpg"):
+            return f"{stem}.jpg"
+        return f"{stem}.webp"
+
     def _get_user_id(self, event: AstrMessageEvent) -> tuple:
-        """获取用户平台标识和ID"""
-        platform = event.get_platform_name()
-        user_id = event.get_sender_id()
-        return platform, user_id
+        """获取用户平台标识和ID（调用方应在处理器内只获取一次并本地复用）"""
+        return sys.intern(event.get_platform_name()), event.get_sender_id()
     
     def _extract_b30_data(self, save_data: Dict) -> Optional[Dict]:
         """
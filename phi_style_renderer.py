@@ -12,8 +12,9 @@
 """
 
 import os
+import re
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
@@ -30,7 +31,22 @@ except ImportError:
     # 如果导入失败，使用标准日志
     logger = logging.getLogger(__name__)
 
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+try:
+    from .utils import save_image, draw_text_with_glow
+except ImportError:
+    from utils import save_image, draw_text_with_glow
+
+# 支持的曲绘扩展名（小写比较，兼容大小写敏感的文件系统）
+_ILLUST_EXTS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp'})
+
+# 曲名规范化：去除空格和特殊字符，只保留字母、数字和中文
+_NORM_RE = re.compile(r'[^\w\u4e00-\u9fff]')
+# 曲绘文件名中的重复序号后缀，如 " (1)"、"_1"
+_ILLUST_SUFFIX_RE = re.compile(r'\s*\(\d+\)$|\s*_\d+$')
+# 带索引的曲绘键，如 "song_3"
+_INDEXED_KEY_RE = re.compile(r'^(.+?)_\d+$')
 
 
 class PhiStyleRenderer:
@@ -50,8 +66,27 @@ class PhiStyleRenderer:
         'card_bg': 'rgba(0, 0, 0, 0.6)',
         'text_white': '#ffffff',
         'text_gray': '#aaaaaa',
+        'gold': '#ffd700',    # 第 1 名 / AP
+        'silver': '#c0c0c0',  # 第 2 名
+        'bronze': '#cd7f32',  # 第 3 名
+        'fc': '#00b0f0',
+    }
+
+    # 十六进制颜色预先转换好的 (R, G, B)，绘制时直接查表
+    COLORS_RGB = {
+        k: tuple(int(v.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4))
+        for k, v in COLORS.items() if v.startswith('#')
     }
+
+    # 排名徽章颜色（前三名为奖牌色，其余为白色）
+    RANK_BADGE_RGB = {1: COLORS_RGB['gold'], 2: COLORS_RGB['silver'], 3: COLORS_RGB['bronze']}
+
+    # 排行榜排名标签颜色（RGBA，前三名为奖牌色）
+    RANK_ROW_RGBA = {1: (255, 215, 0, 200), 2: (192, 192, 192, 200), 3: (205, 127, 50, 200)}
     
+    # 背景亮度查找表（RGB 三通道均乘以 0.4）
+    _BG_BRIGHTNESS_LUT = [int(i * 0.4) for i in range(256)] * 3
+
     # 布局常量（优化紧凑布局）
     WIDTH = 1200
     HEADER_HEIGHT = 180  # 减小头部高度
@@ -59,6 +94,8 @@ class PhiStyleRenderer:
     CARD_HEIGHT = 90   # 减小卡片高度
     CARD_MARGIN = 8    # 减小卡片间距
     OVERFLOW_HEADER_HEIGHT = 120  # 减小overflow头部高度
+    AVATAR_SIZE = 100  # 头部圆形头像直径
+    BG_CACHE_SIZE = 4  # 放大后背景的缓存上限（张），每张约 1200×高×4 字节
     
     def __init__(self,
                  plugin_dir: Path,
@@ -76,8 +113,8 @@ class PhiStyleRenderer:
         # 字体缓存
         self._font_cache: Dict[str, ImageFont.FreeTypeFont] = {}
 
-        # 曲绘缓存
-        self._illustration_cache: Dict[str, Image.Image] = {}
+        # 曲绘文件缓存：只记录 song_key 选中的文件路径，不常驻原尺寸图像
+        self._illustration_path_cache: Dict[str, Path] = {}
 
         # 头像缓存
         self._avatar_cache: Dict[str, Image.Image] = {}
@@ -85,14 +122,37 @@ class PhiStyleRenderer:
         # 评级图片缓存
         self._rating_cache: Dict[str, Image.Image] = {}
 
+        # 缩放后的评级图片缓存，键为 (评级, 目标高度)
+        self._rating_resize_cache: Dict[Tuple[str, int], Image.Image] = {}
+
         # 评级图片路径
         self.rating_path = plugin_dir / "resources" / "img" / "rating"
 
-        # 背景图片缓存
-        self._bg_cache: Optional[Image.Image] = None
+        # 背景图片缓存：模糊压暗后的小图只生成一次，按 (宽, 高) 缓存放大结果（LRU）
+        self._bg_small: Optional[Image.Image] = None
+        self._bg_cache: "OrderedDict[Tuple[int, int], Image.Image]" = OrderedDict()
+
+        # 半透明圆角矩形的形状蒙版缓存，键为 (宽, 高, 圆角半径)
+        self._rrect_cache: Dict[Tuple[int, int, int], Image.Image] = {}
 
-        # 线程池（用于并行加载图片）
-        self._executor = ThreadPoolExecutor(max_workers=4)
+        # 头像圆形遮罩（所有渲染共用）
+        self._avatar_mask = Image.new('L', (self.AVATAR_SIZE, self.AVATAR_SIZE), 0)
+        ImageDraw.Draw(self._avatar_mask).ellipse([0, 0, self.AVATAR_SIZE, self.AVATAR_SIZE], fill=255)
+
+        # 歌曲卡片非文字图层缓存，键为难度
+        self._card_chrome_cache: Dict[str, Tuple[Image.Image, Image.Image]] = {}
+
+        # 字体文件路径（初始化时解析一次，各字号共用）
+        self._font_path_regular = self._resolve_font_path(bold=False)
+        self._font_path_bold = self._resolve_font_path(bold=True)
+
+        # 歌曲卡片每张都要用到的字体，提前取好避免逐卡查缓存
+        self.font_rank = self._get_font(11, bold=True)
+        self.font_diff = self._get_font(12, bold=True)
+        self.font_song = self._get_font(12, bold=True)
+        self.font_score = self._get_font(16, bold=True)
+        self.font_acc = self._get_font(9, bold=False)
+        self.font_fc = self._get_font(9, bold=True)
 
         # 曲绘预加载缓存（存储处理后的曲绘）
         self._processed_illust_cache: Dict[str, Image.Image] = {}
@@ -102,6 +162,11 @@ class PhiStyleRenderer:
 
         # 所有可用曲绘的映射，键为歌曲名称，值为曲绘文件路径列表
         self._all_illustrations: Dict[str, List[Path]] = {}
+        # 规范化歌曲名称 -> 曲绘文件路径列表，用于模糊匹配
+        self._all_illustrations_norm: Dict[str, List[Path]] = {}
+        # 曲绘文件索引：小写文件名（不含扩展名）-> 路径，以及规范化文件名 -> 路径
+        self._illust_index: Dict[str, Path] = {}
+        self._illust_index_norm: Dict[str, Path] = {}
         # 初始化可用曲绘映射
         self._initialize_illustrations_map()
 
@@ -116,27 +181,30 @@ class PhiStyleRenderer:
         """预加载常用资源到缓存"""
         logger.info("🚀 预加载渲染资源...")
         
-        # 预加载评级图片
+        # 预加载评级图片，并缩放好歌曲卡片使用的 40px 高版本
         ratings = ['φ', 'V', 'S', 'A', 'B', 'C', 'F', 'FC']
         for rating in ratings:
-            self._get_rating_image(rating)
+            self._get_rating_image_scaled(rating)
         
         # 预加载常用字体
         for size in [10, 12, 13, 14, 16, 18, 28]:
             self._get_font(size, bold=False)
             self._get_font(size, bold=True)
-        
+
         logger.info("✅ 资源预加载完成")
 
     async def terminate(self):
         """清理资源"""
-        self._illustration_cache.clear()
+        self._illustration_path_cache.clear()
         self._font_cache.clear()
         self._avatar_cache.clear()
         self._rating_cache.clear()
-        self._bg_cache = None
+        self._rating_resize_cache.clear()
+        self._bg_small = None
+        self._bg_cache.clear()
+        self._rrect_cache.clear()
+        self._card_chrome_cache.clear()
         self._processed_illust_cache.clear()
-        self._executor.shutdown(wait=False)
         logger.info("🧹 PhiStyleRenderer 资源已清理")
 
     async def _preload_illustrations(self, records: List[Dict]):
@@ -152,19 +220,21 @@ class PhiStyleRenderer:
                 song_key = song_name.lower()
                 song_counts[song_key] = song_counts.get(song_key, 0) + 1
 
+        # 限制同时解码的曲绘数量，避免 30 张原图同时驻留内存
+        sem = asyncio.Semaphore(4)
+
         async def load_single(record: Dict, index: int) -> Tuple[str, Optional[Image.Image]]:
             song_name = record.get('song', '')
             if not song_name:
                 return '', None
 
-            # 在线程池中加载图片，传递索引参数
-            loop = asyncio.get_event_loop()
-            img = await loop.run_in_executor(
-                self._executor,
-                self._load_and_process_illustration,
-                song_name,
-                index
-            )
+            # 在工作线程中加载图片，传递索引参数
+            async with sem:
+                img = await asyncio.to_thread(
+                    self._load_and_process_illustration,
+                    song_name,
+                    index
+                )
             return song_name.lower(), img
 
         # 并行加载所有曲绘
@@ -186,13 +256,18 @@ class PhiStyleRenderer:
         try:
             # 尝试多种方式查找曲绘，使用带索引的键确保不同实例使用不同曲绘
             song_key = f"{song_name}_{index}"
-            illust = self._get_illustration(song_key)
+            # JPEG 曲绘让解码器直接输出缩小后的图像，卡片只需要 CARD_HEIGHT 高
+            illust = self._get_illustration(song_key, draft_size=(self.CARD_WIDTH // 2, self.CARD_HEIGHT))
             if illust:
                 # 确保曲绘是RGBA模式
                 if illust.mode != 'RGBA':
                     illust = illust.convert('RGBA')
                 # 预先调整大小（避免在渲染时调整）
                 target_height = self.CARD_HEIGHT
+                if illust.height > target_height:
+                    # 曲绘每次都是新解码的对象，可以原地缩小；大比例缩小时会先走整数倍 reduce
+                    illust.thumbnail((illust.width, target_height), Image.Resampling.LANCZOS)
+                    return illust
                 aspect_ratio = illust.width / illust.height
                 target_width = int(target_height * aspect_ratio)
                 return illust.resize((target_width, target_height), Image.Resampling.LANCZOS)
@@ -200,48 +275,46 @@ class PhiStyleRenderer:
             logger.debug(f"预加载曲绘失败 {song_name}: {e}")
         return None
 
-    def _get_background_image(self, height: int) -> Image.Image:
-        """获取背景图片（带缓存）"""
-        logger.info("=== _get_background_image 被调用 ===")
-        # 如果缓存的背景图高度不够，重新生成
-        if self._bg_cache is None or self._bg_cache.height < height:
+    def _get_background_small(self) -> Optional[Image.Image]:
+        """获取模糊、压暗后的背景小图（只解码处理一次）"""
+        if self._bg_small is None:
             bg_path = self.plugin_dir / "resources" / "img" / "background" / "c774204e373ad3ab3a4137c7e5a930da.jpg"
-            logger.info(f"背景图片路径: {bg_path}")
-            logger.info(f"背景图片是否存在: {bg_path.exists()}")
-            if bg_path.exists():
-                try:
-                    # 使用更小的半径进行模糊，提升性能
-                    bg_img = Image.open(bg_path).convert("RGBA")
-                    logger.info(f"✅ 背景图片加载成功，原始大小: {bg_img.size}")
-                    # 先缩小再模糊，提升性能
-                    scale_factor = 0.5
-                    small_size = (int(self.WIDTH * scale_factor), int(height * scale_factor))
-                    bg_img = bg_img.resize(small_size, Image.Resampling.LANCZOS)
-                    bg_img = bg_img.filter(ImageFilter.GaussianBlur(radius=3))
-                    # 恢复到目标大小
-                    bg_img = bg_img.resize((self.WIDTH, height), Image.Resampling.LANCZOS)
-                    # 降低亮度
-                    enhancer = ImageEnhance.Brightness(bg_img)
-                    bg_img = enhancer.enhance(0.4)
-                    self._bg_cache = bg_img
-                    logger.info(f"✅ 背景图片处理完成")
-                    logger.info(f"处理后背景图片信息: 大小={bg_img.size}, 模式={bg_img.mode}")
-                    return bg_img.copy()
-                except Exception as e:
-                    logger.warning(f"加载背景图片失败: {e}")
-                    import traceback
-                    logger.warning(traceback.format_exc())
+            if not bg_path.exists():
+                logger.warning(f"⚠️ 背景图片不存在: {bg_path}")
+                return None
+            try:
+                bg_img = Image.open(bg_path).convert("RGB")
+                # 整数倍盒式缩小（比 LANCZOS 快得多），在小图上做盒式模糊
+                bg_img = bg_img.reduce(4)
+                bg_img = bg_img.filter(ImageFilter.BoxBlur(2))
+                # 亮度降低到 40%，用查找表一次完成
+                self._bg_small = bg_img.point(self._BG_BRIGHTNESS_LUT)
+                logger.info(f"✅ 背景图片处理完成，小图大小: {self._bg_small.size}")
+            except Exception as e:
+                logger.warning(f"加载背景图片失败: {e}")
+                return None
+        return self._bg_small
+
+    def _get_background_image(self, height: int) -> Image.Image:
+        """获取背景图片（按尺寸缓存，返回值只读）"""
+        key = (self.WIDTH, height)
+        cached = self._bg_cache.get(key)
+        if cached is not None:
+            self._bg_cache.move_to_end(key)
+            return cached
+
+        bg_small = self._get_background_small()
+        if bg_small is None:
             # 使用默认深色背景
             logger.warning("⚠️ 使用默认深色背景")
-            default_bg = Image.new('RGBA', (self.WIDTH, height), (26, 26, 46, 255))
-            logger.info(f"默认背景图片信息: 大小={default_bg.size}, 模式={default_bg.mode}")
-            return default_bg
-        else:
-            # 使用缓存的背景图，裁剪到目标高度
-            logger.info("使用缓存的背景图片")
-            cached_bg = self._bg_cache.crop((0, 0, self.WIDTH, height))
-            logger.info(f"缓存背景图片信息: 大小={cached_bg.size}, 模式={cached_bg.mode}")
-            return cached_bg
+            return Image.new('RGBA', key, (26, 26, 46, 255))
+
+        # 模糊后的图片用双线性放大已足够，每个高度只需一次缩放
+        bg_img = bg_small.resize(key, Image.Resampling.BILINEAR).convert("RGBA")
+        self._bg_cache[key] = bg_img
+        if len(self._bg_cache) > self.BG_CACHE_SIZE:
+            self._bg_cache.popitem(last=False)
+        return bg_img
 
     def _get_avatar(self, avatar_name: Optional[str] = None) -> Optional[Image.Image]:
         """获取头像
@@ -250,21 +323,21 @@ class PhiStyleRenderer:
             avatar_name: 头像文件名（不含扩展名），如果为 None 则随机选择一个
 
         Returns:
-            头像图片或 None
+            头像图片或 None（可能是缓存中的对象，调用方不得原地修改）
         """
         # 如果指定了头像名，尝试加载
         if avatar_name:
             cache_key = avatar_name.lower()
             if cache_key in self._avatar_cache:
-                return self._avatar_cache[cache_key].copy()
+                return self._avatar_cache[cache_key]
 
             # 查找头像文件
             for ext in ['.png', '.jpg', '.jpeg', '.gif']:
                 avatar_file = self.avatar_path / f"{avatar_name}{ext}"
                 if avatar_file.exists():
                     try:
-                        img = Image.open(avatar_file).convert("RGBA")
-                        self._avatar_cache[cache_key] = img.copy()
+                        img = self._open_rgba(avatar_file)
+                        self._avatar_cache[cache_key] = img
                         return img
                     except Exception as e:
                         logger.warning(f"加载头像失败 {avatar_name}: {e}")
@@ -280,19 +353,15 @@ class PhiStyleRenderer:
                 if avatar_files:
                     import random
                     random_avatar = random.choice(avatar_files)
-                    img = Image.open(random_avatar).convert("RGBA")
+                    img = self._open_rgba(random_avatar)
                     return img
         except Exception as e:
             logger.warning(f"随机选择头像失败: {e}")
 
         return None
 
-    def _get_font(self, size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
-        """获取字体 - 优先使用插件自带字体，确保跨平台一致性"""
-        cache_key = f"{size}_{bold}"
-        if cache_key in self._font_cache:
-            return self._font_cache[cache_key]
-
+    def _resolve_font_path(self, bold: bool = False) -> Optional[str]:
+        """按优先级查找第一个可用的字体文件（只在初始化时调用一次）"""
         # 字体列表按优先级排序
         font_paths = []
 
@@ -350,20 +419,35 @@ class PhiStyleRenderer:
             "/System/Library/Fonts/Hiragino Sans GB.ttc",
         ])
 
-        # 尝试加载字体
         for font_path in font_paths:
             if Path(font_path).exists():
                 try:
-                    font = ImageFont.truetype(font_path, size)
-                    self._font_cache[cache_key] = font
-                    logger.debug(f"✅ 加载字体成功: {font_path}")
-                    return font
+                    ImageFont.truetype(font_path, 12)
+                    logger.debug(f"✅ 选用字体: {font_path}")
+                    return font_path
                 except Exception as e:
                     logger.debug(f"❌ 加载字体失败 {font_path}: {e}")
                     continue
 
-        # 如果所有字体都失败，使用默认字体
-        logger.warning(f"⚠️ 未找到合适的字体，使用默认字体")
+        logger.warning(f"⚠️ 未找到合适的{'粗体' if bold else '常规'}字体，将使用默认字体")
+        return None
+
+    def _get_font(self, size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
+        """获取字体 - 优先使用插件自带字体，确保跨平台一致性"""
+        cache_key = f"{size}_{bold}"
+        if cache_key in self._font_cache:
+            return self._font_cache[cache_key]
+
+        font_path = self._font_path_bold if bold else self._font_path_regular
+        if font_path:
+            try:
+                font = ImageFont.truetype(font_path, size)
+                self._font_cache[cache_key] = font
+                return font
+            except Exception as e:
+                logger.debug(f"❌ 加载字体失败 {font_path}: {e}")
+
+        # 如果没有可用字体，使用默认字体
         font = ImageFont.load_default()
         self._font_cache[cache_key] = font
         return font
@@ -394,34 +478,59 @@ class PhiStyleRenderer:
             logger.warning(f"绘制文本失败 '{text}': {e}")
 
     def _initialize_illustrations_map(self):
-        """初始化可用曲绘映射"""
+        """初始化可用曲绘映射（只扫描一次目录）"""
         try:
             # 获取所有图片文件（支持 .png, .jpg, .jpeg, .gif 等）
-            all_image_files = []
-            for ext in ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.bmp', '*.webp']:
-                all_image_files.extend(self.illustration_path.glob(ext))
-                # Ubuntu 大小写敏感，同时匹配大写扩展名
-                all_image_files.extend(self.illustration_path.glob(ext.upper()))
+            with os.scandir(self.illustration_path) as it:
+                all_image_files = [
+                    Path(entry.path) for entry in it
+                    if entry.is_file() and os.path.splitext(entry.name)[1].lower() in _ILLUST_EXTS
+                ]
 
-            # 构建曲绘映射
+            # 构建曲绘映射和文件索引
             for file in all_image_files:
                 file_stem_lower = file.stem.lower()
+                self._illust_index.setdefault(file_stem_lower, file)
+                file_stem_normalized = _NORM_RE.sub('', file_stem_lower)
+                if file_stem_normalized:
+                    self._illust_index_norm.setdefault(file_stem_normalized, file)
                 # 提取歌曲名称（去除可能的后缀，如 " (1)", "_1" 等）
-                import re
-                song_name = re.sub(r'\s*\(\d+\)$|\s*_\d+$', '', file_stem_lower)
+                song_name = _ILLUST_SUFFIX_RE.sub('', file_stem_lower)
                 if song_name not in self._all_illustrations:
                     self._all_illustrations[song_name] = []
                 self._all_illustrations[song_name].append(file)
+                song_name_normalized = _NORM_RE.sub('', song_name)
+                if song_name_normalized:
+                    self._all_illustrations_norm.setdefault(song_name_normalized, []).append(file)
 
             logger.info(f"✅ 初始化曲绘映射完成，找到 {len(self._all_illustrations)} 首歌曲的曲绘")
         except Exception as e:
             logger.warning(f"初始化曲绘映射失败: {e}")
 
-    def _get_illustration(self, song_key: str) -> Optional[Image.Image]:
-        """获取曲绘（支持大小写不敏感和多种扩展名，支持冲突检测）"""
+    @staticmethod
+    def _open_rgba(path: Path, draft_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """打开图片并确保为 RGBA 模式，本身已是 RGBA 的图片不再复制一份
+
+        Args:
+            path: 图片文件路径
+            draft_size: 目标尺寸，JPEG 会以不小于该尺寸的 1/2、1/4、1/8 比例解码
+        """
+        img = Image.open(path)
+        if draft_size and img.format == 'JPEG':
+            img.draft('RGB', draft_size)
+        if img.mode == 'RGBA':
+            img.load()
+            return img
+        return img.convert("RGBA")
+
+    def _get_illustration(self, song_key: str, draft_size: Optional[Tuple[int, int]] = None) -> Optional[Image.Image]:
+        """获取曲绘（支持大小写不敏感和多种扩展名，支持冲突检测）
+
+        指定 draft_size 时得到的是缩小解码的图像。每次调用都会重新解码，
+        缓存里只保存选中的文件路径，保证同一 song_key 始终对应同一张曲绘。
+        """
         # 提取原始歌曲名称（去除索引部分）
-        import re
-        match = re.match(r'^(.+?)_\d+$', song_key)
+        match = _INDEXED_KEY_RE.match(song_key)
         if match:
             original_song_key = match.group(1)
         else:
@@ -430,23 +539,28 @@ class PhiStyleRenderer:
         song_key_lower = original_song_key.lower()
         
         # 检查缓存
-        if song_key in self._illustration_cache:
-            return self._illustration_cache[song_key].copy()
+        cached_file = self._illustration_path_cache.get(song_key)
+        if cached_file is not None:
+            try:
+                return self._open_rgba(cached_file, draft_size)
+            except Exception as e:
+                logger.warning(f"加载曲绘失败 {original_song_key}: {e}")
+                del self._illustration_path_cache[song_key]
 
         # 查找可用曲绘
         matched_files = self._find_available_illustrations(song_key_lower)
         
         if not matched_files:
             # 如果没有找到可用曲绘，尝试传统匹配方式
-            return self._find_illustration_fallback(original_song_key)
+            return self._find_illustration_fallback(original_song_key, draft_size)
 
         # 选择一个未使用的曲绘
         selected_file = self._select_unused_illustration(song_key_lower, matched_files)
         
         if selected_file:
             try:
-                img = Image.open(selected_file).convert("RGBA")
-                self._illustration_cache[song_key] = img.copy()
+                img = self._open_rgba(selected_file, draft_size)
+                self._illustration_path_cache[song_key] = selected_file
                 # 记录使用情况
                 if song_key_lower not in self._illustration_usage:
                     self._illustration_usage[song_key_lower] = []
@@ -459,8 +573,8 @@ class PhiStyleRenderer:
             # 所有曲绘都已使用，返回第一个
             try:
                 fallback_file = matched_files[0]
-                img = Image.open(fallback_file).convert("RGBA")
-                self._illustration_cache[song_key] = img.copy()
+                img = self._open_rgba(fallback_file, draft_size)
+                self._illustration_path_cache[song_key] = fallback_file
                 logger.info(f"⚠️ 所有曲绘已使用，使用 fallback: {original_song_key} -> {fallback_file.name}")
                 return img
             except Exception as e:
@@ -482,14 +596,15 @@ class PhiStyleRenderer:
                 if song_key_lower in song_name or song_name in song_key_lower:
                     available_files.extend(files)
         
-        # 尝试模糊匹配
+        # 尝试模糊匹配（规范化名称在建索引时已算好）
         if not available_files:
-            import re
-            song_key_normalized = re.sub(r'[^\w\u4e00-\u9fff]', '', song_key_lower)
+            song_key_normalized = _NORM_RE.sub('', song_key_lower)
             if song_key_normalized:
-                for song_name, files in self._all_illustrations.items():
-                    file_stem_normalized = re.sub(r'[^\w\u4e00-\u9fff]', '', song_name)
-                    if song_key_normalized in file_stem_normalized or file_stem_normalized in song_key_normalized:
+                exact_files = self._all_illustrations_norm.get(song_key_normalized)
+                if exact_files:
+                    return list(exact_files)
+                for song_name_normalized, files in self._all_illustrations_norm.items():
+                    if song_key_normalized in song_name_normalized or song_name_normalized in song_key_normalized:
                         available_files.extend(files)
         
         return available_files
@@ -505,49 +620,36 @@ class PhiStyleRenderer:
         
         return None
 
-    def _find_illustration_fallback(self, song_key: str) -> Optional[Image.Image]:
-        """传统的曲绘查找方式（作为 fallback）"""
+    def _find_illustration_fallback(self, song_key: str, draft_size: Optional[Tuple[int, int]] = None) -> Optional[Image.Image]:
+        """传统的曲绘查找方式（作为 fallback，只查内存索引）"""
         song_key_lower = song_key.lower()
-        matched_file = None
-
-        # 获取所有图片文件（支持 .png, .jpg, .jpeg, .gif 等）
-        all_image_files = []
-        for ext in ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.bmp', '*.webp']:
-            all_image_files.extend(self.illustration_path.glob(ext))
-            # Ubuntu 大小写敏感，同时匹配大写扩展名
-            all_image_files.extend(self.illustration_path.glob(ext.upper()))
 
         # 首先尝试精确匹配
-        for file in all_image_files:
-            file_stem_lower = file.stem.lower()
-            if song_key_lower == file_stem_lower:
-                matched_file = file
-                break
+        matched_file = self._illust_index.get(song_key_lower)
 
         # 如果没有精确匹配，尝试包含匹配
         if not matched_file:
-            for file in all_image_files:
-                file_stem_lower = file.stem.lower()
+            for file_stem_lower, file in self._illust_index.items():
                 if song_key_lower in file_stem_lower:
                     matched_file = file
                     break
 
         # 如果仍然没有匹配，尝试模糊匹配（去除空格和特殊字符）
         if not matched_file:
-            import re
             # 去除空格和特殊字符，只保留字母、数字和中文
-            song_key_normalized = re.sub(r'[^\w\u4e00-\u9fff]', '', song_key_lower)
+            song_key_normalized = _NORM_RE.sub('', song_key_lower)
             if song_key_normalized:
-                for file in all_image_files:
-                    file_stem_normalized = re.sub(r'[^\w\u4e00-\u9fff]', '', file.stem.lower())
-                    if song_key_normalized in file_stem_normalized or file_stem_normalized in song_key_normalized:
-                        matched_file = file
-                        break
+                matched_file = self._illust_index_norm.get(song_key_normalized)
+                if not matched_file:
+                    for file_stem_normalized, file in self._illust_index_norm.items():
+                        if song_key_normalized in file_stem_normalized or file_stem_normalized in song_key_normalized:
+                            matched_file = file
+                            break
 
         if matched_file:
             try:
-                img = Image.open(matched_file).convert("RGBA")
-                self._illustration_cache[song_key] = img.copy()
+                img = self._open_rgba(matched_file, draft_size)
+                self._illustration_path_cache[song_key] = matched_file
                 logger.info(f"✅ 找到曲绘 (fallback): {song_key} -> {matched_file.name}")
                 return img
             except Exception as e:
@@ -556,17 +658,29 @@ class PhiStyleRenderer:
             # 在 Ubuntu 下添加更详细的调试信息
             logger.warning(f"未找到曲绘: {song_key}")
             logger.debug(f"曲绘目录: {self.illustration_path}")
-            logger.debug(f"目录存在: {self.illustration_path.exists()}")
-            if self.illustration_path.exists():
-                files = list(self.illustration_path.glob("*.png"))[:5]
-                logger.debug(f"样本文件: {[f.name for f in files]}")
+            logger.debug(f"索引文件数: {len(self._illust_index)}")
 
         return None
 
+    def _get_rating_image_scaled(self, rating: str, target_height: int = 40) -> Optional[Image.Image]:
+        """获取缩放到指定高度（默认歌曲卡片的 40px）的评级图片，每种评级和高度只缩放一次"""
+        key = (rating, target_height)
+        scaled = self._rating_resize_cache.get(key)
+        if scaled is not None:
+            return scaled
+
+        rating_img = self._get_rating_image(rating)
+        if rating_img is None:
+            return None
+        rating_width = int(target_height * rating_img.width / rating_img.height)
+        scaled = rating_img.resize((rating_width, target_height), Image.Resampling.LANCZOS)
+        self._rating_resize_cache[key] = scaled
+        return scaled
+
     def _get_rating_image(self, rating: str) -> Optional[Image.Image]:
-        """获取评级图片（φ, V, S, A, B, C, F, FC等）"""
+        """获取评级图片（φ, V, S, A, B, C, F, FC等），返回缓存对象，调用方不得原地修改"""
         if rating in self._rating_cache:
-            return self._rating_cache[rating].copy()
+            return self._rating_cache[rating]
 
         # 评级图片文件名映射
         rating_files = {
@@ -587,8 +701,8 @@ class PhiStyleRenderer:
         img_path = self.rating_path / filename
         if img_path.exists():
             try:
-                img = Image.open(img_path).convert("RGBA")
-                self._rating_cache[rating] = img.copy()
+                img = self._open_rgba(img_path)
+                self._rating_cache[rating] = img
                 return img
             except Exception as e:
                 logger.warning(f"加载评级图片失败 {rating}: {e}")
@@ -627,19 +741,62 @@ class PhiStyleRenderer:
         hex_color = hex_color.lstrip('#')
         return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
     
-    def _draw_rounded_rect(self, draw: ImageDraw.Draw, xy: Tuple[int, int, int, int], 
+    def _draw_rounded_rect(self, img: Image.Image, xy: Tuple[int, int, int, int],
                           radius: int, fill: Tuple[int, int, int, int]):
-        """绘制圆角矩形"""
+        """绘制圆角矩形
+
+        不透明填充直接调用 Pillow 原生的 rounded_rectangle（单次 C 调用）；
+        半透明填充同样是直接覆盖像素（与 ImageDraw 一致，不与底图混合），
+        同一 (宽, 高, 圆角) 的形状蒙版只栅格化一次并缓存，之后用蒙版 paste 填充色。
+        """
+        if len(fill) == 3 or fill[3] == 255:
+            ImageDraw.Draw(img).rounded_rectangle(xy, radius=radius, fill=fill)
+            return
+
         x1, y1, x2, y2 = xy
-        # 主体矩形
-        draw.rectangle([x1 + radius, y1, x2 - radius, y2], fill=fill)
-        draw.rectangle([x1, y1 + radius, x2, y2 - radius], fill=fill)
-        # 四个圆角
-        draw.ellipse([x1, y1, x1 + radius * 2, y1 + radius * 2], fill=fill)
-        draw.ellipse([x2 - radius * 2, y1, x2, y1 + radius * 2], fill=fill)
-        draw.ellipse([x1, y2 - radius * 2, x1 + radius * 2, y2], fill=fill)
-        draw.ellipse([x2 - radius * 2, y2 - radius * 2, x2, y2], fill=fill)
-    
+        width = x2 - x1 + 1
+        height = y2 - y1 + 1
+        key = (width, height, radius)
+        mask = self._rrect_cache.get(key)
+        if mask is None:
+            mask = Image.new('L', (width, height), 0)
+            ImageDraw.Draw(mask).rounded_rectangle([0, 0, width - 1, height - 1], radius=radius, fill=255)
+            self._rrect_cache[key] = mask
+        img.paste(tuple(fill), (x1, y1, x1 + width, y1 + height), mask)
+
+    def _get_card_chrome(self, diff: str) -> Tuple[Image.Image, Image.Image]:
+        """获取歌曲卡片的非文字图层及其覆盖蒙版（按难度缓存）
+
+        图层与卡片同尺寸，包含难度标签底色、信息卡半透明圆角背景和左侧难度边框。
+        蒙版标出图层画过的像素，用它 paste 时直接覆盖这些像素（与逐个 ImageDraw
+        绘制的结果一致），其余区域保持不变，不再逐卡栅格化。
+        """
+        cached = self._card_chrome_cache.get(diff)
+        if cached is not None:
+            return cached
+
+        card_width = self.CARD_WIDTH
+        card_height = self.CARD_HEIGHT
+        illust_width = card_width // 2
+        diff_rgb = self.COLORS_RGB.get(diff, self.COLORS_RGB['IN'])
+
+        tile = Image.new('RGBA', (card_width + 1, card_height), (0, 0, 0, 0))
+        tile_draw = ImageDraw.Draw(tile)
+        # 难度标签底色（曲绘左下角）
+        tile_draw.rectangle([5, card_height - 27, 50, card_height - 5], fill=diff_rgb)
+        # 信息卡背景和左侧边框
+        info_x = illust_width - 15
+        info_y = 5
+        info_width = card_width - illust_width + 15
+        info_height = card_height - 10
+        tile_draw.rounded_rectangle([info_x, info_y, info_x + info_width, info_y + info_height],
+                                    radius=5, fill=(40, 40, 55, 60))
+        tile_draw.rectangle([info_x, info_y, info_x + 4, info_y + info_height], fill=diff_rgb)
+
+        mask = tile.getchannel('A').point(lambda a: 255 if a else 0)
+        self._card_chrome_cache[diff] = (tile, mask)
+        return tile, mask
+
     async def render_b30(self, data: Dict[str, Any], output_path: Path) -> bool:
         """
         渲染 Best30 成绩图（Phi-Plugin 风格）- 优化版本
@@ -656,9 +813,12 @@ class PhiStyleRenderer:
                 logger.error("❌ 没有成绩记录可渲染")
                 return False
 
-            # 为每个记录添加索引信息
+            # 为每个记录添加索引信息，并一次性算好评级
             for i, record in enumerate(all_records):
                 record['__index__'] = i
+                record['__rating__'] = self._calculate_rating(
+                    record.get('score', 0), record.get('acc', 0), record.get('fc', False)
+                )
 
             num_cols = 3
             num_rows = (len(main_records) + num_cols - 1) // num_cols
@@ -712,11 +872,10 @@ class PhiStyleRenderer:
             footer_y = overflow_start_y + overflow_height + 20 if overflow_records else start_y + main_content_height + 20
             self._draw_footer(img, draw, footer_y)
             
-            output_path.parent.mkdir(parents=True, exist_ok=True)
             # 保存前检查图片信息
             logger.info(f"保存前图片信息: 大小={img.size}, 模式={img.mode}, 透明度={img.mode == 'RGBA'}")
-            # 保存图片
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            # 保存图片（按扩展名选择编码格式）
+            save_image(img, output_path, self.image_quality)
             # 保存后检查文件大小
             import os
             file_size = os.path.getsize(output_path)
@@ -740,7 +899,7 @@ class PhiStyleRenderer:
         # 移除所有背景绘制代码，让头部区域完全透明
 
         # 头像区域（圆形）
-        avatar_size = 100
+        avatar_size = self.AVATAR_SIZE
         avatar_x = 60
         avatar_y = (self.HEADER_HEIGHT - avatar_size) // 2
 
@@ -755,14 +914,10 @@ class PhiStyleRenderer:
         if avatar_img:
             # 缩放头像
             avatar_resized = avatar_img.resize((avatar_size, avatar_size), Image.Resampling.LANCZOS)
-            # 创建圆形遮罩
-            mask = Image.new('L', (avatar_size, avatar_size), 0)
-            mask_draw = ImageDraw.Draw(mask)
-            mask_draw.ellipse([0, 0, avatar_size, avatar_size], fill=255)
-            # 应用遮罩
-            avatar_resized.putalpha(mask)
-            # 粘贴头像
-            img.paste(avatar_resized, (avatar_x, avatar_y), avatar_resized)
+            # 应用预先生成的圆形遮罩
+            avatar_resized.putalpha(self._avatar_mask)
+            # 合成头像
+            img.alpha_composite(avatar_resized, (avatar_x, avatar_y))
             # 绘制边框
             draw.ellipse([avatar_x, avatar_y, avatar_x + avatar_size, avatar_y + avatar_size],
                         outline='white', width=3)
@@ -951,8 +1106,8 @@ class PhiStyleRenderer:
                 text_x = logo_x + logo_size // 2
                 text_y = logo_y + logo_size + 12  # 增大间距到12px，适应更大的字体
                 # 使用与底部文字相同的发光效果
-                self._draw_text_with_glow(img, text_x, text_y, logo_text, '#aaaaaa', font_logo_text,
-                                         glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+                draw_text_with_glow(img, text_x, text_y, logo_text, '#aaaaaa', font_logo_text,
+                                    glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
                 logger.info("✅ Logo下方文字已添加")
             except Exception as e:
                 logger.warning(f"加载logo失败: {e}")
@@ -985,43 +1140,35 @@ class PhiStyleRenderer:
                          fill=(brightness, brightness, brightness + 20))
             # 添加难度对应的边框
             diff = record.get('difficulty', 'IN')
-            diff_color = self.COLORS.get(diff, self.COLORS['IN'])
-            draw.rectangle([x, y, x + 3, y + illust_height], fill=self._hex_to_rgb(diff_color))
-            draw.rectangle([x + illust_width - 3, y, x + illust_width, y + illust_height], fill=self._hex_to_rgb(diff_color))
+            diff_rgb = self.COLORS_RGB.get(diff, self.COLORS_RGB['IN'])
+            draw.rectangle([x, y, x + 3, y + illust_height], fill=diff_rgb)
+            draw.rectangle([x + illust_width - 3, y, x + illust_width, y + illust_height], fill=diff_rgb)
         
         # 排名徽章（左上角，白色小条）
         rank_width = 50
         rank_height = 18
-        rank_bg = '#ffffff'
-        if rank == 1:
-            rank_bg = '#ffd700'  # 金牌
-        elif rank == 2:
-            rank_bg = '#c0c0c0'  # 银牌
-        elif rank == 3:
-            rank_bg = '#cd7f32'  # 铜牌
+        rank_bg = self.RANK_BADGE_RGB.get(rank, self.COLORS_RGB['text_white'])
             
         draw.rectangle([x - 5, y - 5, x + rank_width, y + rank_height], 
-                      fill=self._hex_to_rgb(rank_bg))
+                      fill=rank_bg)
         
-        font_rank = self._get_font(11, bold=True)
         rank_text_color = 'black' if rank <= 3 else 'black'
         draw.text((x + rank_width // 2 - 2, y + rank_height // 2 - 2), 
-                 str(rank), fill=rank_text_color, font=font_rank, anchor='mm')
+                 str(rank), fill=rank_text_color, font=self.font_rank, anchor='mm')
         
         # 难度标签（曲绘左下角）
         diff = record.get('difficulty', 'IN')
-        diff_color = self.COLORS.get(diff, self.COLORS['IN'])
+        diff_rgb = self.COLORS_RGB.get(diff, self.COLORS_RGB['IN'])
         diff_width = 45
         diff_height = 22
         diff_x = x + 5
         diff_y = y + illust_height - diff_height - 5
         
         draw.rectangle([diff_x, diff_y, diff_x + diff_width, diff_y + diff_height],
-                      fill=self._hex_to_rgb(diff_color))
+                      fill=diff_rgb)
         
-        font_diff = self._get_font(12, bold=True)
         draw.text((diff_x + diff_width // 2, diff_y + diff_height // 2), 
-                 diff, fill='white', font=font_diff, anchor='mm')
+                 diff, fill='white', font=self.font_diff, anchor='mm')
         
         # 信息卡片（右侧，半透明背景）
         info_x = x + illust_width - 15  # 稍微重叠
@@ -1030,12 +1177,12 @@ class PhiStyleRenderer:
         info_y = y + 5
         
         # 根据难度选择边框颜色
-        border_color = self._hex_to_rgb(diff_color)
+        border_color = diff_rgb
         # 使用深色背景，提高可读性（RGB模式）
         bg_color = (40, 40, 55)  # 深蓝灰色背景
 
         # 绘制信息卡背景
-        self._draw_rounded_rect(draw,
+        self._draw_rounded_rect(img,
                                (info_x, info_y, info_x + info_width, info_y + info_height),
                                5, (*bg_color, 255))
         
@@ -1047,28 +1194,25 @@ class PhiStyleRenderer:
         song_name = record.get('song', 'Unknown')
         if len(song_name) > 12:
             song_name = song_name[:10] + '...'
-        self._draw_text_with_glow(img, info_x + 10, info_y + 8, song_name, 'white', font_song, glow_color=(100, 200, 255))
+        draw_text_with_glow(img, info_x + 10, info_y + 8, song_name, 'white', font_song, glow_color=(100, 200, 255))
 
         # 分数（带发光效果）
         font_score = self._get_font(18, bold=True)
         score = record.get('score', 0)
-        self._draw_text_with_glow(img, info_x + 10, info_y + 32, f"{score:,}", '#ffd700', font_score, glow_color=(100, 200, 255))
+        draw_text_with_glow(img, info_x + 10, info_y + 32, f"{score:,}", '#ffd700', font_score, glow_color=(100, 200, 255))
 
         # ACC 和 RKS（带发光效果）
         font_acc = self._get_font(10)
         acc = record.get('acc', 0)
         rks = record.get('rks', 0)
-        self._draw_text_with_glow(img, info_x + 10, info_y + 58, f"Acc: {acc:.2f}%", '#aaaaaa', font_acc, glow_color=(100, 200, 255))
-        self._draw_text_with_glow(img, info_x + 10, info_y + 73, f"RKS: {rks:.2f}", '#aaaaaa', font_acc, glow_color=(100, 200, 255))
+        draw_text_with_glow(img, info_x + 10, info_y + 58, f"Acc: {acc:.2f}%", '#aaaaaa', font_acc, glow_color=(100, 200, 255))
+        draw_text_with_glow(img, info_x + 10, info_y + 73, f"RKS: {rks:.2f}", '#aaaaaa', font_acc, glow_color=(100, 200, 255))
 
         # 评级图片（右侧）
         rating = self._calculate_rating(score, acc, record.get('fc', False))
-        rating_img = self._get_rating_image(rating)
-        if rating_img:
-            # 调整评级图片大小
-            rating_height = 40
-            rating_width = int(rating_height * rating_img.width / rating_img.height)
-            rating_resized = rating_img.resize((rating_width, rating_height), Image.Resampling.LANCZOS)
+        rating_resized = self._get_rating_image_scaled(rating)
+        if rating_resized:
+            rating_width, rating_height = rating_resized.size
             # 粘贴评级图片（信息卡右侧）
             rating_x = info_x + info_width - rating_width - 10
             rating_y = info_y + (info_height - rating_height) // 2
@@ -1079,18 +1223,17 @@ class PhiStyleRenderer:
         if record.get('fc'):
             score_val = record.get('score', 0)
             fc_text = 'AP' if score_val == 1000000 else 'FC'
-            fc_color = '#ffd700' if score_val == 1000000 else '#00b0f0'
+            fc_color = self.COLORS_RGB['gold'] if score_val == 1000000 else self.COLORS_RGB['fc']
             fc_width = 28
             fc_height = 18
             fc_x = x + illust_width - fc_width - 5
             fc_y = y + 5
 
             draw.rectangle([fc_x, fc_y, fc_x + fc_width, fc_y + fc_height],
-                          fill=self._hex_to_rgb(fc_color))
-            font_fc = self._get_font(9, bold=True)
+                          fill=fc_color)
             draw.text((fc_x + fc_width // 2, fc_y + fc_height // 2),
                      fc_text, fill='black' if score_val == 1000000 else 'white',
-                     font=font_fc, anchor='mm')
+                     font=self.font_fc, anchor='mm')
 
     def _draw_song_card_fast(self, img: Image.Image, draw: ImageDraw.Draw, rank: Optional[int],
                               record: Dict, x: int, y: int):
@@ -1127,26 +1270,22 @@ class PhiStyleRenderer:
                          fill=(brightness, brightness, brightness + 20, 150))
             # 添加难度对应的边框
             diff = record.get('difficulty', 'IN')
-            diff_color = self.COLORS.get(diff, self.COLORS['IN'])
-            draw.rectangle([x, y, x + 3, y + illust_height], fill=self._hex_to_rgb(diff_color))
-            draw.rectangle([x + illust_width - 3, y, x + illust_width, y + illust_height], fill=self._hex_to_rgb(diff_color))
+            diff_rgb = self.COLORS_RGB.get(diff, self.COLORS_RGB['IN'])
+            draw.rectangle([x, y, x + 3, y + illust_height], fill=diff_rgb)
+            draw.rectangle([x + illust_width - 3, y, x + illust_width, y + illust_height], fill=diff_rgb)
             logger.info(f"使用渐变占位符: {song}")
 
         # 排名徽章（仅在有排名时绘制）
         if rank is not None:
-            rank_colors = {1: '#ffd700', 2: '#c0c0c0', 3: '#cd7f32'}
-            rank_bg = rank_colors.get(rank, '#ffffff')
-            draw.rectangle([x - 5, y - 5, x + 45, y + 13], fill=self._hex_to_rgb(rank_bg))
-            font_rank = self._get_font(11, bold=True)
-            draw.text((x + 20, y + 4), str(rank), fill='black', font=font_rank, anchor='mm')
+            rank_bg = self.RANK_BADGE_RGB.get(rank, self.COLORS_RGB['text_white'])
+            draw.rectangle([x - 5, y - 5, x + 45, y + 13], fill=rank_bg)
+            draw.text((x + 20, y + 4), str(rank), fill='black', font=self.font_rank, anchor='mm')
 
-        # 难度标签
+        # 难度标签底色、信息卡背景和左侧难度边框：一次 paste 预先绘制好的图层
         diff = record.get('difficulty', 'IN')
-        diff_color = self.COLORS.get(diff, self.COLORS['IN'])
-        draw.rectangle([x + 5, y + illust_height - 27, x + 50, y + illust_height - 5],
-                      fill=self._hex_to_rgb(diff_color))
-        font_diff = self._get_font(12, bold=True)
-        draw.text((x + 27, y + illust_height - 16), diff, fill='white', font=font_diff, anchor='mm')
+        chrome, chrome_mask = self._get_card_chrome(diff)
+        img.paste(chrome, (x, y), chrome_mask)
+        draw.text((x + 27, y + illust_height - 16), diff, fill='white', font=self.font_diff, anchor='mm')
 
         # 信息卡片
         info_x = x + illust_width - 15
@@ -1154,37 +1293,27 @@ class PhiStyleRenderer:
         info_height = card_height - 10
         info_y = y + 5
 
-        # 绘制背景和边框（增强视觉效果）
-        bg_color = (40, 40, 55, 60)  # 进一步降低透明度，让背景更明显
-        # 绘制信息卡背景
-        self._draw_rounded_rect(draw,
-                               (info_x, info_y, info_x + info_width, info_y + info_height),
-                               5, bg_color)
-        
-        # 绘制左侧边框（增强难度标识）
-        draw.rectangle([info_x, info_y, info_x + 4, info_y + info_height],
-                      fill=self._hex_to_rgb(diff_color))
         # 添加边框高亮
         draw.rectangle([info_x + 1, info_y + 1, info_x + 2, info_y + info_height - 1],
                       fill=(255, 255, 255, 100))
 
         # 文字信息（优化字体样式）
-        font_song = self._get_font(12, bold=True)  # 减小字体大小
+        font_song = self.font_song
         song_name = record.get('song', 'Unknown')
         if len(song_name) > 14:
             song_name = song_name[:12] + '...'  # 允许更长的歌曲名
         # 增强发光效果，使用更深的蓝色
-        self._draw_text_with_glow(img, info_x + 10, info_y + 6, song_name, 'white', font_song,
-                                  glow_color=(50, 150, 255), glow_radius=2)  # 减小发光半径
+        draw_text_with_glow(img, info_x + 10, info_y + 6, song_name, 'white', font_song,
+                             glow_color=(50, 150, 255), glow_radius=2)  # 减小发光半径
 
-        font_score = self._get_font(16, bold=True)  # 减小字体大小
+        font_score = self.font_score
         score = record.get('score', 0)
         # 分数发光效果增强
-        self._draw_text_with_glow(img, info_x + 10, info_y + 28, f"{score:,}", '#ffd700', font_score,
-                                  glow_color=(255, 215, 0), glow_radius=2)  # 减小发光半径
+        draw_text_with_glow(img, info_x + 10, info_y + 28, f"{score:,}", '#ffd700', font_score,
+                             glow_color=(255, 215, 0), glow_radius=2)  # 减小发光半径
 
         # 增强 Acc 和 RKS 文字
-        font_acc = self._get_font(9, bold=False)  # 减小字体大小
+        font_acc = self.font_acc
         acc = record.get('acc', 0)
         rks = record.get('rks', 0)
         # Acc 颜色根据值变化
@@ -1193,13 +1322,11 @@ class PhiStyleRenderer:
         # RKS 使用浅蓝色
         draw.text((info_x + 10, info_y + 63), f"RKS: {rks:.2f}", fill='#66ccff', font=font_acc)
 
-        # 评级图片（优化视觉效果）
-        rating = self._calculate_rating(score, acc, record.get('fc', False))
-        rating_img = self._get_rating_image(rating)
-        if rating_img:
-            rating_height = 40
-            rating_width = int(rating_height * rating_img.width / rating_img.height)
-            rating_resized = rating_img.resize((rating_width, rating_height), Image.Resampling.LANCZOS)
+        # 评级图片（优化视觉效果），优先使用批量预先算好的评级
+        rating = record.get('__rating__') or self._calculate_rating(score, acc, record.get('fc', False))
+        rating_resized = self._get_rating_image_scaled(rating)
+        if rating_resized:
+            rating_width, rating_height = rating_resized.size
             rating_x = info_x + info_width - rating_width - 10
             rating_y = info_y + (info_height - rating_height) // 2
             # 直接粘贴评级图片
@@ -1209,78 +1336,13 @@ class PhiStyleRenderer:
         if record.get('fc'):
             score_val = record.get('score', 0)
             fc_text = 'AP' if score_val == 1000000 else 'FC'
-            fc_color = '#ffd700' if score_val == 1000000 else '#00b0f0'
+            fc_color = self.COLORS_RGB['gold'] if score_val == 1000000 else self.COLORS_RGB['fc']
             # 移除黑色阴影，直接绘制标识
             draw.rectangle([x + illust_width - 33, y + 5, x + illust_width - 5, y + 23],
-                          fill=self._hex_to_rgb(fc_color))
-            font_fc = self._get_font(9, bold=True)
+                          fill=fc_color)
             draw.text((x + illust_width - 19, y + 14), fc_text,
                      fill='black' if score_val == 1000000 else 'white',
-                     font=font_fc, anchor='mm')
-
-    def _draw_text_with_glow(self, img: Image.Image, x: int, y: int, text: str, 
-                              text_color: str, font: ImageFont.FreeTypeFont, 
-                              glow_color: Tuple[int, int, int] = (255, 255, 255),
-                              glow_radius: int = 4, anchor: str = None):
-        """绘制带发光效果的文字
-        
-        Args:
-            img: 目标图片
-            x, y: 文字位置
-            text: 文字内容
-            text_color: 文字颜色（十六进制或颜色名）
-            font: 字体
-            glow_color: 发光颜色 (R, G, B)
-            glow_radius: 发光半径
-            anchor: 文字锚点（如 'mm' 表示中心对齐）
-        """
-        draw = ImageDraw.Draw(img)
-        
-        # 计算文本边界框，只在文本周围创建发光效果
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        # 确定发光层的大小和位置
-        padding = glow_radius * 2
-        layer_width = text_width + padding * 2
-        layer_height = text_height + padding * 2
-        
-        # 计算发光层的粘贴位置
-        if anchor == 'mm':
-            layer_x = x - layer_width // 2
-            layer_y = y - layer_height // 2
-        else:
-            layer_x = x - padding
-            layer_y = y - padding
-        
-        # 绘制发光效果
-        for offset in range(glow_radius, 0, -1):
-            alpha = int(40 - offset * 8)
-            if alpha <= 0:
-                continue
-            # 创建一个只包含文本区域的图层
-            glow_layer = Image.new('RGBA', (layer_width, layer_height), (0, 0, 0, 0))
-            glow_draw = ImageDraw.Draw(glow_layer)
-            
-            # 调整文本在发光层中的位置
-            text_x = padding
-            text_y = padding
-            
-            for dx, dy in [(-offset, 0), (offset, 0), (0, -offset), (0, offset),
-                          (-offset, -offset), (offset, -offset), (-offset, offset), (offset, offset)]:
-                glow_draw.text((text_x + dx, text_y + dy), text, fill=(*glow_color, alpha), font=font)
-            
-            # 模糊发光层
-            glow_layer = glow_layer.filter(ImageFilter.GaussianBlur(radius=offset))
-            
-            # 粘贴到目标位置
-            img.paste(glow_layer, (int(layer_x), int(layer_y)), glow_layer)
-        
-        if anchor:
-            draw.text((x, y), text, fill=text_color, font=font, anchor=anchor)
-        else:
-            draw.text((x, y), text, fill=text_color, font=font)
+                     font=self.font_fc, anchor='mm')
 
     def _draw_overflow_section(self, img: Image.Image, draw: ImageDraw.Draw, 
                                records: List[Dict], start_y: int, col_x_positions: List[int]):
@@ -1307,9 +1369,9 @@ class PhiStyleRenderer:
         
         # Overflow 文字（优化字体样式）
         font_title = self._get_font(24, bold=True)  # 减小字体大小
-        self._draw_text_with_glow(img, center_x, title_y + title_height // 2, 
-                                  "OVER FLOW", '#ffffff', font_title,
-                                  glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+        draw_text_with_glow(img, center_x, title_y + title_height // 2, 
+                             "OVER FLOW", '#ffffff', font_title,
+                             glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
         
         # 绘制 Overflow 记录卡片（3列，严格显示3首）
         card_start_y = title_y + title_height + 10  # 减小间距
@@ -1327,8 +1389,8 @@ class PhiStyleRenderer:
         """绘制底部（带发光效果）"""
         text = "phigros插件——飞翔的死猪提供技术支持"
         font = self._get_font(16, bold=False)
-        self._draw_text_with_glow(img, self.WIDTH // 2, y, text, '#aaaaaa', font,
-                                  glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+        draw_text_with_glow(img, self.WIDTH // 2, y, text, '#aaaaaa', font,
+                             glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
     
     async def render_score(self, data: Dict[str, Any], output_path: Path) -> bool:
         """渲染单曲成绩图"""
@@ -1447,8 +1509,7 @@ class PhiStyleRenderer:
                     draw.line([(x1, y1), (x2, y2)], fill='#00b0f0', width=3)
             
             # 保存图片
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ RKS 历史趋势图渲染成功: {output_path}")
             return True
             
@@ -1495,9 +1556,9 @@ class PhiStyleRenderer:
             
             # 绘制标题
             font_title = self._get_font(36, bold=True)
-            self._draw_text_with_glow(img, self.WIDTH // 2, 60, 
-                                      "🏆 Phigros RKS 排行榜", 'white', font_title,
-                                      glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+            draw_text_with_glow(img, self.WIDTH // 2, 60, 
+                                 "🏆 Phigros RKS 排行榜", 'white', font_title,
+                                 glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
             
             # 绘制排行榜项
             y_offset = 120
@@ -1507,12 +1568,7 @@ class PhiStyleRenderer:
                 score = item.get('score', 0)
                 
                 # 排名颜色
-                rank_colors = {
-                    1: (255, 215, 0, 200),    # 金牌
-                    2: (192, 192, 192, 200),  # 银牌
-                    3: (205, 127, 50, 200)    # 铜牌
-                }
-                rank_color = rank_colors.get(rank, (100, 100, 100, 150))
+                rank_color = self.RANK_ROW_RGBA.get(rank, (100, 100, 100, 150))
                 
                 # 排名标签
                 draw.rectangle([60, y_offset, 120, y_offset + 50], fill=rank_color)
@@ -1526,12 +1582,12 @@ class PhiStyleRenderer:
                 
                 # 玩家信息
                 font_alias = self._get_font(26, bold=True)
-                self._draw_text_with_glow(img, 160, y_offset + 8, alias, 'white', font_alias,
-                                          glow_color=(100, 200, 255), glow_radius=2)
+                draw_text_with_glow(img, 160, y_offset + 8, alias, 'white', font_alias,
+                                     glow_color=(100, 200, 255), glow_radius=2)
                 
                 font_rks = self._get_font(22, bold=True)
-                self._draw_text_with_glow(img, 700, y_offset + 12, f"RKS: {score:.4f}", '#ffd700', font_rks,
-                                          glow_color=(255, 215, 0), glow_radius=2)
+                draw_text_with_glow(img, 700, y_offset + 12, f"RKS: {score:.4f}", '#ffd700', font_rks,
+                                     glow_color=(255, 215, 0), glow_radius=2)
                 
                 y_offset += 70
             
@@ -1540,8 +1596,7 @@ class PhiStyleRenderer:
             self._draw_footer(img, draw, footer_y)
             
             # 保存图片
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 排行榜渲染成功: {output_path}")
             return True
             
@@ -1567,7 +1622,7 @@ class PhiStyleRenderer:
             
             # 创建图片
             img = Image.new('RGBA', (self.WIDTH, total_height), 
-                          self._hex_to_rgb(self.COLORS['bg']))
+                          self.COLORS_RGB['bg'])
             
             # 加载并绘制背景图片
             bg_img = self._get_background_image(total_height)
@@ -1579,9 +1634,9 @@ class PhiStyleRenderer:
             
             # 绘制标题
             font_title = self._get_font(36, bold=True)
-            self._draw_text_with_glow(img, self.WIDTH // 2, 80, 
-                                      "🎵 歌曲详情", '#ffffff', font_title,
-                                      glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+            draw_text_with_glow(img, self.WIDTH // 2, 80, 
+                                 "🎵 歌曲详情", '#ffffff', font_title,
+                                 glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
             
             # 曲绘区域
             illust_size = 300
@@ -1608,8 +1663,8 @@ class PhiStyleRenderer:
             
             # 歌曲名称
             font_song_name = self._get_font(32, bold=True)
-            self._draw_text_with_glow(img, info_x, info_y, song_name, '#ffffff', font_song_name,
-                                      glow_color=(100, 200, 255), glow_radius=4)
+            draw_text_with_glow(img, info_x, info_y, song_name, '#ffffff', font_song_name,
+                                 glow_color=(100, 200, 255), glow_radius=4)
             
             # 作曲者
             font_composer = self._get_font(20)
@@ -1621,14 +1676,13 @@ class PhiStyleRenderer:
             constants_y = info_y + 100
             self._draw_text_safe(draw, (info_x, constants_y), '难度定数:', fill='#ffffff', font=font_constants)
             
-            diff_colors = {'ez': '#92d050', 'hd': '#00b0f0', 'in': '#ff0000', 'at': '#6e6e6e'}
             diff_x = info_x
             diff_y = constants_y + 35
-            for diff, color in diff_colors.items():
+            for diff in ('ez', 'hd', 'in', 'at'):
                 val = constants.get(diff)
                 if val is not None:
                     draw.rectangle([diff_x, diff_y, diff_x + 80, diff_y + 35],
-                                  fill=self._hex_to_rgb(color))
+                                  fill=self.COLORS_RGB[diff.upper()])
                     font_diff = self._get_font(16, bold=True)
                     self._draw_text_safe(draw, (diff_x + 40, diff_y + 17), 
                                        f'{diff.upper()}: {val}', fill='#ffffff', font=font_diff, anchor='mm')
@@ -1638,8 +1692,7 @@ class PhiStyleRenderer:
             self._draw_footer(img, draw, total_height - 40)
             
             # 保存图片
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 歌曲详情渲染成功: {output_path}")
             return True
             
@@ -1665,7 +1718,7 @@ class PhiStyleRenderer:
             
             # 创建图片
             img = Image.new('RGBA', (self.WIDTH, total_height), 
-                          self._hex_to_rgb(self.COLORS['bg']))
+                          self.COLORS_RGB['bg'])
             
             # 加载并绘制背景图片
             bg_img = self._get_background_image(total_height)
@@ -1686,22 +1739,21 @@ class PhiStyleRenderer:
             
             # RKS
             self._draw_text_safe(draw, (100, y_offset), '总 RKS:', fill='#aaaaaa', font=font_label)
-            self._draw_text_with_glow(img, 300, y_offset, f'{rks:.4f}', '#ffd700', font_value,
-                                      glow_color=(255, 215, 0), glow_radius=3, anchor='lm')
+            draw_text_with_glow(img, 300, y_offset, f'{rks:.4f}', '#ffd700', font_value,
+                                 glow_color=(255, 215, 0), glow_radius=3, anchor='lm')
             
             # 课题模式段位
             challenge_rank = game_progress.get('challengeModeRank', 0)
             y_offset += 50
             self._draw_text_safe(draw, (100, y_offset), '课题模式段位:', fill='#aaaaaa', font=font_label)
-            self._draw_text_with_glow(img, 300, y_offset, str(challenge_rank), '#00b0f0', font_value,
-                                      glow_color=(0, 176, 240), glow_radius=3, anchor='lm')
+            draw_text_with_glow(img, 300, y_offset, str(challenge_rank), '#00b0f0', font_value,
+                                 glow_color=(0, 176, 240), glow_radius=3, anchor='lm')
             
             # 绘制底部
             self._draw_footer(img, draw, total_height - 40)
             
             # 保存图片
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 存档数据渲染成功: {output_path}")
             return True
             
@@ -1729,7 +1781,7 @@ class PhiStyleRenderer:
             
             # 创建图片
             img = Image.new('RGBA', (self.WIDTH, total_height), 
-                          self._hex_to_rgb(self.COLORS['bg']))
+                          self.COLORS_RGB['bg'])
             
             # 加载并绘制背景图片
             bg_img = self._get_background_image(total_height)
@@ -1741,9 +1793,9 @@ class PhiStyleRenderer:
             
             # 绘制标题
             font_title = self._get_font(36, bold=True)
-            self._draw_text_with_glow(img, self.WIDTH // 2, 60, 
-                                      f"📊 排名 {start}-{end}", '#ffffff', font_title,
-                                      glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+            draw_text_with_glow(img, self.WIDTH // 2, 60, 
+                                 f"📊 排名 {start}-{end}", '#ffffff', font_title,
+                                 glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
             
             # 绘制排行榜项
             y_offset = 120
@@ -1753,12 +1805,7 @@ class PhiStyleRenderer:
                 score = item.get('score', 0)
                 
                 # 排名颜色
-                rank_colors = {
-                    1: (255, 215, 0, 200),
-                    2: (192, 192, 192, 200),
-                    3: (205, 127, 50, 200)
-                }
-                rank_color = rank_colors.get(rank, (100, 100, 100, 150))
+                rank_color = self.RANK_ROW_RGBA.get(rank, (100, 100, 100, 150))
                 
                 # 排名标签
                 draw.rectangle([60, y_offset, 120, y_offset + 50], fill=rank_color)
@@ -1772,12 +1819,12 @@ class PhiStyleRenderer:
                 
                 # 玩家信息
                 font_alias = self._get_font(26, bold=True)
-                self._draw_text_with_glow(img, 160, y_offset + 8, alias, 'white', font_alias,
-                                          glow_color=(100, 200, 255), glow_radius=2)
+                draw_text_with_glow(img, 160, y_offset + 8, alias, 'white', font_alias,
+                                     glow_color=(100, 200, 255), glow_radius=2)
                 
                 font_rks = self._get_font(22, bold=True)
-                self._draw_text_with_glow(img, 700, y_offset + 12, f"RKS: {score:.4f}", '#ffd700', font_rks,
-                                          glow_color=(255, 215, 0), glow_radius=2)
+                draw_text_with_glow(img, 700, y_offset + 12, f"RKS: {score:.4f}", '#ffd700', font_rks,
+                                     glow_color=(255, 215, 0), glow_radius=2)
                 
                 y_offset += 70
             
@@ -1786,8 +1833,7 @@ class PhiStyleRenderer:
             self._draw_footer(img, draw, footer_y)
             
             # 保存图片
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 排名区间查询渲染成功: {output_path}")
             return True
             
@@ -1813,7 +1859,7 @@ class PhiStyleRenderer:
             
             # 创建图片
             img = Image.new('RGBA', (self.WIDTH, total_height), 
-                          self._hex_to_rgb(self.COLORS['bg']))
+                          self.COLORS_RGB['bg'])
             
             # 加载并绘制背景图片
             bg_img = self._get_background_image(total_height)
@@ -1825,9 +1871,9 @@ class PhiStyleRenderer:
             
             # 绘制标题
             font_title = self._get_font(36, bold=True)
-            self._draw_text_with_glow(img, self.WIDTH // 2, 60, 
-                                      "🆕 Phigros 新曲速递", '#ffffff', font_title,
-                                      glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
+            draw_text_with_glow(img, self.WIDTH // 2, 60, 
+                                 "🆕 Phigros 新曲速递", '#ffffff', font_title,
+                                 glow_color=(100, 200, 255), glow_radius=6, anchor='mm')
             
             # 绘制更新信息
             y_offset = 120
@@ -1843,9 +1889,9 @@ class PhiStyleRenderer:
                 
                 # 版本和日期
                 font_version = self._get_font(28, bold=True)
-                self._draw_text_with_glow(img, 150, y_offset + 30, 
-                                          f"版本 {version}", '#ffd700', font_version,
-                                          glow_color=(255, 215, 0), glow_radius=3)
+                draw_text_with_glow(img, 150, y_offset + 30, 
+                                     f"版本 {version}", '#ffd700', font_version,
+                                     glow_color=(255, 215, 0), glow_radius=3)
                 
                 font_date = self._get_font(18)
                 self._draw_text_safe(draw, (150, y_offset + 70), 
@@ -1871,8 +1917,7 @@ class PhiStyleRenderer:
             self._draw_footer(img, draw, footer_y)
             
             # 保存图片
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, 'PNG', compress_level=1, optimize=False)
+            save_image(img, output_path, self.image_quality)
             logger.info(f"✅ 新曲速递渲染成功: {output_path}")
             return True
             
@@ -4,20 +4,77 @@ Phigros 数据渲染器（重构版）
 """
 
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import pickle
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 from astrbot.api import logger
 
 try:
-    from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+    from .utils import save_image
+except ImportError:
+    from utils import save_image
+
+try:
+    # Pillow-SIMD 与 Pillow 同名（均为 PIL），装了就会直接用上 SIMD 加速的缩放/模糊
+    import PIL
+    from PIL import Image, ImageDraw, ImageFont
 except ImportError as e:
-    raise ImportError(f"缺少依赖: {e}\n请运行: pip install Pillow")
+    raise ImportError(f"缺少依赖: {e}\n请运行: pip install Pillow（或更快的 pip install pillow-simd）")
+
+# Pillow-SIMD 的版本号带有 .postN 后缀
+PILLOW_SIMD = ".post" in PIL.__version__
+
+# 渲染子进程内常驻的渲染器实例（字体、曲绘、渐变等缓存在进程内复用）
+_worker_renderer: Optional["PhigrosRenderer"] = None
+
+
+def _init_render_worker(cache_dir: str, illustration_path: str, image_quality: int):
+    """渲染子进程初始化：创建常驻渲染器"""
+    global _worker_renderer
+    _worker_renderer = PhigrosRenderer(cache_dir, illustration_path, image_quality)
+
+
+def _render_in_worker(method_name: str, data: Dict[str, Any], output_path: str) -> str:
+    """在渲染子进程中执行指定的渲染方法（模块级函数，可被 pickle）"""
+    return asyncio.run(getattr(_worker_renderer, method_name)(data, output_path))
 
 
 class PhigrosRenderer:
     """Phigros 数据渲染器（模板引擎版）"""
 
+    # 曲绘卡片缓存上限
+    CARD_CACHE_SIZE = 200
+    # 渲染子进程数（每个子进程各有一份曲绘缓存和卡片缓存，常驻内存随之翻倍）
+    RENDER_WORKERS = 2
+    # 单次子进程渲染的等待上限（秒），超时视为子进程卡死，改为本进程渲染
+    RENDER_TIMEOUT = 60
+
+    # 难度颜色（存档卡片文字）
+    DIFF_COLORS = {
+        "EZ": (102, 204, 102, 255),
+        "HD": (102, 178, 255, 255),
+        "IN": (255, 102, 178, 255),
+        "AT": (178, 102, 255, 255)
+    }
+    # 难度标签名与底色（歌曲详情）
+    DIFF_TAG_NAMES = {"ez": "EZ", "hd": "HD", "in": "IN", "at": "AT"}
+    DIFF_TAG_COLORS = {
+        "ez": (102, 204, 102, 200),
+        "hd": (102, 178, 255, 200),
+        "in": (255, 102, 178, 200),
+        "at": (178, 102, 255, 200)
+    }
+    # 排行榜排名颜色
+    RANK_COLORS = {
+        1: (255, 215, 0, 200),    # 金牌
+        2: (192, 192, 192, 200),  # 银牌
+        3: (205, 127, 50, 200)    # 铜牌
+    }
+
     def __init__(self, cache_dir: str = "./cache", illustration_path: Optional[str] = None, image_quality: int = 95):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
@@ -35,14 +92,25 @@ class PhigrosRenderer:
         # 字体缓存
         self._font_cache: Dict[str, ImageFont.FreeTypeFont] = {}
         self._base_height = 1080  # 基准高度
+        # 字体文件只查找一次，之后各字号直接加载
+        self._font_file = self._resolve_font_file()
 
         # 曲绘缓存
         self._illustration_cache: Dict[str, Image.Image] = {}
-        self._illustration_map: Dict[str, str] = {}
+        self._illustration_map: Dict[str, Path] = {}
         self._build_illustration_map()
 
-        # 线程池用于 CPU 密集型渲染
-        self._executor = ThreadPoolExecutor(max_workers=2)
+        # 渐变背景缓存，键为 (尺寸, 起始色, 结束色)
+        self._gradient_cache: Dict[Tuple[Tuple[int, int], Tuple[int, int, int], Tuple[int, int, int]], Image.Image] = {}
+
+        # 圆角曲绘卡片缓存（LRU），键为 (song_key, 尺寸, 圆角半径)
+        self._card_cache: "OrderedDict[Tuple[str, Tuple[int, int], int], Image.Image]" = OrderedDict()
+
+        # 进程池用于 CPU 密集型渲染（绕开 GIL，不阻塞事件循环），首次渲染时创建
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._use_process_pool = True
+
+        logger.debug(f"Pillow {PIL.__version__}{' (SIMD)' if PILLOW_SIMD else ''}")
 
     def _build_illustration_map(self):
         """构建曲绘文件名映射"""
@@ -50,13 +118,12 @@ class PhigrosRenderer:
             return
             
         for file in self.illustration_path.glob("*.png"):
-            name = file.stem
-            self._illustration_map[name.lower()] = str(file)
+            name_lower = file.stem.lower()
+            self._illustration_map[name_lower] = file
             
             # 同时存储简化版本（只取曲名部分）
-            if "." in name:
-                song_name = name.split(".")[0].lower()
-                self._illustration_map[song_name] = str(file)
+            if "." in name_lower:
+                self._illustration_map[name_lower.split(".")[0]] = file
 
     async def initialize(self):
         """初始化渲染器"""
@@ -64,9 +131,13 @@ class PhigrosRenderer:
 
     async def terminate(self):
         """清理资源"""
-        self._executor.shutdown(wait=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
         # 清理曲绘缓存
         self._illustration_cache.clear()
+        self._card_cache.clear()
+        self._gradient_cache.clear()
 
     def _get_font(self, size: int, target_height: int = None) -> ImageFont.FreeTypeFont:
         """获取字体，根据目标高度按比例缩放"""
@@ -85,6 +156,16 @@ class PhigrosRenderer:
         if cache_key in self._font_cache:
             return self._font_cache[cache_key]
         
+        if self._font_file is None:
+            # 没有可用的系统字体，使用默认字体
+            return ImageFont.load_default()
+        
+        font = ImageFont.truetype(self._font_file, scaled_size)
+        self._font_cache[cache_key] = font
+        return font
+
+    def _resolve_font_file(self) -> Optional[str]:
+        """按优先级查找第一个可用的字体文件（只在初始化时调用一次）"""
         # 尝试加载系统字体（跨平台支持）
         font_paths = [
             # Windows 字体
@@ -113,36 +194,28 @@ class PhigrosRenderer:
         for font_path in font_paths:
             if Path(font_path).exists():
                 try:
-                    font = ImageFont.truetype(font_path, scaled_size)
-                    self._font_cache[cache_key] = font
-                    return font
+                    ImageFont.truetype(font_path, 12)
+                    return font_path
                 except Exception:
                     continue
         
-        # 使用默认字体
-        return ImageFont.load_default()
+        return None
 
     def get_illustration(self, song_key: str) -> Optional[Image.Image]:
-        """获取歌曲曲绘"""
+        """获取歌曲曲绘（返回缓存中的对象，调用方不得原地修改）"""
         if song_key in self._illustration_cache:
-            return self._illustration_cache[song_key].copy()
+            return self._illustration_cache[song_key]
 
-        file_path = None
+        # 映射在扫描目录时建立，文件必然存在，无需再 stat
         key_lower = song_key.lower()
+        file_path = self._illustration_map.get(key_lower) or self._illustration_map.get(key_lower.split(".")[0])
 
-        if key_lower in self._illustration_map:
-            file_path = self._illustration_map[key_lower]
-        else:
-            song_name = key_lower.split(".")[0] if "." in key_lower else key_lower
-            if song_name in self._illustration_map:
-                file_path = self._illustration_map[song_name]
-
-        if file_path and Path(file_path).exists():
+        if file_path:
             try:
                 with Image.open(file_path) as img:
                     img = img.convert("RGBA")
-                    self._illustration_cache[song_key] = img.copy()
-                    return img.copy()
+                    self._illustration_cache[song_key] = img
+                    return img
             except Exception as e:
                 logger.warning(f"加载曲绘失败: {e}")
 
@@ -151,18 +224,30 @@ class PhigrosRenderer:
     def _create_gradient_background(self, size: Tuple[int, int], 
                                     color1: Tuple[int, int, int] = (30, 30, 50),
                                     color2: Tuple[int, int, int] = (70, 90, 130)) -> Image.Image:
-        """创建渐变背景"""
-        img = Image.new("RGBA", size, color1)
-        draw = ImageDraw.Draw(img)
-        
-        for y in range(size[1]):
-            ratio = y / size[1]
-            r = int(color1[0] + (color2[0] - color1[0]) * ratio)
-            g = int(color1[1] + (color2[1] - color1[1]) * ratio)
-            b = int(color1[2] + (color2[2] - color1[2]) * ratio)
-            draw.line([(0, y), (size[0], y)], fill=(r, g, b, 255))
-        
-        return img
+        """创建渐变背景
+
+        只计算一列（1×高度）的颜色，再用最近邻一次拉伸到整幅宽度。
+        各页面的尺寸和配色固定，生成结果按参数缓存，返回副本供调用方绘制。
+        背景本身不透明，直接生成 RGB，保存前无需再转换。
+        """
+        cache_key = (size, color1, color2)
+        cached = self._gradient_cache.get(cache_key)
+        if cached is not None:
+            return cached.copy()
+
+        width, height = size
+        column = bytearray()
+        for y in range(height):
+            ratio = y / height
+            column += bytes((
+                int(color1[0] + (color2[0] - color1[0]) * ratio),
+                int(color1[1] + (color2[1] - color1[1]) * ratio),
+                int(color1[2] + (color2[2] - color1[2]) * ratio),
+            ))
+        column_img = Image.frombytes("RGB", (1, height), bytes(column))
+        gradient = column_img.resize((width, height), Image.Resampling.NEAREST)
+        self._gradient_cache[cache_key] = gradient
+        return gradient.copy()
 
     def _create_rounded_rectangle(self, size: Tuple[int, int], radius: int, 
                                    color: Tuple[int, ...]) -> Image.Image:
@@ -174,12 +259,10 @@ class PhigrosRenderer:
 
     def _draw_text(self, draw: ImageDraw.Draw, text: str, pos: Tuple[int, int],
                    font_size: int, color: Tuple[int, ...] = (255, 255, 255, 255),
-                   target_height: int = None) -> Tuple[int, int]:
-        """绘制文字，返回文字尺寸"""
+                   target_height: int = None):
+        """绘制文字"""
         font = self._get_font(font_size, target_height)
         draw.text(pos, text, font=font, fill=color)
-        bbox = draw.textbbox((0, 0), text, font=font)
-        return bbox[2] - bbox[0], bbox[3] - bbox[1]
 
     def _draw_text_with_shadow(self, draw: ImageDraw.Draw, text: str, pos: Tuple[int, int],
                                 font_size: int, color: Tuple[int, ...] = (255, 255, 255, 255),
@@ -193,21 +276,22 @@ class PhigrosRenderer:
         # 文字
         draw.text((x, y), text, font=font, fill=color)
 
-    def _resize_illustration(self, img: Image.Image, size: Tuple[int, int]) -> Image.Image:
-        """调整曲绘大小，保持比例裁剪"""
+    def _resize_illustration(self, img: Image.Image, size: Tuple[int, int],
+                             resample: int = Image.Resampling.LANCZOS) -> Image.Image:
+        """调整曲绘大小，保持比例裁剪；要再模糊的背景可传 BILINEAR 省掉 LANCZOS 的开销"""
         img_ratio = img.width / img.height
         target_ratio = size[0] / size[1]
         
         if img_ratio > target_ratio:
             new_height = size[1]
             new_width = int(new_height * img_ratio)
-            img = img.resize((new_width, new_height), Image.LANCZOS)
+            img = img.resize((new_width, new_height), resample)
             left = (new_width - size[0]) // 2
             img = img.crop((left, 0, left + size[0], size[1]))
         else:
             new_width = size[0]
             new_height = int(new_width / img_ratio)
-            img = img.resize((new_width, new_height), Image.LANCZOS)
+            img = img.resize((new_width, new_height), resample)
             top = (new_height - size[1]) // 2
             img = img.crop((0, top, size[0], top + size[1]))
         
@@ -230,6 +314,57 @@ class PhigrosRenderer:
         
         return result
 
+    def get_illustration_card(self, song_key: str, size: Tuple[int, int],
+                              radius: int = 20) -> Optional[Image.Image]:
+        """获取带圆角的曲绘卡片（缓存成品，避免每次重新缩放和生成遮罩）
+
+        返回缓存中的对象，调用方不得原地修改。
+        """
+        cache_key = (song_key, size, radius)
+        card = self._card_cache.get(cache_key)
+        if card is not None:
+            self._card_cache.move_to_end(cache_key)
+            return card
+
+        illust = self.get_illustration(song_key)
+        if illust is None:
+            return None
+
+        card = self._create_illustration_card(illust, size, radius)
+        self._card_cache[cache_key] = card
+        if len(self._card_cache) > self.CARD_CACHE_SIZE:
+            self._card_cache.popitem(last=False)
+        return card
+
+    async def _render_in_process(self, method_name: str, data: Dict[str, Any], output_path: str) -> str:
+        """把渲染交给常驻子进程执行；进程池不可用或超时时退回当前进程渲染
+
+        子进程用 spawn 启动：fork 会复制 AstrBot 的事件循环、线程和网络会话，
+        子进程可能卡在 fork 时被其他线程持有的锁上（如 logging），且不会抛出 BrokenProcessPool。
+        """
+        if not self._use_process_pool:
+            return await getattr(self, method_name)(data, output_path)
+        try:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.RENDER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_render_worker,
+                    initargs=(str(self.cache_dir), str(self.illustration_path), self.image_quality)
+                )
+            loop = asyncio.get_running_loop()
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._executor, _render_in_worker, method_name, data, output_path),
+                timeout=self.RENDER_TIMEOUT
+            )
+        except (BrokenProcessPool, OSError, pickle.PicklingError, asyncio.TimeoutError) as e:
+            logger.warning(f"⚠️ 渲染子进程不可用，改为本进程渲染: {e!r}")
+            self._use_process_pool = False
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            return await getattr(self, method_name)(data, output_path)
+
     async def render_save_data(self, data: Dict[str, Any], output_path: str) -> str:
         """渲染用户存档数据（使用设计系统）"""
         try:
@@ -252,11 +387,11 @@ class PhigrosRenderer:
                 return output_path
             else:
                 # 渲染失败，回退到默认渲染
-                return await self._render_save_data_fallback(data, output_path)
+                return await self._render_in_process("_render_save_data_fallback", data, output_path)
                 
         except Exception as e:
             # 设计系统不可用，回退到默认渲染
-            return await self._render_save_data_fallback(data, output_path)
+            return await self._render_in_process("_render_save_data_fallback", data, output_path)
     
     async def _render_save_data_fallback(self, data: Dict[str, Any], output_path: str) -> str:
         """渲染用户存档数据（回退版本）"""
@@ -285,16 +420,37 @@ class PhigrosRenderer:
         font_song = self._get_font(22)
         font_detail = self._get_font(18)
         
-        # 绘制标题栏 - 更紧凑
-        title_bar = self._create_rounded_rectangle((1860, 70), 15, (0, 0, 0, 200))
-        canvas.paste(title_bar, (30, 20), title_bar)
-        self._draw_text_with_shadow(draw, "Phigros 存档数据", (50, 35), 48, target_height=None)
-        
-        # 玩家信息卡片 - 更紧凑
-        info_card = self._create_rounded_rectangle((400, 140), 15, (0, 0, 0, 180))
-        canvas.paste(info_card, (30, 100), info_card)
+        # 成绩卡片区域 - 更紧凑的布局
+        y_offset = 300
+        x_positions = [30, 330, 630, 930, 1230, 1530]
         
-        # RKS 信息
+        # 先计算每张卡片的位置
+        cards: List[Tuple[str, List[Dict[str, Any]], int, int]] = []
+        for count, (song_key, records) in enumerate(list(game_record.items())[:24]):  # 显示更多
+            if count > 0 and count % 6 == 0:
+                y_offset += 280
+                if y_offset > 1000:
+                    break
+            cards.append((song_key, records, x_positions[count % 6], y_offset))
+        
+        # 所有半透明底板先直接画到一张透明图层上（互不重叠，无需混合），再一次性合成到画布
+        placeholder = self._create_rounded_rectangle((260, 170), 10, (50, 50, 70, 180))
+        card_layer = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+        layer_draw = ImageDraw.Draw(card_layer)
+        # 标题栏、玩家信息卡片 - 更紧凑
+        layer_draw.rounded_rectangle([30, 20, 30 + 1860, 20 + 70], radius=15, fill=(0, 0, 0, 200))
+        layer_draw.rounded_rectangle([30, 100, 30 + 400, 100 + 140], radius=15, fill=(0, 0, 0, 180))
+        for song_key, _, x_pos, y_offset in cards:
+            # 曲绘卡片背景 - 更小
+            layer_draw.rounded_rectangle([x_pos, y_offset, x_pos + 280, y_offset + 270],
+                                         radius=12, fill=(0, 0, 0, 140))
+            # 获取曲绘卡片（需要叠在卡片背景上，用 alpha 合成）
+            ill_card = self.get_illustration_card(song_key, (260, 170), 10) or placeholder
+            card_layer.alpha_composite(ill_card, (x_pos + 10, y_offset + 8))
+        canvas.paste(card_layer, (0, 0), card_layer)
+        
+        # 标题和 RKS 信息
+        self._draw_text_with_shadow(draw, "Phigros 存档数据", (50, 35), 48, target_height=None)
         self._draw_text_with_shadow(draw, f"RKS: {rks:.4f}", (45, 115), 32, target_height=None)
         self._draw_text_with_shadow(draw, f"Peak: {peak_rks:.4f}", (45, 155), 28, 
                                      color=(255, 215, 0, 255), target_height=None)
@@ -303,32 +459,9 @@ class PhigrosRenderer:
         # Best 成绩标题
         self._draw_text_with_shadow(draw, "Best 成绩", (30, 260), 32, target_height=None)
         
-        # 成绩卡片区域 - 更紧凑的布局
-        y_offset = 300
-        x_positions = [30, 330, 630, 930, 1230, 1530]
+        diff_colors = self.DIFF_COLORS
         
-        count = 0
-        for song_key, records in list(game_record.items())[:24]:  # 显示更多
-            if count > 0 and count % 6 == 0:
-                y_offset += 280
-                if y_offset > 1000:
-                    break
-            
-            x_pos = x_positions[count % 6]
-            
-            # 曲绘卡片背景 - 更小
-            card_bg = self._create_rounded_rectangle((280, 270), 12, (0, 0, 0, 140))
-            canvas.paste(card_bg, (x_pos, y_offset), card_bg)
-            
-            # 获取曲绘
-            illust = self.get_illustration(song_key)
-            if illust:
-                ill_card = self._create_illustration_card(illust, (260, 170), 10)
-                canvas.paste(ill_card, (x_pos + 10, y_offset + 8), ill_card)
-            else:
-                placeholder = self._create_rounded_rectangle((260, 170), 10, (50, 50, 70, 180))
-                canvas.paste(placeholder, (x_pos + 10, y_offset + 8), placeholder)
-            
+        for song_key, records, x_pos, y_offset in cards:
             # 歌曲信息
             record = records[0] if records else {}
             diff = record.get("difficulty", "?").upper()
@@ -339,13 +472,6 @@ class PhigrosRenderer:
             if len(song_name) > 8:
                 song_name = song_name[:7] + ".."
             
-            # 难度颜色
-            diff_colors = {
-                "EZ": (102, 204, 102, 255),
-                "HD": (102, 178, 255, 255),
-                "IN": (255, 102, 178, 255),
-                "AT": (178, 102, 255, 255)
-            }
             diff_color = diff_colors.get(diff, (200, 200, 200, 255))
             
             # 绘制信息 - 更紧凑
@@ -355,15 +481,16 @@ class PhigrosRenderer:
                                        18, color=diff_color, target_height=None)
             self._draw_text_with_shadow(draw, f"Acc: {acc:.2f}%", (x_pos + 12, y_offset + 240), 
                                        16, target_height=None)
-            
-            count += 1
         
         # 保存图片
-        canvas = canvas.convert("RGB")
-        canvas.save(output_path, "PNG", quality=self.image_quality)
+        save_image(canvas, output_path, self.image_quality)
         return output_path
 
     async def render_song_detail(self, song_data: Dict[str, Any], output_path: str) -> str:
+        """渲染歌曲详情（在渲染子进程中执行）"""
+        return await self._render_in_process("_render_song_detail", song_data, output_path)
+
+    async def _render_song_detail(self, song_data: Dict[str, Any], output_path: str) -> str:
         """渲染歌曲详情（重构版）"""
         img_width, img_height = 1200, 800
         
@@ -377,12 +504,16 @@ class PhigrosRenderer:
         illust = self.get_illustration(song_key) or self.get_illustration(song_name)
         
         if illust:
-            # 使用曲绘作为背景
-            bg = self._resize_illustration(illust, (img_width, img_height))
-            bg = bg.filter(ImageFilter.GaussianBlur(radius=30))
+            # 模糊/调暗只有这里用到，按需导入
+            from PIL import ImageEnhance, ImageFilter
+            # 使用曲绘作为背景：在 1/4 分辨率下模糊再放大，等效于原图 radius=30 的模糊
+            bg = self._resize_illustration(illust, (img_width // 4, img_height // 4),
+                                           resample=Image.Resampling.BILINEAR)
+            bg = bg.filter(ImageFilter.GaussianBlur(radius=8))
+            bg = bg.resize((img_width, img_height), Image.Resampling.BILINEAR)
             enhancer = ImageEnhance.Brightness(bg)
             bg = enhancer.enhance(0.3)
-            canvas = bg.convert("RGBA")
+            canvas = bg.convert("RGB")
         else:
             # 使用渐变背景
             canvas = self._create_gradient_background(
@@ -393,18 +524,30 @@ class PhigrosRenderer:
         
         draw = ImageDraw.Draw(canvas)
         
-        # 主卡片
-        card = self._create_rounded_rectangle((1100, 700), 30, (0, 0, 0, 180))
-        canvas.paste(card, (50, 50), card)
+        # 歌曲信息
+        x_info = 540
+        y_info = 120
+        
+        # 难度标签
+        diff_names = self.DIFF_TAG_NAMES
+        diff_colors = self.DIFF_TAG_COLORS
+        diff_tags = [(diff_key, diff_name, constants.get(diff_key))
+                     for diff_key, diff_name in diff_names.items() if constants.get(diff_key) is not None]
+        y_tags = y_info + 240
+        
+        # 主卡片直接画到透明图层上，曲绘和难度标签叠在主卡片上需要 alpha 合成，最后整体合成一次
+        card_layer = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+        ImageDraw.Draw(card_layer).rounded_rectangle([50, 50, 50 + 1100, 50 + 700], radius=30, fill=(0, 0, 0, 180))
         
         # 曲绘展示
         if illust:
             ill_card = self._create_illustration_card(illust, (400, 400), 25)
-            canvas.paste(ill_card, (100, 100), ill_card)
+            card_layer.alpha_composite(ill_card, (100, 100))
         
-        # 歌曲信息
-        x_info = 540
-        y_info = 120
+        for i, (diff_key, _, _) in enumerate(diff_tags):
+            tag_bg = self._create_rounded_rectangle((100, 45), 10, diff_colors[diff_key])
+            card_layer.alpha_composite(tag_bg, (x_info + i * 120, y_tags))
+        canvas.paste(card_layer, (0, 0), card_layer)
         
         self._draw_text_with_shadow(draw, song_name, (x_info, y_info), 48, target_height=img_height)
         y_info += 70
@@ -415,30 +558,20 @@ class PhigrosRenderer:
         self._draw_text_with_shadow(draw, "谱面定数:", (x_info, y_info), 28, target_height=img_height)
         y_info += 50
         
-        # 难度标签
-        diff_names = {"ez": "EZ", "hd": "HD", "in": "IN", "at": "AT"}
-        diff_colors = {
-            "ez": (102, 204, 102, 200),
-            "hd": (102, 178, 255, 200),
-            "in": (255, 102, 178, 200),
-            "at": (178, 102, 255, 200)
-        }
-        
         x_diff = x_info
-        for diff_key, diff_name in diff_names.items():
-            val = constants.get(diff_key)
-            if val is not None:
-                tag_bg = self._create_rounded_rectangle((100, 45), 10, diff_colors[diff_key])
-                canvas.paste(tag_bg, (x_diff, y_info), tag_bg)
-                self._draw_text(draw, f"{diff_name}: {val}", (x_diff + 10, y_info + 8), 
-                               20, target_height=img_height)
-                x_diff += 120
-        
-        canvas = canvas.convert("RGB")
-        canvas.save(output_path, "PNG", quality=self.image_quality)
+        for _, diff_name, val in diff_tags:
+            self._draw_text(draw, f"{diff_name}: {val}", (x_diff + 10, y_info + 8), 
+                           20, target_height=img_height)
+            x_diff += 120
+        
+        save_image(canvas, output_path, self.image_quality)
         return output_path
 
     async def render_leaderboard(self, data: Dict[str, Any], output_path: str) -> str:
+        """渲染排行榜（在渲染子进程中执行）"""
+        return await self._render_in_process("_render_leaderboard", data, output_path)
+
+    async def _render_leaderboard(self, data: Dict[str, Any], output_path: str) -> str:
         """渲染排行榜（重构版）"""
         img_width, img_height = 1920, 1080
         
@@ -450,38 +583,37 @@ class PhigrosRenderer:
         )
         draw = ImageDraw.Draw(canvas)
         
-        items = data.get("items", [])
+        items = data.get("items", [])[:15]
+        
+        rank_colors = self.RANK_COLORS
+        
+        # 标题栏、排名标签和玩家卡片互不重叠：直接画到透明图层上，再一次性合成到画布
+        card_layer = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+        layer_draw = ImageDraw.Draw(card_layer)
+        layer_draw.rounded_rectangle([60, 40, 60 + 1800, 40 + 80], radius=20, fill=(0, 0, 0, 180))
+        y_offset = 140
+        for item in items:
+            rank_color = rank_colors.get(item.get("rank", 0), (100, 100, 100, 150))
+            layer_draw.rounded_rectangle([60, y_offset, 60 + 60, y_offset + 50], radius=12, fill=rank_color)
+            layer_draw.rounded_rectangle([140, y_offset - 2, 140 + 900, y_offset - 2 + 55],
+                                         radius=15, fill=(0, 0, 0, 130))
+            y_offset += 70
+        canvas.paste(card_layer, (0, 0), card_layer)
         
         # 标题
-        title_bar = self._create_rounded_rectangle((1800, 80), 20, (0, 0, 0, 180))
-        canvas.paste(title_bar, (60, 40), title_bar)
         self._draw_text_with_shadow(draw, "🏆 Phigros RKS 排行榜", (90, 55), 40, target_height=img_height)
         
         # 绘制排行榜项
         y_offset = 140
-        for i, item in enumerate(items[:15]):
+        for item in items:
             rank = item.get("rank", 0)
             alias = item.get("alias", "未知")
             score = item.get("score", 0)
             
-            # 排名颜色
-            rank_colors = {
-                1: (255, 215, 0, 200),    # 金牌
-                2: (192, 192, 192, 200),  # 银牌
-                3: (205, 127, 50, 200)    # 铜牌
-            }
-            rank_color = rank_colors.get(rank, (100, 100, 100, 150))
-            
             # 排名标签
-            rank_bg = self._create_rounded_rectangle((60, 50), 12, rank_color)
-            canvas.paste(rank_bg, (60, y_offset), rank_bg)
             self._draw_text(draw, str(rank), (75, y_offset + 8), 24, 
                            color=(0, 0, 0, 255), target_height=img_height)
             
-            # 玩家卡片
-            card = self._create_rounded_rectangle((900, 55), 15, (0, 0, 0, 130))
-            canvas.paste(card, (140, y_offset - 2), card)
-            
             # 玩家信息
             self._draw_text_with_shadow(draw, alias, (160, y_offset + 8), 26, target_height=img_height)
             self._draw_text_with_shadow(draw, f"RKS: {score:.4f}", (700, y_offset + 12), 
@@ -489,6 +621,5 @@ class PhigrosRenderer:
             
             y_offset += 70
         
-        canvas = canvas.convert("RGB")
-        canvas.save(output_path, "PNG", quality=self.image_quality)
+        save_image(canvas, output_path, self.image_quality)
         return output_path
@@ -4,10 +4,24 @@
 支持国服和国际服
 """
 import base64
+import json
+from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional, Tuple
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import unpad
+
+try:
+    from ciso8601 import parse_datetime as _parse_datetime  # C 扩展，可选
+except ImportError:
+    def _parse_datetime(value: str) -> datetime:
+        # Python < 3.11 的 fromisoformat 不认识 "Z" 后缀
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        return datetime.fromisoformat(value)
+
+# 存档更新时间的展示格式
+_UPDATED_AT_FMT = "%Y %b.%d %H:%M:%S"
 
 
 class SaveManager:
@@ -21,14 +35,25 @@ class SaveManager:
     # AES 密钥和 IV（从 JavaScript Buffer 转换，负数转为无符号字节）
     KEY = bytes([232, 150, 154, 210, 165, 64, 37, 155, 151, 145, 144, 139, 136, 230, 191, 3, 30, 109, 33, 149, 110, 250, 214, 138, 80, 221, 85, 214, 122, 176, 146, 75])
     IV = bytes([42, 79, 240, 138, 200, 13, 99, 7, 0, 87, 197, 149, 24, 200, 50, 83])
+    BLOCK_SIZE = 16
+    DECRYPT_CHUNK_SIZE = 64 * 1024
     
     def __init__(self):
         self.session = requests.Session()
+        # 复用连接（keep-alive），并对连接失败/网关错误做有限次退避重试
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+        )
+        self.session.mount("https://", adapter)
         self.session.headers.update({
             "X-LC-Id": self.CLIENT_ID,
             "X-LC-Key": self.CLIENT_KEY,
             "User-Agent": "LeanCloud-CSharp-SDK/1.0.3",
-            "Accept": "application/json"
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive"
         })
     
     def _make_request(self, method: str, endpoint: str, session_token: str = None, data: Dict = None) -> Dict:
@@ -84,7 +109,6 @@ class SaveManager:
             summary = item.get("summary", {})
             if isinstance(summary, str):
                 try:
-                    import json
                     summary = json.loads(summary)
                 except:
                     summary = {}
@@ -97,9 +121,7 @@ class SaveManager:
             updated_at = item.get("updatedAt", "")
             if updated_at:
                 try:
-                    from datetime import datetime
-                    dt = datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
-                    item["updatedAt"] = dt.strftime("%Y %b.%d %H:%M:%S")
+                    item["updatedAt"] = _parse_datetime(updated_at).strftime(_UPDATED_AT_FMT)
                 except:
                     pass
             
@@ -119,23 +141,41 @@ class SaveManager:
             data: 加密的数据（base64 编码）
             
         Returns:
-            解密后的数据
+            解密后的数据（bytearray，可直接交给 io.BytesIO / zipfile）
         """
+        # 加解密依赖只在处理存档时导入，不拖慢插件启动
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+        
         try:
             # 如果输入是 base64 字符串，先解码
             if isinstance(data, str):
                 data = base64.b64decode(data)
             
-            cipher = AES.new(self.KEY, AES.MODE_CBC, self.IV)
-            decrypted = cipher.decrypt(data)
+            # cryptography 走 OpenSSL 的 AES-NI 硬件加速；
+            # 分块 update_into 写入预分配缓冲区，避免多份完整副本
+            decryptor = Cipher(algorithms.AES(self.KEY), modes.CBC(self.IV)).decryptor()
+            view = memoryview(data)
+            out = bytearray(len(data) + self.BLOCK_SIZE - 1)
+            out_view = memoryview(out)
+            written = 0
+            for start in range(0, len(view), self.DECRYPT_CHUNK_SIZE):
+                chunk = view[start:start + self.DECRYPT_CHUNK_SIZE]
+                written += decryptor.update_into(chunk, out_view[written:])
+            # CBC 无填充模式下 finalize 通常返回空；若有剩余输出也要拷进缓冲区，保证长度和填充检查正确
+            tail = decryptor.finalize()
+            out_view[written:written + len(tail)] = tail
+            written += len(tail)
+            out_view.release()
             
-            # 去除 PKCS7 填充
-            try:
-                decrypted = unpad(decrypted, AES.block_size)
-            except:
-                pass  # 可能没有填充
+            # 去除 PKCS7 填充（只检查末尾块，可能没有填充）
+            if written:
+                pad_len = out[written - 1]
+                if (1 <= pad_len <= self.BLOCK_SIZE and pad_len <= written
+                        and out[written - pad_len:written] == bytes([pad_len]) * pad_len):
+                    written -= pad_len
+            del out[written:]
             
-            return decrypted
+            return out
         except Exception as e:
             raise Exception(f"解密失败: {str(e)}")
     
@@ -149,12 +189,15 @@ class SaveManager:
         Returns:
             加密后的数据
         """
+        from cryptography.hazmat.primitives import padding
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+        
         try:
-            from Crypto.Util.Padding import pad
+            padder = padding.PKCS7(algorithms.AES.block_size).padder()
+            padded_data = padder.update(data) + padder.finalize()
             
-            cipher = AES.new(self.KEY, AES.MODE_CBC, self.IV)
-            padded_data = pad(data, AES.block_size)
-            encrypted = cipher.encrypt(padded_data)
+            encryptor = Cipher(algorithms.AES(self.KEY), modes.CBC(self.IV)).encryptor()
+            encrypted = encryptor.update(padded_data) + encryptor.finalize()
             
             return encrypted
         except Exception as e:
@@ -7,44 +7,306 @@
 还能自动加载本地曲绘，超方便的！
 """
 
+import hashlib
 import io
+import json
+import math
+import mmap
+import os
+import pickle
+import queue
 import re
 import subprocess
+import threading
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import cached_property, lru_cache, partial
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any, List
+from urllib.parse import unquote
 from xml.etree import ElementTree as ET
 from astrbot.api import logger
 
 try:
+    # Pillow-SIMD 与 Pillow 同名（均为 PIL），装了就会直接用上 SIMD 加速的缩放/合成
+    import PIL
     from PIL import Image, ImageDraw, ImageFont
     PIL_AVAILABLE = True
+    # Pillow-SIMD 的版本号带有 .postN 后缀
+    PILLOW_SIMD = ".post" in PIL.__version__
+    # 按 (字体路径, 字号) 缓存已加载的字体，每个字号只加载一次
+    _cached_truetype = lru_cache(maxsize=128)(ImageFont.truetype)
 except ImportError:
     PIL_AVAILABLE = False
+    PILLOW_SIMD = False
+
+try:
+    # 可选：aggdraw（AGG 的 C++ 光栅化器），装了 path 就批量交给它画，自带抗锯齿
+    import aggdraw
+    AGGDRAW_AVAILABLE = True
+except ImportError:
+    AGGDRAW_AVAILABLE = False
+
+try:
+    # 可选：resvg-py（resvg 的 Python 绑定，Rust 实现，进程内渲染，不依赖 cairo/GTK）
+    import resvg_py
+    RESVG_AVAILABLE = True
+except ImportError:
+    RESVG_AVAILABLE = False
+
+
+# 批量转换子进程内的常驻转换器（每个进程只创建一次）
+_worker_converter: Optional["SVGConverter"] = None
+
+
+def _init_convert_worker(plugin_dir: Optional[str], illustration_path: Optional[str],
+                         illustration_map: Dict[str, str], resample_thresholds: Tuple[int, int]):
+    """批量转换子进程初始化：复用主进程已构建好的曲绘映射，不再重新扫描目录"""
+    global _worker_converter
+    _worker_converter = SVGConverter(plugin_dir=plugin_dir,
+                                     lanczos_threshold=resample_thresholds[0],
+                                     bilinear_threshold=resample_thresholds[1])
+    _worker_converter.illustration_path = Path(illustration_path) if illustration_path else None
+    _worker_converter._illustration_path_str = illustration_path
+    _worker_converter._illustration_map = illustration_map
+    # 进程池已经占满 CPU，子进程内不再开线程池
+    _worker_converter.RENDER_THREADS = 1
+
+
+def _worker_convert(job: Tuple[str, str, Optional[int], Optional[int]]) -> bool:
+    """在子进程中执行单个转换任务（模块级函数，可被 pickle）"""
+    svg_path, output_path, width, height = job
+    return _worker_converter.convert(svg_path, output_path, width, height)
+
+
+# path 命令处理函数：在 SVG 坐标下工作，state 为 [x, y, x 是否带偏移, y 是否带偏移, 点列表]
+# 绝对坐标会叠加 <g> 的偏移，从原点出发的相对坐标不会，用 0/1 标记，绘制时再统一换算到画布
+def _path_move_abs(state, args):
+    if len(args) >= 2:
+        state[0], state[1], state[2], state[3] = args[0], args[1], 1, 1
+        if not state[4]:
+            state[4].append(tuple(state[:4]))
+
+
+def _path_move_rel(state, args):
+    if len(args) >= 2:
+        state[0] += args[0]
+        state[1] += args[1]
+        if not state[4]:
+            state[4].append(tuple(state[:4]))
+
+
+def _path_line_abs(state, args):
+    if len(args) >= 2:
+        state[0], state[1], state[2], state[3] = args[0], args[1], 1, 1
+        state[4].append(tuple(state[:4]))
+
+
+def _path_line_rel(state, args):
+    if len(args) >= 2:
+        state[0] += args[0]
+        state[1] += args[1]
+        state[4].append(tuple(state[:4]))
+
+
+def _path_hline_abs(state, args):
+    if args:
+        state[0], state[2] = args[0], 1
+        state[4].append(tuple(state[:4]))
+
+
+def _path_hline_rel(state, args):
+    if args:
+        state[0] += args[0]
+        state[4].append(tuple(state[:4]))
+
+
+def _path_vline_abs(state, args):
+    if args:
+        state[1], state[3] = args[0], 1
+        state[4].append(tuple(state[:4]))
+
+
+def _path_vline_rel(state, args):
+    if args:
+        state[1] += args[0]
+        state[4].append(tuple(state[:4]))
+
+
+# 简化实现只处理直线类命令，曲线等其余命令忽略；Z/z 在 _compile_path 中单独处理
+_PATH_HANDLERS = {
+    'M': _path_move_abs,
+    'm': _path_move_rel,
+    'L': _path_line_abs,
+    'l': _path_line_rel,
+    'H': _path_hline_abs,
+    'h': _path_hline_rel,
+    'V': _path_vline_abs,
+    'v': _path_vline_rel,
+}
+
+# 各命令实际用到的参数个数（参数不足的命令与上面的处理函数一样视为无效）
+_PATH_ARG_COUNTS = {'M': 2, 'm': 2, 'L': 2, 'l': 2, 'H': 1, 'h': 1, 'V': 1, 'v': 1, 'Z': 0, 'z': 0}
+
+
+@lru_cache(maxsize=128)
+def _path_compiler(shape: str):
+    """为给定的命令序列（如 "MLLLZ"）生成专用的 path 编译函数
+
+    与 _PATH_HANDLERS 逐命令分派的结果完全一致，但各点的 bx/by 标记、点落在哪个子路径
+    在生成代码时就已确定，生成的函数只剩按顺序的加法和取参数。
+    参数为各命令实际用到的数字拼成的扁平序列，返回值同 SVGConverter._compile_path。
+    """
+    lines = []
+    x, y, bx, by = '0', '0', 0, 0
+    points: List[str] = []
+    subpaths: List[str] = []
+    i = 0
+    for n, cmd in enumerate(shape):
+        if cmd in 'Zz':
+            subpaths.append(f"(True, ({''.join(p + ', ' for p in points)}))")
+            points = []
+            continue
+        upper = cmd.upper()
+        if upper in 'ML':
+            if cmd == upper:
+                lines.append(f"x{n} = a[{i}]; y{n} = a[{i + 1}]")
+                bx = by = 1
+            else:
+                lines.append(f"x{n} = {x} + a[{i}]; y{n} = {y} + a[{i + 1}]")
+            x, y = f"x{n}", f"y{n}"
+            i += 2
+        elif upper == 'H':
+            lines.append(f"x{n} = a[{i}]" if cmd == upper else f"x{n} = {x} + a[{i}]")
+            x = f"x{n}"
+            bx = 1 if cmd == upper else bx
+            i += 1
+        else:
+            lines.append(f"y{n} = a[{i}]" if cmd == upper else f"y{n} = {y} + a[{i}]")
+            y = f"y{n}"
+            by = 1 if cmd == upper else by
+            i += 1
+        if upper != 'M' or not points:
+            points.append(f"({x}, {y}, {bx}, {by})")
+    subpaths.append(f"(False, ({''.join(p + ', ' for p in points)}))")
+
+    body = ''.join(f"    {line}\n" for line in lines)
+    source = f"def compiled(a):\n{body}    return ({''.join(s + ', ' for s in subpaths)})\n"
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, f"<path {shape}>", "exec"), namespace)
+    return namespace['compiled']
 
 
 class SVGConverter:
     """
     🎨 SVG 转换器 - 纯 Python 实现
     
-    支持 cairosvg → Inkscape → Pillow 三级回退
+    支持 cairosvg → resvg → rsvg-convert → Inkscape → Pillow 五级回退
     还能自动加载本地曲绘和背景图，超贴心的！
     """
 
     # SVG 命名空间
     SVG_NS = "http://www.w3.org/2000/svg"
 
-    def __init__(self, illustration_path: Optional[str] = None, plugin_dir: Optional[str] = None):
-        self.cairosvg_available = False
-        self.inkscape_available = False
-        self._check_availability()
-
-        # 曲绘路径
+    # 只定义样式、不直接渲染的元素（整棵子树跳过）
+    _SKIP_TAGS = frozenset(('defs', 'style', 'linearGradient', 'filter', 'stop'))
+    _TRANSLATE_RE = re.compile(r'translate\(([^,]+),?([^)]*)\)')
+    # path 的 d 属性扫描用字符集：命令字母、构成数字的字符
+    _PATH_CMD_CHARS = frozenset('MmLlHhVvCcSsQqTtAaZz')
+    _PATH_NUM_CHARS = frozenset('0123456789.')
+    # 命令数不超过该值的 path 使用按命令序列生成的专用编译函数
+    PATH_CODEGEN_MAX_COMMANDS = 32
+    # 长度值可带的单位（百分比单独处理）
+    _LENGTH_UNITS = ('px', 'pt', 'pc', 'cm', 'mm', 'in', 'em', 'ex')
+
+    # 背景遮罩 (0, 0, 0, 160) 叠加到不透明背景上，等价于 RGB 各通道乘以 95/255、alpha 不变
+    # （用于提高文字可读性；查表直接压暗，不再分配遮罩图层）
+    _OVERLAY_LUT = [(v * 95 + 127) // 255 for v in range(256)] * 3 + list(range(256))
+
+    # 颜色解析用的正则与常见颜色名
+    _RGB_RE = re.compile(r'rgb\((\d+),\s*(\d+),\s*(\d+)\)')
+    _RGBA_RE = re.compile(r'rgba\((\d+),\s*(\d+),\s*(\d+),\s*([\d.]+)\)')
+    _COLOR_MAP = {
+        'black': (0, 0, 0, 255),
+        'white': (255, 255, 255, 255),
+        'red': (255, 0, 0, 255),
+        'green': (0, 128, 0, 255),
+        'blue': (0, 0, 255, 255),
+        'yellow': (255, 255, 0, 255),
+        'cyan': (0, 255, 255, 255),
+        'magenta': (255, 0, 255, 255),
+        'silver': (192, 192, 192, 255),
+        'gray': (128, 128, 128, 255),
+        'grey': (128, 128, 128, 255),
+        'maroon': (128, 0, 0, 255),
+        'olive': (128, 128, 0, 255),
+        'lime': (0, 255, 0, 255),
+        'aqua': (0, 255, 255, 255),
+        'teal': (0, 128, 128, 255),
+        'navy': (0, 0, 128, 255),
+        'fuchsia': (255, 0, 255, 255),
+        'purple': (128, 0, 128, 255),
+    }
+
+    # 渲染结果缓存上限（条，每条是一整张 PNG）
+    RENDER_CACHE_SIZE = 8
+    # 原始曲绘的缓存上限（张）
+    ILLUSTRATION_CACHE_SIZE = 32
+    # 缩放后曲绘贴图的缓存上限（张）
+    ILLUST_TILE_CACHE_SIZE = 128
+    # 合成好的背景（缩放 + 遮罩）缓存上限（张）
+    BG_COMPOSITE_CACHE_SIZE = 8
+
+    # Inkscape --shell 单次命令的等待上限（秒）
+    INKSCAPE_SHELL_TIMEOUT = 30
+
+    # 批量转换时每次派发给子进程的任务数
+    CONVERT_MANY_CHUNKSIZE = 4
+    # Pillow 回退渲染时并行加载/缩放曲绘的线程数（1 为不开线程池）
+    RENDER_THREADS = os.cpu_count() or 1
+
+    # 插件目录下的扫描结果清单（目录未变化时跳过重新扫描）
+    ILLUSTRATION_MANIFEST = ".illustration_cache.json"
+    FONT_MANIFEST = ".font_cache.json"
+
+    def __init__(self, illustration_path: Optional[str] = None, plugin_dir: Optional[str] = None,
+                 lanczos_threshold: int = 256, bilinear_threshold: int = 96):
+        """
+        Args:
+            illustration_path: 曲绘文件夹路径（可选）
+            plugin_dir: 插件目录路径（可选，用于加载默认背景和字体）
+            lanczos_threshold: 曲绘缩放后边长不小于该值时使用 illustration_resample（默认 LANCZOS）
+            bilinear_threshold: 曲绘缩放后边长小于该值时使用 BILINEAR，介于两者之间用 BICUBIC
+        """
+        self.lanczos_threshold = lanczos_threshold
+        self.bilinear_threshold = bilinear_threshold
+        # 大尺寸曲绘的缩放滤镜：默认 LANCZOS，可用环境变量 PHIGROS_PILLOW_RESAMPLE_FILTER 改为 BICUBIC 等更快的滤镜
+        self.illustration_resample = self._resolve_resample_filter() if PIL_AVAILABLE else None
+        # 转换工具探测、曲绘映射、默认背景、字体均在首次使用时才加载（见对应的 cached_property）
+        # 常驻的 Inkscape --shell 进程（首次使用时启动），避免每次转换都重新加载 GTK
+        self._inkscape_proc: Optional[subprocess.Popen] = None
+        self._inkscape_output: Optional[queue.Queue] = None
+        self._inkscape_lock = threading.Lock()
+
+        # 渲染结果缓存（LRU），键为 (SVG 内容摘要, 宽, 高)，值为 PNG 字节
+        # 调用方每次都会重写 SVG 文件，所以按内容而不是按 mtime 判断是否相同
+        self._render_cache: "OrderedDict[Tuple[bytes, Optional[int], Optional[int]], bytes]" = OrderedDict()
+
+        # 曲绘路径（同时记下传入的原始字符串，get_converter 复用实例时先按字符串比较）
         self.illustration_path = Path(illustration_path) if illustration_path else None
-        self._illustration_map: Dict[str, str] = {}
-        self._illustration_cache: Dict[str, Image.Image] = {}
-        self._build_illustration_map()
+        self._illustration_path_str = illustration_path
+        # 原始曲绘缓存（LRU，容量有限，避免整套曲绘常驻内存）
+        self._illustration_cache: "OrderedDict[str, Image.Image]" = OrderedDict()
+        # 缩放好的曲绘贴图（LRU），键为 (song_key, 宽, 高, 是否 slice)
+        self._illust_tile_cache: "OrderedDict[Tuple[str, int, int, bool], Image.Image]" = OrderedDict()
+        # 曲绘解码/缩放的线程池（首次使用时创建），两个曲绘缓存由锁保护
+        self._render_pool: Optional[ThreadPoolExecutor] = None
+        self._illust_lock = threading.Lock()
 
         # 插件目录（用于查找默认背景）
+        self._plugin_dir_str = plugin_dir
         if plugin_dir:
             self.plugin_dir = Path(plugin_dir)
         else:
@@ -64,31 +326,45 @@ class SVGConverter:
 
         logger.info(f"插件目录设置为: {self.plugin_dir}")
 
-        # 加载默认背景
-        self._default_background: Optional[Image.Image] = None
-        self._load_default_background()
+        # 按输出尺寸缓存的背景合成结果（LRU），键为 (宽, 高)
+        self._bg_composite_cache: "OrderedDict[Tuple[int, int], Image.Image]" = OrderedDict()
 
-        # 字体缓存
-        self._font_cache: Dict[int, ImageFont.FreeTypeFont] = {}
-        self._load_fonts()
-    
-    def _check_availability(self):
-        """检查可用的转换工具"""
-        # 检查 cairosvg (需要实际测试是否能正常工作)
+        self._default_font: Optional[ImageFont.ImageFont] = None
+
+    @cached_property
+    def cairosvg_available(self) -> bool:
+        """cairosvg 是否可用（需要实际测试 cairo 库能否正常工作）"""
         try:
             import cairosvg
-            # 实际测试 cairosvg 是否能正常工作（cairo 库是否可用）
-            import io
             test_svg = b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>'
             cairosvg.svg2png(bytestring=test_svg, output_width=10, output_height=10)
-            self.cairosvg_available = True
             logger.info("SVG 转换: cairosvg 可用")
+            return True
         except ImportError:
             logger.debug("SVG 转换: cairosvg 未安装")
         except Exception as e:
             logger.debug(f"SVG 转换: cairosvg 已安装但无法使用 ({e})")
-        
-        # 检查 Inkscape
+        return False
+
+    @cached_property
+    def rsvg_available(self) -> bool:
+        """rsvg-convert（librsvg 命令行工具，原生渲染，比 Inkscape 启动快得多）是否可用"""
+        try:
+            result = subprocess.run(
+                ["rsvg-convert", "--version"],
+                capture_output=True,
+                timeout=5
+            )
+            if result.returncode == 0:
+                logger.info("SVG 转换: rsvg-convert 可用")
+                return True
+        except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
+            logger.debug("SVG 转换: rsvg-convert 未找到")
+        return False
+
+    @cached_property
+    def inkscape_available(self) -> bool:
+        """Inkscape 是否可用"""
         try:
             result = subprocess.run(
                 ["inkscape", "--version"],
@@ -96,50 +372,110 @@ class SVGConverter:
                 timeout=5
             )
             if result.returncode == 0:
-                self.inkscape_available = True
                 logger.info("SVG 转换: Inkscape 可用")
+                return True
         except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
             logger.debug("SVG 转换: Inkscape 未找到")
+        return False
 
-    def _build_illustration_map(self):
-        """构建曲绘文件名映射"""
-        if not self.illustration_path or not self.illustration_path.exists():
-            return
-
-        for file in self.illustration_path.glob("*.png"):
-            name = file.stem
-            # 存储完整文件名（小写）
-            self._illustration_map[name.lower()] = str(file)
-            # 同时存储简化版本（只取曲名部分）
-            if "." in name:
-                song_name = name.split(".")[0].lower()
-                self._illustration_map[song_name] = str(file)
-
-        logger.info(f"SVG 转换: 加载了 {len(self._illustration_map)} 个曲绘映射")
+    def _read_manifest(self, name: str) -> Optional[Dict[str, Any]]:
+        """读取插件目录下的扫描结果清单"""
+        try:
+            with open(self.plugin_dir / name, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else None
+        except (OSError, ValueError):
+            return None
 
-    def _load_default_background(self):
-        """加载默认背景图片"""
+    def _write_manifest(self, name: str, manifest: Dict[str, Any]):
+        """写入扫描结果清单（插件目录不可写时忽略）"""
+        try:
+            with open(self.plugin_dir / name, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+        except OSError as e:
+            logger.debug(f"SVG 转换: 写入清单 {name} 失败 ({e})")
+
+    @cached_property
+    def _illustration_map(self) -> Dict[str, str]:
+        """曲绘文件名映射（按曲绘目录的 mtime 缓存到清单文件）"""
+        illustration_map: Dict[str, str] = {}
+        if not self.illustration_path:
+            return illustration_map
+        try:
+            dir_mtime = os.stat(self.illustration_path).st_mtime_ns
+        except OSError:
+            return illustration_map
+
+        illustration_dir = str(self.illustration_path)
+        manifest = self._read_manifest(self.ILLUSTRATION_MANIFEST)
+        if (manifest and manifest.get('dir') == illustration_dir
+                and manifest.get('mtime_ns') == dir_mtime and isinstance(manifest.get('map'), dict)):
+            illustration_map = manifest['map']
+            logger.info(f"SVG 转换: 从清单加载了 {len(illustration_map)} 个曲绘映射")
+            return illustration_map
+
+        with os.scandir(illustration_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.png') or not entry.is_file():
+                    continue
+                name = entry.name[:-4]
+                # 存储完整文件名（小写）
+                illustration_map[name.lower()] = entry.path
+                # 同时存储简化版本（只取曲名部分）
+                if "." in name:
+                    song_name = name.split(".")[0].lower()
+                    illustration_map[song_name] = entry.path
+
+        self._write_manifest(self.ILLUSTRATION_MANIFEST,
+                             {'dir': illustration_dir, 'mtime_ns': dir_mtime, 'map': illustration_map})
+        logger.info(f"SVG 转换: 加载了 {len(illustration_map)} 个曲绘映射")
+        return illustration_map
+
+    def _reset_illustration_map(self):
+        """曲绘目录变更后清空映射、曲绘缓存及渲染结果缓存，下次使用时重新扫描"""
+        self.__dict__.pop('_illustration_map', None)
+        self._illustration_cache.clear()
+        self._illust_tile_cache.clear()
+        self._render_cache.clear()
+
+    @cached_property
+    def _default_background(self) -> Optional[Image.Image]:
+        """默认背景图片（加载时即已叠加遮罩压暗，之后每次合成都不必再处理）"""
         bg_path = self.plugin_dir / "default_wallpaper.jpg"
         logger.info(f"SVG 转换: 查找默认背景 {bg_path}")
         if bg_path.exists():
             try:
-                self._default_background = Image.open(bg_path).convert("RGBA")
-                logger.info(f"SVG 转换: 已加载默认背景 {bg_path.name}, 尺寸: {self._default_background.size}")
+                with Image.open(bg_path) as src:
+                    background = src.convert("RGBA").point(self._OVERLAY_LUT)
+                logger.info(f"SVG 转换: 已加载默认背景 {bg_path.name}, 尺寸: {background.size}")
+                return background
             except Exception as e:
                 logger.warning(f"加载默认背景失败: {e}")
         else:
             logger.warning(f"SVG 转换: 未找到默认背景 {bg_path}")
+        return None
 
-    def _load_fonts(self):
-        """加载字体"""
-        # 尝试加载插件目录下的字体
-        font_paths = [
+    def _reset_default_background(self):
+        """插件目录变更后清空默认背景、合成缓存及渲染结果缓存，下次使用时重新加载"""
+        self.__dict__.pop('_default_background', None)
+        self._bg_composite_cache.clear()
+        self._render_cache.clear()
+
+    def _plugin_font_candidates(self) -> List[Path]:
+        """插件目录下的候选字体路径"""
+        return [
             self.plugin_dir / "resources" / "font.ttf",
             self.plugin_dir / "resources" / "font.otf",
             self.plugin_dir / "font.ttf",
             self.plugin_dir / "font.otf",
         ]
 
+    @cached_property
+    def _font_paths(self) -> List[str]:
+        """可用的字体路径（插件目录优先，其次系统字体）"""
+        # 尝试加载插件目录下的字体
+        font_paths = self._plugin_font_candidates()
+
         # 系统字体路径（跨平台支持）
         system_fonts = [
             # Windows 字体
@@ -169,52 +505,73 @@ class SVGConverter:
             "/Library/Fonts/Arial Unicode.ttf",
         ]
 
-        self._font_paths = []
+        found: List[str] = []
 
         # 检查插件目录字体
         for font_path in font_paths:
-            if font_path.exists():
-                self._font_paths.append(str(font_path))
+            if os.path.exists(font_path):
+                found.append(str(font_path))
                 logger.info(f"SVG 转换: 找到插件字体 {font_path.name}")
 
         # 检查系统字体
         for font_path in system_fonts:
-            if Path(font_path).exists():
-                self._font_paths.append(font_path)
-                logger.info(f"SVG 转换: 找到系统字体 {Path(font_path).name}")
+            if os.path.exists(font_path):
+                found.append(font_path)
+                logger.info(f"SVG 转换: 找到系统字体 {os.path.basename(font_path)}")
 
-        if not self._font_paths:
+        if not found:
             logger.warning("SVG 转换: 未找到任何字体，将使用默认字体")
         else:
-            logger.info(f"SVG 转换: 共找到 {len(self._font_paths)} 个字体")
-
-    def _get_font(self, size: int) -> ImageFont.FreeTypeFont:
-        """获取指定大小的字体"""
-        if size in self._font_cache:
-            return self._font_cache[size]
+            logger.info(f"SVG 转换: 共找到 {len(found)} 个字体")
+        return found
+
+    @cached_property
+    def _primary_font(self) -> Optional[str]:
+        """第一个能正常加载的字体，之后各字号都直接用它（结果记录在清单文件中）"""
+        # 插件字体增删后清单失效（插件字体优先于系统字体）
+        key = {'plugin_fonts': [str(p) for p in self._plugin_font_candidates() if os.path.exists(p)]}
+        manifest = self._read_manifest(self.FONT_MANIFEST)
+        if manifest and manifest.get('key') == key:
+            font_path = manifest.get('font')
+            if font_path and os.path.isfile(font_path):
+                return font_path
 
-        # 尝试加载可用字体
         for font_path in self._font_paths:
             try:
-                font = ImageFont.truetype(font_path, size)
-                self._font_cache[size] = font
-                return font
-            except:
+                _cached_truetype(font_path, 16)
+            except Exception:
                 continue
+            self._write_manifest(self.FONT_MANIFEST, {'key': key, 'font': font_path})
+            return font_path
+        return None
+
+    def _reset_fonts(self):
+        """插件目录变更后清空字体查找结果及渲染结果缓存，下次使用时重新查找"""
+        self.__dict__.pop('_font_paths', None)
+        self.__dict__.pop('_primary_font', None)
+        self._render_cache.clear()
+
+    def _get_font(self, size: int) -> ImageFont.FreeTypeFont:
+        """获取指定大小的字体"""
+        if self._primary_font:
+            return _cached_truetype(self._primary_font, size)
 
         # 使用默认字体
-        font = ImageFont.load_default()
-        self._font_cache[size] = font
-        return font
+        if self._default_font is None:
+            self._default_font = ImageFont.load_default()
+        return self._default_font
 
     def _get_illustration(self, song_key: str) -> Optional[Image.Image]:
-        """获取曲绘图片"""
+        """获取曲绘图片（载入时统一转为 RGBA；返回缓存中的对象，调用方需要修改时自行 copy）"""
         if not song_key:
             return None
 
         # 检查缓存
-        if song_key in self._illustration_cache:
-            return self._illustration_cache[song_key].copy()
+        with self._illust_lock:
+            img = self._illustration_cache.get(song_key)
+            if img is not None:
+                self._illustration_cache.move_to_end(song_key)
+                return img
 
         # 查找曲绘文件
         key_lower = song_key.lower()
@@ -229,16 +586,22 @@ class SVGConverter:
 
         if file_path and Path(file_path).exists():
             try:
-                img = Image.open(file_path).convert("RGBA")
-                self._illustration_cache[song_key] = img.copy()
+                with Image.open(file_path) as src:
+                    img = src.convert("RGBA")
+                with self._illust_lock:
+                    self._illustration_cache[song_key] = img
+                    if len(self._illustration_cache) > self.ILLUSTRATION_CACHE_SIZE:
+                        self._illustration_cache.popitem(last=False)
                 return img
             except Exception as e:
                 logger.warning(f"加载曲绘失败 {file_path}: {e}")
 
         return None
 
-    def _extract_song_key_from_url(self, url: str) -> Optional[str]:
-        """从 URL 中提取歌曲 key"""
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _extract_song_key_from_url(url: str) -> Optional[str]:
+        """从 URL 中提取歌曲 key（同一 URL 在 BestN 中反复出现，结果缓存）"""
         # URL 格式: https://somnia.xtower.site/illustrationBlur/SpeedUp.DarTokki.png
         # 或: https://somnia.xtower.site/illustration/SpeedUp.DarTokki.png
         try:
@@ -248,8 +611,7 @@ class SVGConverter:
             if filename.endswith(".png"):
                 filename = filename[:-4]
             # URL 解码（处理中文歌曲名）
-            import urllib.parse
-            filename = urllib.parse.unquote(filename)
+            filename = unquote(filename)
             return filename
         except:
             return None
@@ -260,8 +622,9 @@ class SVGConverter:
 
         优先级:
         1. cairosvg (如果可用)
-        2. Inkscape (如果可用)
-        3. 纯 Python 实现 (Pillow)
+        2. rsvg-convert (如果可用)
+        3. Inkscape (如果可用)
+        4. 纯 Python 实现 (Pillow)
 
         Args:
             svg_path: SVG 文件路径
@@ -276,42 +639,124 @@ class SVGConverter:
         output_path = Path(output_path)
 
         # 打印调试信息
-        logger.info(f"SVG转换开始: plugin_dir={self.plugin_dir}, background={self._default_background is not None}")
+        logger.info(f"SVG转换开始: plugin_dir={self.plugin_dir}")
 
-        if not svg_path.exists():
+        # SVG 只读一次：同一份内容既用于计算缓存键，也直接交给 cairosvg / Inkscape / Pillow
+        try:
+            svg_data = self._read_svg_bytes(svg_path)
+        except OSError:
             logger.error(f"SVG 文件不存在: {svg_path}")
             return False
-        
+
+        # 内容相同的 SVG 以相同尺寸重复转换时，直接写出缓存的 PNG
+        cache_key = (hashlib.blake2b(svg_data, digest_size=16).digest(), width, height)
+        cached = self._render_cache.get(cache_key)
+        if cached is not None:
+            self._render_cache.move_to_end(cache_key)
+            output_path.write_bytes(cached)
+            logger.info(f"SVG 转换命中缓存: {output_path}")
+            return True
+
+        if self._convert_uncached(svg_path, svg_data, output_path, width, height):
+            self._render_cache[cache_key] = output_path.read_bytes()
+            if len(self._render_cache) > self.RENDER_CACHE_SIZE:
+                self._render_cache.popitem(last=False)
+            return True
+        return False
+
+    def convert_many(self, jobs: List[Tuple[str, str, Optional[int], Optional[int]]]) -> List[bool]:
+        """
+        批量转换多个 SVG（多进程并行）
+
+        Args:
+            jobs: (SVG 路径, 输出路径, 宽, 高) 组成的任务列表
+
+        Returns:
+            List[bool]: 与 jobs 一一对应的转换结果
+        """
+        jobs = [tuple(job) for job in jobs]
+        if len(jobs) <= 1:
+            return [self.convert(*job) for job in jobs]
+
+        workers = min(len(jobs), os.cpu_count() or 1)
+        illustration_path = str(self.illustration_path) if self.illustration_path else None
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_convert_worker,
+                initargs=(str(self.plugin_dir), illustration_path, self._illustration_map,
+                          (self.lanczos_threshold, self.bilinear_threshold))
+            ) as executor:
+                return list(executor.map(_worker_convert, jobs, chunksize=self.CONVERT_MANY_CHUNKSIZE))
+        except (BrokenProcessPool, OSError, pickle.PicklingError) as e:
+            logger.warning(f"⚠️ 批量转换子进程不可用，改为逐个转换: {e}")
+            return [self.convert(*job) for job in jobs]
+
+    def _convert_uncached(self, svg_path: Path, svg_data: bytes, output_path: Path,
+                          width: int = None, height: int = None) -> bool:
+        """按 cairosvg → resvg → rsvg-convert → Inkscape → Pillow 的顺序执行转换
+
+        svg_data 为 convert() 已读入的 SVG 内容，进程内渲染器直接使用，不再重复读文件。
+        """
         # 优先使用 cairosvg
         if self.cairosvg_available:
-            result = self._convert_with_cairosvg(svg_path, output_path, width, height)
+            result = self._convert_with_cairosvg(svg_path, svg_data, output_path, width, height)
             if result:
                 return True
             logger.warning("cairosvg 转换失败，尝试其他方式")
         
+        # 尝试 resvg（进程内渲染，无需启动外部程序）
+        if RESVG_AVAILABLE:
+            try:
+                return self._convert_with_resvg(svg_path, output_path, width, height)
+            except Exception as e:
+                logger.warning(f"resvg 转换失败: {e}")
+        
+        # 尝试 rsvg-convert
+        if self.rsvg_available:
+            try:
+                return self._convert_with_rsvg(svg_path, output_path, width, height)
+            except Exception as e:
+                logger.warning(f"rsvg-convert 转换失败: {e}")
+        
         # 尝试 Inkscape
         if self.inkscape_available:
             try:
-                return self._convert_with_inkscape(svg_path, output_path, width, height)
+                return self._convert_with_inkscape(svg_path, svg_data, output_path, width, height)
             except Exception as e:
                 logger.warning(f"Inkscape 转换失败: {e}")
         
-        # 使用纯 Python 实现
+        # 使用纯 Python 实现（最慢，仅在没有原生渲染器时使用）
         if PIL_AVAILABLE:
+            logger.debug("SVG 转换: 没有可用的原生渲染器，使用 Pillow 简化渲染")
             try:
-                return self._convert_with_pillow(svg_path, output_path, width, height)
+                return self._convert_with_pillow(svg_path, svg_data, output_path, width, height)
             except Exception as e:
                 logger.warning(f"Pillow 转换失败: {e}")
         
         logger.error("没有可用的 SVG 转换工具")
         return False
     
-    def _convert_with_cairosvg(self, svg_path: Path, output_path: Path, width: int = None, height: int = None) -> bool:
+    @staticmethod
+    def _read_svg_bytes(svg_path: Path) -> bytes:
+        """通过 mmap 一次性读入 SVG 内容（convert() 中每次转换只调用一次）"""
+        with open(svg_path, 'rb') as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return mm[:]
+            except ValueError:
+                # 空文件无法 mmap
+                return b''
+
+    def _convert_with_cairosvg(self, svg_path: Path, svg_data: bytes, output_path: Path,
+                               width: int = None, height: int = None) -> bool:
         """使用 cairosvg 转换"""
         try:
             import cairosvg
             
+            # 传入已读好的内容，url 仅作为相对资源的基准路径
             png_data = cairosvg.svg2png(
+                bytestring=svg_data,
                 url=str(svg_path),
                 output_width=width,
                 output_height=height
@@ -326,11 +771,150 @@ class SVGConverter:
             logger.warning(f"cairosvg 转换失败: {e}")
             return False
     
-    def _convert_with_inkscape(self, svg_path: Path, output_path: Path, width: int = None, height: int = None) -> bool:
-        """使用 Inkscape 转换"""
+    def _convert_with_resvg(self, svg_path: Path, output_path: Path, width: int = None, height: int = None) -> bool:
+        """使用 resvg-py 转换（相对资源按 SVG 所在目录解析，额外加载插件目录下的字体）"""
+        font_files = [str(path) for path in self._plugin_font_candidates() if os.path.exists(path)]
+        png_data = resvg_py.svg_to_bytes(
+            svg_path=str(svg_path),
+            width=width,
+            height=height,
+            resources_dir=str(svg_path.parent),
+            font_files=font_files or None,
+        )
+
+        with open(output_path, 'wb') as f:
+            f.write(png_data)
+
+        logger.info(f"resvg 转换成功: {output_path}")
+        return True
+
+    def _convert_with_rsvg(self, svg_path: Path, output_path: Path, width: int = None, height: int = None) -> bool:
+        """使用 rsvg-convert 转换"""
+        cmd = ["rsvg-convert", "--format", "png", "--output", str(output_path)]
+        
+        if width:
+            cmd.extend(["--width", str(width)])
+        if height:
+            cmd.extend(["--height", str(height)])
+        if width and not height or height and not width:
+            cmd.append("--keep-aspect-ratio")
+        cmd.append(str(svg_path))
+        
+        result = subprocess.run(cmd, capture_output=True, timeout=30)
+        
+        if result.returncode != 0:
+            raise Exception(f"rsvg-convert 错误: {result.stderr.decode(errors='replace')}")
+        
+        logger.info(f"rsvg-convert 转换成功: {output_path}")
+        return True
+
+    def _start_inkscape_shell(self):
+        """启动常驻的 Inkscape --shell 进程，并等待首个提示符"""
+        proc = subprocess.Popen(
+            ["inkscape", "--shell"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        output: queue.Queue = queue.Queue()
+
+        def _pump():
+            # 后台线程逐字符转发输出，主线程才能带超时地等待提示符
+            for char in iter(lambda: proc.stdout.read(1), ""):
+                output.put(char)
+            output.put(None)
+
+        threading.Thread(target=_pump, name="inkscape-shell-reader", daemon=True).start()
+        self._inkscape_proc = proc
+        self._inkscape_output = output
+        self._wait_inkscape_prompt()
+
+    def _wait_inkscape_prompt(self) -> str:
+        """读取 Inkscape shell 输出直到出现 "> " 提示符"""
+        buffer = []
+        while True:
+            try:
+                char = self._inkscape_output.get(timeout=self.INKSCAPE_SHELL_TIMEOUT)
+            except queue.Empty:
+                raise TimeoutError("Inkscape shell 响应超时")
+            if char is None:
+                raise RuntimeError("Inkscape shell 已退出")
+            buffer.append(char)
+            if char == " " and len(buffer) >= 2 and buffer[-2] == ">" and \
+                    (len(buffer) == 2 or buffer[-3] == "\n"):
+                return "".join(buffer[:-2])
+
+    def _stop_inkscape_shell(self):
+        """关闭常驻的 Inkscape shell 进程"""
+        proc, self._inkscape_proc = self._inkscape_proc, None
+        self._inkscape_output = None
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            proc.stdin.write("quit\n")
+            proc.stdin.flush()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+
+    def close(self):
+        """释放外部进程和线程池资源"""
+        with self._inkscape_lock:
+            self._stop_inkscape_shell()
+        if self._render_pool is not None:
+            self._render_pool.shutdown(wait=False)
+            self._render_pool = None
+
+    def _get_render_pool(self) -> Optional[ThreadPoolExecutor]:
+        """获取曲绘处理线程池（常驻复用，单核或 RENDER_THREADS 为 1 时返回 None）"""
+        if self.RENDER_THREADS <= 1:
+            return None
+        if self._render_pool is None:
+            self._render_pool = ThreadPoolExecutor(max_workers=self.RENDER_THREADS,
+                                                   thread_name_prefix="svg-illust")
+        return self._render_pool
+
+    def __del__(self):
+        try:
+            self._stop_inkscape_shell()
+        except Exception:
+            pass
+
+    def _convert_with_inkscape(self, svg_path: Path, svg_data: bytes, output_path: Path,
+                               width: int = None, height: int = None) -> bool:
+        """使用 Inkscape 转换
+
+        不指定尺寸时复用常驻的 --shell 进程（导出尺寸等选项在 shell 会话中会保留，
+        指定尺寸的转换仍走一次性进程）；shell 出错则回退到一次性进程。
+        """
+        paths = f"{svg_path}{output_path}"
+        if width is None and height is None and ";" not in paths and "\n" not in paths:
+            with self._inkscape_lock:
+                try:
+                    if self._inkscape_proc is None or self._inkscape_proc.poll() is not None:
+                        self._start_inkscape_shell()
+                    output_path.unlink(missing_ok=True)
+                    self._inkscape_proc.stdin.write(
+                        f"file-open:{svg_path}; export-type:png; export-filename:{output_path}; "
+                        f"export-do; file-close\n"
+                    )
+                    self._inkscape_proc.stdin.flush()
+                    self._wait_inkscape_prompt()
+                    if output_path.exists():
+                        logger.info(f"Inkscape 转换成功: {output_path}")
+                        return True
+                    logger.warning("Inkscape shell 未生成输出文件，改用一次性进程")
+                except Exception as e:
+                    logger.warning(f"Inkscape shell 不可用，改用一次性进程: {e}")
+                    self._stop_inkscape_shell()
+
+        # 一次性进程：SVG 内容经 stdin 传入（--pipe），不再让 Inkscape 自己读文件
         cmd = [
             "inkscape",
-            str(svg_path),
+            "--pipe",
             "--export-filename", str(output_path),
             "--export-type=png"
         ]
@@ -340,7 +924,7 @@ class SVGConverter:
         if height:
             cmd.extend(["--export-height", str(height)])
         
-        result = subprocess.run(cmd, capture_output=True, timeout=30)
+        result = subprocess.run(cmd, input=svg_data, capture_output=True, timeout=30)
         
         if result.returncode != 0:
             raise Exception(f"Inkscape 错误: {result.stderr.decode()}")
@@ -348,7 +932,8 @@ class SVGConverter:
         logger.info(f"Inkscape 转换成功: {output_path}")
         return True
     
-    def _convert_with_pillow(self, svg_path: Path, output_path: Path, width: int = None, height: int = None) -> bool:
+    def _convert_with_pillow(self, svg_path: Path, svg_data: bytes, output_path: Path,
+                             width: int = None, height: int = None) -> bool:
         """
         使用 Pillow 纯 Python 实现转换 SVG
         这是一个简化实现，支持基本的 SVG 元素
@@ -358,9 +943,9 @@ class SVGConverter:
         - 默认 n=30 时常见高度为 1644
         """
         try:
-            # 解析 SVG
-            tree = ET.parse(svg_path)
-            root = tree.getroot()
+            # 流式解析：根元素的 start 事件即可拿到尺寸，画布建好后边解析边绘制
+            events = ET.iterparse(io.BytesIO(svg_data), events=('start', 'end'))
+            _, root = next(events)
 
             # 获取 SVG 尺寸
             svg_width, svg_height = self._get_svg_size(root)
@@ -409,49 +994,13 @@ class SVGConverter:
             # 强制尝试加载背景（如果还没有加载）
             if self._default_background is None:
                 logger.info("背景未加载，强制尝试加载...")
-                self._load_default_background()
+                self._reset_default_background()
 
             # 创建图像（使用默认背景）
             logger.info(f"背景状态: _default_background={self._default_background is not None}")
             if self._default_background is not None:
                 logger.info("使用默认背景图")
-                
-                # 针对长图（如 BestN）优化背景处理
-                # 计算宽高比
-                output_ratio = output_height / output_width
-                bg_ratio = self._default_background.height / self._default_background.width
-                
-                if output_ratio > bg_ratio * 1.5:
-                    # 输出图比背景图更"长"，使用平铺或拉伸模式
-                    logger.info(f"📐 检测到长图（比例 {output_ratio:.2f}），优化背景处理")
-                    
-                    # 方法：先缩放背景宽度匹配，然后垂直平铺或拉伸
-                    bg_width = output_width
-                    bg_height = int(bg_width * bg_ratio)
-                    bg_scaled = self._default_background.resize((bg_width, bg_height), Image.Resampling.LANCZOS)
-                    
-                    # 创建目标尺寸的图像
-                    img = Image.new('RGBA', (output_width, output_height))
-                    
-                    # 垂直平铺背景
-                    y_offset = 0
-                    while y_offset < output_height:
-                        remaining_height = min(bg_height, output_height - y_offset)
-                        if remaining_height < bg_height:
-                            # 裁剪最后一行
-                            bg_crop = bg_scaled.crop((0, 0, bg_width, remaining_height))
-                            img.paste(bg_crop, (0, y_offset))
-                        else:
-                            img.paste(bg_scaled, (0, y_offset))
-                        y_offset += bg_height
-                else:
-                    # 正常比例，直接缩放
-                    bg_resized = self._default_background.resize((output_width, output_height), Image.Resampling.LANCZOS)
-                    img = bg_resized.copy()
-
-                # 添加半透明遮罩以提高文字可读性
-                overlay = Image.new('RGBA', (output_width, output_height), (0, 0, 0, 160))
-                img = Image.alpha_composite(img, overlay)
+                img = self._get_background_composite(output_width, output_height).copy()
             else:
                 logger.warning("背景图仍不可用，使用SVG背景色")
                 # 尝试获取 SVG 背景色
@@ -470,11 +1019,16 @@ class SVGConverter:
             scale_y = output_height / svg_height
 
             # 渲染 SVG 元素，传递原始 SVG 尺寸用于计算百分比
-            self._render_svg_element(root, draw, scale_x, scale_y, svg_width=svg_width, svg_height=svg_height)
+            self._render_svg_stream(events, root, draw, scale_x, scale_y, svg_width, svg_height)
 
             # 保存为 PNG
             img.save(output_path, 'PNG')
             logger.info(f"Pillow 转换成功: {output_path} ({output_width}x{output_height})")
+            logger.debug(
+                f"解析缓存命中: color={self._parse_color.cache_info()}, "
+                f"length={self._parse_length.cache_info()}, "
+                f"path={self._parse_path_commands.cache_info()}, font={_cached_truetype.cache_info()}"
+            )
             return True
 
         except Exception as e:
@@ -483,6 +1037,46 @@ class SVGConverter:
             logger.debug(f"转换失败详情: {traceback.format_exc()}")
             return False
     
+    def _get_background_composite(self, output_width: int, output_height: int) -> Image.Image:
+        """获取缩放（长图为平铺）后的默认背景（已压暗），按输出尺寸缓存
+
+        返回缓存中的对象，调用方需要在其上绘制时先 copy。
+        """
+        key = (output_width, output_height)
+        cached = self._bg_composite_cache.get(key)
+        if cached is not None:
+            self._bg_composite_cache.move_to_end(key)
+            return cached
+
+        # 针对长图（如 BestN）优化背景处理
+        # 计算宽高比
+        output_ratio = output_height / output_width
+        bg_ratio = self._default_background.height / self._default_background.width
+
+        if output_ratio > bg_ratio * 1.5:
+            # 输出图比背景图更"长"，使用平铺或拉伸模式
+            logger.info(f"📐 检测到长图（比例 {output_ratio:.2f}），优化背景处理")
+
+            # 方法：先缩放背景宽度匹配，然后垂直平铺或拉伸
+            bg_width = output_width
+            bg_height = max(1, int(bg_width * bg_ratio))
+            bg_scaled = self._default_background.resize((bg_width, bg_height), Image.Resampling.LANCZOS)
+
+            # 创建目标尺寸的图像
+            img = Image.new('RGBA', (output_width, output_height))
+
+            # 垂直平铺背景（超出画布的最后一块由 paste 自动裁掉，无需额外 crop）
+            for y_offset in range(0, output_height, bg_height):
+                img.paste(bg_scaled, (0, y_offset))
+        else:
+            # 正常比例，直接缩放
+            img = self._default_background.resize((output_width, output_height), Image.Resampling.LANCZOS)
+
+        self._bg_composite_cache[key] = img
+        if len(self._bg_composite_cache) > self.BG_COMPOSITE_CACHE_SIZE:
+            self._bg_composite_cache.popitem(last=False)
+        return img
+
     def _get_svg_size(self, root) -> Tuple[float, float]:
         """获取 SVG 尺寸"""
         width = root.get('width', '')
@@ -513,8 +1107,10 @@ class SVGConverter:
             
         return w, h
     
-    def _parse_length(self, value: str) -> float:
-        """解析长度值"""
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _parse_length(value: str) -> float:
+        """解析长度值（纯字符串函数，结果缓存）"""
         if not value:
             return 0
         # 移除单位
@@ -525,7 +1121,7 @@ class SVGConverter:
             return 0
         
         # 移除其他单位
-        for unit in ['px', 'pt', 'pc', 'cm', 'mm', 'in', 'em', 'ex']:
+        for unit in SVGConverter._LENGTH_UNITS:
             if value.endswith(unit):
                 value = value[:-len(unit)]
                 break
@@ -535,68 +1131,172 @@ class SVGConverter:
         except ValueError:
             return 0
 
-    def _render_svg_element(self, element, draw: ImageDraw.Draw, scale_x: float, scale_y: float,
-                           offset_x: float = 0, offset_y: float = 0, svg_width: float = 800, svg_height: float = 600):
-        """渲染 SVG 元素"""
-        tag = element.tag.split('}')[-1] if '}' in element.tag else element.tag
-
-        # 处理当前元素
-        if tag == 'rect':
-            self._draw_rect(element, draw, scale_x, scale_y, offset_x, offset_y, svg_width, svg_height)
-        elif tag == 'circle':
-            self._draw_circle(element, draw, scale_x, scale_y, offset_x, offset_y)
-        elif tag == 'ellipse':
-            self._draw_ellipse(element, draw, scale_x, scale_y, offset_x, offset_y)
-        elif tag == 'line':
-            self._draw_line(element, draw, scale_x, scale_y, offset_x, offset_y)
-        elif tag == 'polyline':
-            self._draw_polyline(element, draw, scale_x, scale_y, offset_x, offset_y)
-        elif tag == 'polygon':
-            self._draw_polygon(element, draw, scale_x, scale_y, offset_x, offset_y)
-        elif tag == 'path':
-            self._draw_path(element, draw, scale_x, scale_y, offset_x, offset_y)
-        elif tag == 'text':
-            self._draw_text(element, draw, scale_x, scale_y, offset_x, offset_y)
-        elif tag == 'image':
-            self._draw_image(element, draw, scale_x, scale_y, offset_x, offset_y, svg_width, svg_height)
-        elif tag == 'g':
-            # 处理组元素
-            transform = element.get('transform', '')
-            new_offset_x, new_offset_y = offset_x, offset_y
-
-            # 简单解析 translate
-            translate_match = re.search(r'translate\(([^,]+),?([^)]*)\)', transform)
-            if translate_match:
-                new_offset_x += float(translate_match.group(1)) * scale_x
-                if translate_match.group(2):
-                    new_offset_y += float(translate_match.group(2)) * scale_y
-
-            for child in element:
-                self._render_svg_element(child, draw, scale_x, scale_y, new_offset_x, new_offset_y, svg_width, svg_height)
-            return
-        elif tag in ['defs', 'style', 'linearGradient', 'filter', 'stop']:
-            # 跳过这些元素（它们定义样式但不直接渲染）
-            return
+    def _parse_num(self, value: str) -> float:
+        """解析数值属性：纯数字直接 float，带单位/百分比等再走 _parse_length"""
+        if value and (value[-1].isdigit() or value[-1] == '.'):
+            try:
+                return float(value)
+            except ValueError:
+                pass
+        return self._parse_length(value)
+
+    def _render_svg_stream(self, events, root, draw: ImageDraw.Draw, scale_x: float, scale_y: float,
+                           svg_width: float = 800, svg_height: float = 600):
+        """按 iterparse 事件流渲染 SVG 元素
+
+        图形元素在 start 事件（属性已完整）时按文档顺序绘制；<text> 需要子节点 tspan 的文字，
+        在 end 事件时绘制。<g> 的 translate 偏移用栈维护，处理完的元素立即清空并从父节点摘除，
+        内存占用只与嵌套深度相关。
+
+        开启线程池时，<image> 的曲绘加载/缩放提交到线程池并行执行，其后的绘制操作排队，
+        等前面的曲绘就绪后再按文档顺序依次落到画布上（画布本身只在当前线程绘制）。
+        """
+        # 标签 → 绘制方法，每次渲染只构建一次（rect/image 额外绑定画布尺寸）
+        dispatch = {
+            'rect': partial(self._draw_rect, svg_width=svg_width, svg_height=svg_height),
+            'circle': self._draw_circle,
+            'ellipse': self._draw_ellipse,
+            'line': self._draw_line,
+            'polyline': self._draw_polyline,
+            'polygon': self._draw_polygon,
+            'path': self._draw_path,
+            'image': partial(self._draw_image, svg_width=svg_width, svg_height=svg_height),
+        }
+        offset_stack: List[Tuple[float, float]] = [(0.0, 0.0)]
+        parents = [root]
+        skip_depth = 0   # 处于 defs/style 等不渲染的子树中
+        text_depth = 0   # 处于 <text> 内部（其子节点需保留到 text 结束）
+        # aggdraw 可用时，连续的 path 攒在同一个 aggdraw.Draw 里，遇到其它元素（或结束）时一次性 flush 回画布
+        agg = None
+        pool = self._get_render_pool()
+        prepare_image = partial(self._prepare_image, svg_width=svg_width, svg_height=svg_height)
+        # 等待落到画布上的绘制操作：(曲绘 future 或 None, 标签, 元素, offset_x, offset_y)
+        pending = deque()
+
+        def flush_paths():
+            nonlocal agg
+            if agg is not None:
+                agg.flush()
+                agg = None
+
+        def paint(tag, element, offset_x, offset_y):
+            nonlocal agg
+            if tag == 'path' and AGGDRAW_AVAILABLE:
+                if agg is None:
+                    agg = aggdraw.Draw(draw._image)
+                self._draw_path_agg(element, agg, scale_x, scale_y, offset_x, offset_y)
+                return
+            flush_paths()
+            if tag == 'text':
+                self._draw_text(element, draw, scale_x, scale_y, offset_x, offset_y)
+            else:
+                dispatch[tag](element, draw, scale_x, scale_y, offset_x, offset_y)
+
+        def drain(wait=False):
+            # 按顺序执行队首已就绪的操作，遇到尚未完成的曲绘就停下（wait 时阻塞等待）
+            while pending:
+                future, tag, element, offset_x, offset_y = pending[0]
+                if future is not None and not wait and not future.done():
+                    return
+                pending.popleft()
+                if future is None:
+                    paint(tag, element, offset_x, offset_y)
+                else:
+                    prepared = future.result()
+                    if prepared is not None:
+                        flush_paths()
+                        self._paste_image(draw, prepared)
+
+        for event, element in events:
+            if event == 'start':
+                # 去掉命名空间后写回，end 事件直接读取
+                tag = element.tag = element.tag.rpartition('}')[2]
+                parents.append(element)
+                offset_x, offset_y = offset_stack[-1]
+                if skip_depth or tag in self._SKIP_TAGS:
+                    skip_depth += 1
+                elif tag == 'g':
+                    # 简单解析 translate
+                    translate_match = self._TRANSLATE_RE.search(element.get('transform', ''))
+                    if translate_match:
+                        offset_x += float(translate_match.group(1)) * scale_x
+                        if translate_match.group(2):
+                            offset_y += float(translate_match.group(2)) * scale_y
+                elif tag == 'text':
+                    text_depth += 1
+                elif len(parents) == 2 and self._is_backdrop_rect(tag, element):
+                    # 根节点下的全屏不透明矩形只是 SVG 自带的底色，直接跳过以保留自定义背景
+                    logger.debug("跳过全屏背景矩形")
+                elif not text_depth and tag in dispatch:
+                    if pool is not None and tag == 'image':
+                        # 元素会在 end 事件时被清空，线程里读的是属性的副本
+                        future = pool.submit(prepare_image, dict(element.attrib),
+                                             scale_x, scale_y, offset_x, offset_y)
+                        pending.append((future, tag, None, offset_x, offset_y))
+                    elif pending:
+                        pending.append((None, tag, element, offset_x, offset_y))
+                    else:
+                        paint(tag, element, offset_x, offset_y)
+                    if pending:
+                        drain()
+                offset_stack.append((offset_x, offset_y))
+                continue
+
+            # end 事件
+            tag = element.tag
+            offset_x, offset_y = offset_stack.pop()
+            parents.pop()
+            if skip_depth:
+                skip_depth -= 1
+            elif tag == 'text':
+                text_depth -= 1
+                if pending:
+                    pending.append((None, tag, element, *offset_stack[-1]))
+                    drain()
+                else:
+                    paint(tag, element, *offset_stack[-1])
+
+            if not text_depth and parents:
+                # 仍在排队的元素要保留到绘制完成
+                if not pending:
+                    element.clear()
+                parents[-1].remove(element)
+
+        drain(wait=True)
+        flush_paths()
+
+    def _is_backdrop_rect(self, tag: str, element) -> bool:
+        """是否为 width/height 均为 100% 的不透明 <rect>（SVG 自带的全屏底色）"""
+        if tag != 'rect':
+            return False
+        a = element.attrib
+        if a.get('width') != '100%' or a.get('height') != '100%':
+            return False
+        fill = self._get_color(a.get('fill', 'none'), None)
+        return fill is not None and fill[3] > 200
 
-        # 递归处理子元素（对于没有特定处理的元素）
-        for child in element:
-            self._render_svg_element(child, draw, scale_x, scale_y, offset_x, offset_y, svg_width, svg_height)
-    
     def _get_color(self, color_str: str, default: Tuple[int, int, int, int] = (0, 0, 0, 255)) -> Tuple[int, int, int, int]:
         """解析颜色"""
         if not color_str or color_str == 'none':
             return default
         
+        color = self._parse_color(color_str)
+        return default if color is None else color
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _parse_color(color_str: str) -> Optional[Tuple[int, int, int, int]]:
+        """解析颜色字符串（按原始字符串缓存），无法识别时返回 None"""
         color_str = color_str.strip().lower()
         
         # 处理 rgb()
-        rgb_match = re.match(r'rgb\((\d+),\s*(\d+),\s*(\d+)\)', color_str)
+        rgb_match = SVGConverter._RGB_RE.match(color_str)
         if rgb_match:
             return (int(rgb_match.group(1)), int(rgb_match.group(2)), 
                    int(rgb_match.group(3)), 255)
         
         # 处理 rgba()
-        rgba_match = re.match(r'rgba\((\d+),\s*(\d+),\s*(\d+),\s*([\d.]+)\)', color_str)
+        rgba_match = SVGConverter._RGBA_RE.match(color_str)
         if rgba_match:
             return (int(rgba_match.group(1)), int(rgba_match.group(2)), 
                    int(rgba_match.group(3)), int(float(rgba_match.group(4)) * 255))
@@ -616,54 +1316,25 @@ class SVGConverter:
                 return (r, g, b, 255)
         
         # 常见颜色名
-        color_map = {
-            'black': (0, 0, 0, 255),
-            'white': (255, 255, 255, 255),
-            'red': (255, 0, 0, 255),
-            'green': (0, 128, 0, 255),
-            'blue': (0, 0, 255, 255),
-            'yellow': (255, 255, 0, 255),
-            'cyan': (0, 255, 255, 255),
-            'magenta': (255, 0, 255, 255),
-            'silver': (192, 192, 192, 255),
-            'gray': (128, 128, 128, 255),
-            'grey': (128, 128, 128, 255),
-            'maroon': (128, 0, 0, 255),
-            'olive': (128, 128, 0, 255),
-            'lime': (0, 255, 0, 255),
-            'aqua': (0, 255, 255, 255),
-            'teal': (0, 128, 128, 255),
-            'navy': (0, 0, 128, 255),
-            'fuchsia': (255, 0, 255, 255),
-            'purple': (128, 0, 128, 255),
-        }
-        
-        return color_map.get(color_str, default)
+        return SVGConverter._COLOR_MAP.get(color_str)
     
     def _draw_rect(self, element, draw: ImageDraw.Draw, scale_x: float, scale_y: float,
                    offset_x: float, offset_y: float, svg_width: float = 800, svg_height: float = 600):
         """绘制矩形"""
-        x_str = element.get('x', '0')
-        y_str = element.get('y', '0')
-        width_str = element.get('width', '0')
-        height_str = element.get('height', '0')
+        a = element.attrib
+        width_str = a.get('width', '0')
+        height_str = a.get('height', '0')
 
         # 解析 x, y
-        try:
-            x = self._parse_length(x_str) * scale_x + offset_x
-        except:
-            x = offset_x
-        try:
-            y = self._parse_length(y_str) * scale_y + offset_y
-        except:
-            y = offset_y
+        x = self._parse_num(a.get('x', '0')) * scale_x + offset_x
+        y = self._parse_num(a.get('y', '0')) * scale_y + offset_y
 
         # 解析 width，处理百分比
         try:
             if width_str.endswith('%'):
                 width = svg_width * float(width_str[:-1]) / 100.0 * scale_x
             else:
-                width = self._parse_length(width_str) * scale_x
+                width = self._parse_num(width_str) * scale_x
         except:
             width = 0
 
@@ -672,7 +1343,7 @@ class SVGConverter:
             if height_str.endswith('%'):
                 height = svg_height * float(height_str[:-1]) / 100.0 * scale_y
             else:
-                height = self._parse_length(height_str) * scale_y
+                height = self._parse_num(height_str) * scale_y
         except:
             height = 0
 
@@ -680,12 +1351,12 @@ class SVGConverter:
         is_fullscreen = (width_str == '100%' or width >= svg_width * scale_x - 1) and \
                        (height_str == '100%' or height >= svg_height * scale_y - 1)
 
-        fill = self._get_color(element.get('fill', 'none'), None)
-        stroke = self._get_color(element.get('stroke', 'none'), None)
-        stroke_width = float(element.get('stroke-width', 1)) * min(scale_x, scale_y)
+        fill = self._get_color(a.get('fill', 'none'), None)
+        stroke = self._get_color(a.get('stroke', 'none'), None)
+        stroke_width = float(a.get('stroke-width', 1)) * min(scale_x, scale_y)
 
-        rx = float(element.get('rx', 0)) * scale_x
-        ry = float(element.get('ry', 0)) * scale_y
+        rx = float(a.get('rx', 0)) * scale_x
+        ry = float(a.get('ry', 0)) * scale_y
 
         # 跳过全屏背景矩形（保留自定义背景图）
         if is_fullscreen and fill and fill[3] > 200:  # 不透明的全屏矩形
@@ -705,13 +1376,14 @@ class SVGConverter:
     def _draw_circle(self, element, draw: ImageDraw.Draw, scale_x: float, scale_y: float,
                      offset_x: float, offset_y: float):
         """绘制圆形"""
-        cx = float(element.get('cx', 0)) * scale_x + offset_x
-        cy = float(element.get('cy', 0)) * scale_y + offset_y
-        r = float(element.get('r', 0)) * min(scale_x, scale_y)
+        a = element.attrib
+        cx = float(a.get('cx', 0)) * scale_x + offset_x
+        cy = float(a.get('cy', 0)) * scale_y + offset_y
+        r = float(a.get('r', 0)) * min(scale_x, scale_y)
         
-        fill = self._get_color(element.get('fill', 'none'), None)
-        stroke = self._get_color(element.get('stroke', 'none'), None)
-        stroke_width = float(element.get('stroke-width', 1)) * min(scale_x, scale_y)
+        fill = self._get_color(a.get('fill', 'none'), None)
+        stroke = self._get_color(a.get('stroke', 'none'), None)
+        stroke_width = float(a.get('stroke-width', 1)) * min(scale_x, scale_y)
         
         bbox = [cx - r, cy - r, cx + r, cy + r]
         
@@ -742,13 +1414,14 @@ class SVGConverter:
     def _draw_line(self, element, draw: ImageDraw.Draw, scale_x: float, scale_y: float,
                    offset_x: float, offset_y: float):
         """绘制直线"""
-        x1 = float(element.get('x1', 0)) * scale_x + offset_x
-        y1 = float(element.get('y1', 0)) * scale_y + offset_y
-        x2 = float(element.get('x2', 0)) * scale_x + offset_x
-        y2 = float(element.get('y2', 0)) * scale_y + offset_y
+        a = element.attrib
+        x1 = float(a.get('x1', 0)) * scale_x + offset_x
+        y1 = float(a.get('y1', 0)) * scale_y + offset_y
+        x2 = float(a.get('x2', 0)) * scale_x + offset_x
+        y2 = float(a.get('y2', 0)) * scale_y + offset_y
         
-        stroke = self._get_color(element.get('stroke', 'black'))
-        stroke_width = int(float(element.get('stroke-width', 1)) * min(scale_x, scale_y))
+        stroke = self._get_color(a.get('stroke', 'black'))
+        stroke_width = int(float(a.get('stroke-width', 1)) * min(scale_x, scale_y))
         
         draw.line([(x1, y1), (x2, y2)], fill=stroke, width=stroke_width)
     
@@ -811,76 +1484,133 @@ class SVGConverter:
         stroke = self._get_color(element.get('stroke', 'none'), None)
         stroke_width = int(float(element.get('stroke-width', 1)) * min(scale_x, scale_y))
         
-        # 简化的路径解析 - 只处理基本的 M 和 L 命令
-        points = []
-        current_x, current_y = 0, 0
-        
-        # 解析路径命令
-        commands = re.findall(r'([MmLlHhVvCcSsQqTtAaZz])\s*([^MmLlHhVvCcSsQqTtAaZz]*)', d)
-        
-        for cmd, args_str in commands:
-            args = [float(x) for x in re.findall(r'[-+]?[\d.]+', args_str)]
-            
-            if cmd == 'M' and len(args) >= 2:
-                current_x, current_y = args[0] * scale_x + offset_x, args[1] * scale_y + offset_y
-                if not points:
-                    points.append((current_x, current_y))
-            elif cmd == 'm' and len(args) >= 2:
-                current_x += args[0] * scale_x
-                current_y += args[1] * scale_y
-                if not points:
-                    points.append((current_x, current_y))
-            elif cmd == 'L' and len(args) >= 2:
-                current_x, current_y = args[0] * scale_x + offset_x, args[1] * scale_y + offset_y
-                points.append((current_x, current_y))
-            elif cmd == 'l' and len(args) >= 2:
-                current_x += args[0] * scale_x
-                current_y += args[1] * scale_y
-                points.append((current_x, current_y))
-            elif cmd == 'H' and len(args) >= 1:
-                current_x = args[0] * scale_x + offset_x
-                points.append((current_x, current_y))
-            elif cmd == 'h' and len(args) >= 1:
-                current_x += args[0] * scale_x
-                points.append((current_x, current_y))
-            elif cmd == 'V' and len(args) >= 1:
-                current_y = args[0] * scale_y + offset_y
-                points.append((current_x, current_y))
-            elif cmd == 'v' and len(args) >= 1:
-                current_y += args[0] * scale_y
-                points.append((current_x, current_y))
-            elif cmd in ['Z', 'z']:
-                if len(points) > 2:
+        # 路径按 d 预先解析成子路径的点模板，这里只需逐点做一次缩放和平移
+        # 点存成扁平的 float32 数组 [x0, y0, x1, y1, ...]，ImageDraw 直接按缓冲区读取，不再逐点装箱成 tuple
+        for closed, template in self._compile_path(d):
+            points = array('f')
+            for x, y, bx, by in template:
+                points.extend((x * scale_x + bx * offset_x, y * scale_y + by * offset_y))
+            count = len(template)
+            if closed:
+                if count > 2:
                     if fill:
                         draw.polygon(points, fill=fill)
                     if stroke and stroke_width > 0:
                         draw.polygon(points, outline=stroke)
-                points = []
-        
-        # 绘制剩余的点
-        if len(points) > 1:
-            if fill and len(points) > 2:
-                draw.polygon(points, fill=fill)
-            if stroke and stroke_width > 0:
-                draw.line(points, fill=stroke, width=stroke_width)
-    
+            elif count > 1:
+                # 绘制剩余的点
+                if fill and count > 2:
+                    draw.polygon(points, fill=fill)
+                if stroke and stroke_width > 0:
+                    draw.line(points, fill=stroke, width=stroke_width)
+
+    def _draw_path_agg(self, element, agg, scale_x: float, scale_y: float,
+                       offset_x: float, offset_y: float):
+        """用 aggdraw 绘制路径：所有子路径合成一个 aggdraw.Path，一次调用完成填充和描边"""
+        d = element.get('d', '')
+        if not d:
+            return
+
+        fill = self._get_color(element.get('fill', 'none'), None)
+        stroke = self._get_color(element.get('stroke', 'none'), None)
+        stroke_width = int(float(element.get('stroke-width', 1)) * min(scale_x, scale_y))
+        pen = aggdraw.Pen(stroke[:3], stroke_width, stroke[3]) if stroke and stroke_width > 0 else None
+        brush = aggdraw.Brush(fill[:3], fill[3]) if fill else None
+        if pen is None and brush is None:
+            return
+
+        path = aggdraw.Path()
+        drawn = False
+        for closed, template in self._compile_path(d):
+            if len(template) < (3 if closed else 2):
+                continue
+            x, y, bx, by = template[0]
+            path.moveto(x * scale_x + bx * offset_x, y * scale_y + by * offset_y)
+            for x, y, bx, by in template[1:]:
+                path.lineto(x * scale_x + bx * offset_x, y * scale_y + by * offset_y)
+            if closed:
+                path.close()
+            drawn = True
+        if drawn:
+            agg.path(path, pen, brush)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _compile_path(d: str) -> Tuple[Tuple[bool, Tuple[Tuple[float, float, int, int], ...]], ...]:
+        """把 path 解析成 (是否闭合, 点模板) 的子路径序列，与缩放/偏移无关，可按 d 缓存
+
+        点模板为 (x, y, bx, by)，画布坐标 = (x * scale_x + bx * offset_x, y * scale_y + by * offset_y)；
+        最后一个未闭合的子路径 closed 为 False。
+
+        命令数不多的路径（BestN 里的条形、圆角矩形等，形状反复出现）按命令序列取用生成好的专用函数，
+        跳过逐命令分派；命令过多时仍走通用循环，避免为一次性的长路径生成代码。
+        """
+        commands = SVGConverter._parse_path_commands(d)
+        if len(commands) <= SVGConverter.PATH_CODEGEN_MAX_COMMANDS:
+            shape = []
+            flat: List[float] = []
+            for cmd, args in commands:
+                count = _PATH_ARG_COUNTS.get(cmd)
+                if count is not None and len(args) >= count:
+                    shape.append(cmd)
+                    flat.extend(args[:count])
+            return _path_compiler(''.join(shape))(flat)
+
+        state = [0, 0, 0, 0, []]
+        subpaths = []
+        for cmd, args in commands:
+            handler = _PATH_HANDLERS.get(cmd)
+            if handler is not None:
+                handler(state, args)
+            elif cmd == 'Z' or cmd == 'z':
+                subpaths.append((True, tuple(state[4])))
+                state[4] = []
+        subpaths.append((False, tuple(state[4])))
+        return tuple(subpaths)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _parse_path_commands(d: str) -> Tuple[Tuple[str, Tuple[float, ...]], ...]:
+        """把 path 的 d 属性拆成 (命令, 参数) 序列（BestN 中重复的图标路径直接命中缓存）
+
+        单遍扫描：遇到命令字母开始新命令，[+-]?[0-9.]+ 视为一个数字，其余字符都是分隔符；
+        第一个命令之前的内容忽略。
+        """
+        cmd_chars = SVGConverter._PATH_CMD_CHARS
+        num_chars = SVGConverter._PATH_NUM_CHARS
+        commands = []
+        cmd = None
+        args: List[float] = []
+        i, n = 0, len(d)
+        while i < n:
+            c = d[i]
+            if c in cmd_chars:
+                if cmd is not None:
+                    commands.append((cmd, tuple(args)))
+                cmd = c
+                args = []
+                i += 1
+            elif c in num_chars or (c in '+-' and i + 1 < n and d[i + 1] in num_chars):
+                start = i
+                i += 1
+                while i < n and d[i] in num_chars:
+                    i += 1
+                if cmd is not None:
+                    args.append(float(d[start:i]))
+            else:
+                i += 1
+        if cmd is not None:
+            commands.append((cmd, tuple(args)))
+        return tuple(commands)
+
     def _draw_text(self, element, draw: ImageDraw.Draw, scale_x: float, scale_y: float,
                    offset_x: float, offset_y: float):
         """绘制文本 - 使用加载的字体"""
         x = float(element.get('x', 0)) * scale_x + offset_x
         y = float(element.get('y', 0)) * scale_y + offset_y
 
-        # 获取文本内容
-        text = ''
-        for child in element:
-            if child.tag.endswith('}tspan') or child.tag == 'tspan':
-                if child.text:
-                    text += child.text
-            elif child.text:
-                text += child.text
-
-        if not text and element.text:
-            text = element.text
+        # 获取文本内容（各 tspan 等子节点的文字拼接；没有时用 <text> 自身的文字）
+        text = ''.join([child.text for child in element if child.text]) or element.text
 
         if not text:
             return
@@ -892,22 +1622,89 @@ class SVGConverter:
         # 使用加载的字体
         font = self._get_font(font_size)
 
+        # 文字只栅格化一次成灰度遮罩（保留坐标的小数部分，字形与直接 draw.text 完全一致），
+        # 阴影和主文字用同一遮罩各贴一次
+        ix, iy = math.floor(x), math.floor(y)
+        left, top, right, bottom = font.getbbox(text)
+        left, top = math.floor(left) - 1, math.floor(top) - 1
+        mask = Image.new('L', (math.ceil(right) - left + 2, math.ceil(bottom) - top + 2))
+        ImageDraw.Draw(mask).text((x - ix - left, y - iy - top), text, fill=255, font=font)
+
         # 绘制文字阴影（提高可读性）
         shadow_color = (0, 0, 0, 128)
-        draw.text((x+1, y+1), text, fill=shadow_color, font=font)
-        
+        draw.bitmap((ix + left + 1, iy + top + 1), mask, fill=shadow_color)
+
         # 绘制主文字
-        draw.text((x, y), text, fill=fill, font=font)
-        
+        draw.bitmap((ix + left, iy + top), mask, fill=fill)
+
         logger.debug(f"绘制文字: '{text[:20]}...' at ({x}, {y}), size={font_size}, color={fill}")
 
+    @staticmethod
+    def _resolve_resample_filter() -> "Image.Resampling":
+        """读取 PHIGROS_PILLOW_RESAMPLE_FILTER，无效的滤镜名记录警告并回退到 LANCZOS"""
+        name = os.getenv("PHIGROS_PILLOW_RESAMPLE_FILTER", "LANCZOS").strip().upper()
+        try:
+            return Image.Resampling[name]
+        except KeyError:
+            valid = ", ".join(member.name for member in Image.Resampling)
+            logger.warning(f"⚠️ PHIGROS_PILLOW_RESAMPLE_FILTER={name!r} 不是有效的 Pillow 缩放滤镜（可选: {valid}），使用 LANCZOS")
+            return Image.Resampling.LANCZOS
+
+    def _fit_illustration(self, illust: Image.Image, target_width: int, target_height: int,
+                          slice_mode: bool) -> Image.Image:
+        """按 preserveAspectRatio 缩放曲绘（slice 为填充后居中裁剪，否则直接拉伸）"""
+        img_width, img_height = illust.size
+        # 小缩略图肉眼分不出 LANCZOS 与 BICUBIC/BILINEAR 的差别，按目标尺寸选更便宜的滤镜
+        longest = max(target_width, target_height)
+        if longest >= self.lanczos_threshold:
+            resample = self.illustration_resample
+        elif longest >= self.bilinear_threshold:
+            resample = Image.Resampling.BICUBIC
+        else:
+            resample = Image.Resampling.BILINEAR
+
+        if slice_mode:
+            # slice 模式：填充整个区域，可能裁剪
+            img_ratio = img_width / img_height
+            target_ratio = target_width / target_height
+
+            if img_ratio > target_ratio:
+                # 图片更宽，按高度缩放，裁剪宽度
+                new_height = target_height
+                new_width = int(img_width * (target_height / img_height))
+                resized = illust.resize((new_width, new_height), resample)
+                # 居中裁剪
+                left = (new_width - target_width) // 2
+                return resized.crop((left, 0, left + target_width, target_height))
+            # 图片更高，按宽度缩放，裁剪高度
+            new_width = target_width
+            new_height = int(img_height * (target_width / img_width))
+            resized = illust.resize((new_width, new_height), resample)
+            # 居中裁剪
+            top = (new_height - target_height) // 2
+            return resized.crop((0, top, target_width, top + target_height))
+
+        # 默认模式：适应区域，保持完整
+        return illust.resize((target_width, target_height), resample)
+
     def _draw_image(self, element, draw: ImageDraw.Draw, scale_x: float, scale_y: float,
                     offset_x: float, offset_y: float, svg_width: float = 800, svg_height: float = 600):
         """绘制图片 - 使用本地曲绘"""
+        prepared = self._prepare_image(element, scale_x, scale_y, offset_x, offset_y, svg_width, svg_height)
+        if prepared is not None:
+            self._paste_image(draw, prepared)
+
+    def _prepare_image(self, element, scale_x: float, scale_y: float, offset_x: float, offset_y: float,
+                       svg_width: float = 800, svg_height: float = 600
+                       ) -> Optional[Tuple[float, float, str, Image.Image]]:
+        """加载并缩放 <image> 对应的本地曲绘，返回 (x, y, song_key, 贴图)
+
+        不触碰画布，可在线程池中执行（解码和缩放期间 Pillow 会释放 GIL）。
+        """
         # 获取 href 属性（可能是 href 或 xlink:href）
         href = element.get('href', '') or element.get('{http://www.w3.org/1999/xlink}href', '')
         if not href:
-            return
+            return None
 
         # 解析位置和尺寸
         x_str = element.get('x', '0')
@@ -943,68 +1740,57 @@ class SVGConverter:
             height = 0
 
         if width <= 0 or height <= 0:
-            return
+            return None
 
         # 从 URL 提取歌曲 key
         song_key = self._extract_song_key_from_url(href)
-        logger.info(f"尝试加载曲绘: {song_key} (from {href})")
         if not song_key:
             logger.warning(f"无法从 URL 提取歌曲 key: {href}")
-            return
+            return None
+
+        # BestN 里同一曲绘常以相同尺寸多次出现，缩放/裁剪结果按尺寸缓存
+        preserve_ratio = element.get('preserveAspectRatio', '')
+        target_width = int(width)
+        target_height = int(height)
+        tile_key = (song_key, target_width, target_height, 'slice' in preserve_ratio)
+        with self._illust_lock:
+            resized = self._illust_tile_cache.get(tile_key)
+            if resized is not None:
+                self._illust_tile_cache.move_to_end(tile_key)
+                return x, y, song_key, resized
 
         # 加载本地曲绘
+        logger.info(f"尝试加载曲绘: {song_key} (from {href})")
         illust = self._get_illustration(song_key)
         if not illust:
             logger.warning(f"未找到本地曲绘: {song_key}")
-            return
-        
+            return None
+
         logger.info(f"找到曲绘: {song_key}, 尺寸: {illust.size}")
 
         # 调整图片大小
         try:
-            # 获取 preserveAspectRatio 属性
-            preserve_ratio = element.get('preserveAspectRatio', '')
-
-            # 计算缩放和裁剪
-            img_width, img_height = illust.size
-            target_width = int(width)
-            target_height = int(height)
-
-            if 'slice' in preserve_ratio:
-                # slice 模式：填充整个区域，可能裁剪
-                img_ratio = img_width / img_height
-                target_ratio = target_width / target_height
-
-                if img_ratio > target_ratio:
-                    # 图片更宽，按高度缩放，裁剪宽度
-                    new_height = target_height
-                    new_width = int(img_width * (target_height / img_height))
-                    resized = illust.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    # 居中裁剪
-                    left = (new_width - target_width) // 2
-                    resized = resized.crop((left, 0, left + target_width, target_height))
-                else:
-                    # 图片更高，按宽度缩放，裁剪高度
-                    new_width = target_width
-                    new_height = int(img_height * (target_width / img_width))
-                    resized = illust.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    # 居中裁剪
-                    top = (new_height - target_height) // 2
-                    resized = resized.crop((0, top, target_width, top + target_height))
-            else:
-                # 默认模式：适应区域，保持完整
-                resized = illust.resize((target_width, target_height), Image.Resampling.LANCZOS)
-
-            # 获取父图像
-            parent_img = draw._image
-
-            # 粘贴曲绘（使用 alpha 通道）
-            if resized.mode == 'RGBA':
-                parent_img.paste(resized, (int(x), int(y)), resized)
-            else:
-                parent_img.paste(resized, (int(x), int(y)))
+            resized = self._fit_illustration(illust, target_width, target_height, tile_key[3])
+        except Exception as e:
+            logger.warning(f"缩放曲绘失败 {song_key}: {e}")
+            return None
+        with self._illust_lock:
+            self._illust_tile_cache[tile_key] = resized
+            if len(self._illust_tile_cache) > self.ILLUST_TILE_CACHE_SIZE:
+                self._illust_tile_cache.popitem(last=False)
+        return x, y, song_key, resized
+
+    def _paste_image(self, draw: ImageDraw.Draw, prepared: Tuple[float, float, str, Image.Image]):
+        """把 _prepare_image 准备好的曲绘贴到画布上"""
+        x, y, song_key, resized = prepared
+        try:
+            # 画布和曲绘都是 RGBA（曲绘在 _get_illustration 载入时即已转换），直接原地 alpha 合成；
+            # 超出左/上边界的部分从源图裁掉
+            dest_x, dest_y = int(x), int(y)
+            draw._image.alpha_composite(resized, dest=(max(dest_x, 0), max(dest_y, 0)),
+                                        source=(max(-dest_x, 0), max(-dest_y, 0)))
 
-            logger.debug(f"绘制曲绘成功: {song_key} ({width}x{height})")
+            logger.debug(f"绘制曲绘成功: {song_key} ({resized.width}x{resized.height})")
         except Exception as e:
             logger.warning(f"绘制曲绘失败 {song_key}: {e}")
 
@@ -1013,6 +1799,10 @@ class SVGConverter:
         converters = []
         if self.cairosvg_available:
             converters.append("cairosvg")
+        if RESVG_AVAILABLE:
+            converters.append("resvg")
+        if self.rsvg_available:
+            converters.append("rsvg-convert")
         if self.inkscape_available:
             converters.append("inkscape")
         if PIL_AVAILABLE:
@@ -1023,7 +1813,7 @@ class SVGConverter:
         """获取安装帮助信息"""
         help_text = []
         
-        if not self.cairosvg_available and not self.inkscape_available:
+        if not (self.cairosvg_available or RESVG_AVAILABLE or self.rsvg_available or self.inkscape_available):
             help_text.append("SVG 转换工具未安装，可选方案：")
             help_text.append("")
             help_text.append("方案 1 - cairosvg (推荐，Windows需要GTK+)：")
@@ -1031,11 +1821,18 @@ class SVGConverter:
             help_text.append("  2. 安装后重启 AstrBot")
             help_text.append("  3. pip install cairosvg")
             help_text.append("")
-            help_text.append("方案 2 - Inkscape：")
+            help_text.append("方案 2 - resvg (全平台，无需额外运行时，速度快)：")
+            help_text.append("  pip install resvg-py")
+            help_text.append("")
+            help_text.append("方案 3 - rsvg-convert (Linux/macOS 推荐，速度快)：")
+            help_text.append("  Debian/Ubuntu: apt install librsvg2-bin")
+            help_text.append("  macOS: brew install librsvg")
+            help_text.append("")
+            help_text.append("方案 4 - Inkscape：")
             help_text.append("  1. 下载安装：https://inkscape.org/release/")
             help_text.append("  2. 确保 inkscape 命令在系统 PATH 中")
             help_text.append("")
-            help_text.append("方案 3 - 纯 Python (Pillow)：")
+            help_text.append("方案 5 - 纯 Python (Pillow)：")
             help_text.append("  插件将自动使用 Pillow 进行基础 SVG 渲染")
             help_text.append("  注：仅支持基本 SVG 元素")
         
@@ -1055,28 +1852,32 @@ def get_converter(illustration_path: Optional[str] = None, plugin_dir: Optional[
     """
     global _converter
     if _converter is None:
-        logger.info("创建新的 SVGConverter 实例")
+        logger.info(f"创建新的 SVGConverter 实例 (Pillow {PIL.__version__}{' SIMD' if PILLOW_SIMD else ''})")
         _converter = SVGConverter(illustration_path=illustration_path, plugin_dir=plugin_dir)
     else:
         logger.info(f"使用现有 SVGConverter 实例: plugin_dir={_converter.plugin_dir}, has_bg={_converter._default_background is not None}")
-        # 更新路径（如果提供了新路径）
+        # 更新路径（如果提供了新路径）；与上次传入的字符串相同时不再构造 Path 比较
         if plugin_dir:
-            new_plugin_dir = Path(plugin_dir)
-            if _converter.plugin_dir != new_plugin_dir:
+            if plugin_dir != _converter._plugin_dir_str and _converter.plugin_dir != Path(plugin_dir):
+                new_plugin_dir = Path(plugin_dir)
                 logger.info(f"更新插件目录: {new_plugin_dir}")
                 _converter.plugin_dir = new_plugin_dir
-                _converter._load_default_background()
-                _converter._load_fonts()
+                _converter._reset_default_background()
+                _converter._reset_fonts()
             elif not _converter._default_background:
                 logger.info("背景未加载，尝试重新加载")
-                _converter._load_default_background()
-                _converter._load_fonts()
+                _converter._reset_default_background()
+                _converter._reset_fonts()
+            _converter._plugin_dir_str = plugin_dir
         if illustration_path:
-            new_illust_path = Path(illustration_path)
-            if _converter.illustration_path != new_illust_path or not _converter._illustration_map:
+            if ((illustration_path != _converter._illustration_path_str
+                 and _converter.illustration_path != Path(illustration_path))
+                    or not _converter._illustration_map):
+                new_illust_path = Path(illustration_path)
                 logger.info(f"更新曲绘目录: {new_illust_path}")
                 _converter.illustration_path = new_illust_path
-                _converter._build_illustration_map()
+                _converter._reset_illustration_map()
+            _converter._illustration_path_str = illustration_path
     return _converter
 
 
@@ -5,6 +5,7 @@ TapTap 扫码登录模块
 
 import asyncio
 import base64
+import logging
 from typing import Optional, Callable, Dict, Any
 from pathlib import Path
 from dataclasses import dataclass
@@ -13,9 +14,11 @@ from astrbot.api import logger
 
 try:
     from playwright.async_api import async_playwright, Page, Browser, BrowserContext
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
+    PlaywrightTimeoutError = asyncio.TimeoutError
     # 静默处理，不再输出警告（已改用 API 版本）
     pass
 
@@ -81,6 +84,74 @@ class TapTapLoginManager:
         ],
     }
     
+    # 轮询脚本：一次 evaluate 同时查找 token 并在浏览器内匹配扫码状态文字
+    _POLL_JS = """
+        () => {
+            const findToken = () => {
+                // 尝试所有可能的 key
+                const keys = [
+                    'sessionToken', 'session_token', 'token', 'accessToken', 'access_token',
+                    'authToken', 'auth_token', 'userToken', 'user_token'
+                ];
+                
+                for (const key of keys) {
+                    let value = localStorage.getItem(key);
+                    if (value) {
+                        console.log('Found token in localStorage:', key);
+                        return value;
+                    }
+                    
+                    value = sessionStorage.getItem(key);
+                    if (value) {
+                        console.log('Found token in sessionStorage:', key);
+                        return value;
+                    }
+                }
+                
+                // 尝试遍历所有 localStorage
+                for (let i = 0; i < localStorage.length; i++) {
+                    const key = localStorage.key(i);
+                    const value = localStorage.getItem(key);
+                    if (value && (key.toLowerCase().includes('token') || key.toLowerCase().includes('session'))) {
+                        console.log('Found potential token:', key);
+                        return value;
+                    }
+                }
+                
+                return null;
+            };
+
+            const token = findToken();
+            if (token) {
+                return { token: token, status: 'success' };
+            }
+
+            const text = document.body ? document.body.innerText : '';
+            if (/已扫描|已扫码|scanned|确认登录|请在手机上确认/.test(text)) {
+                return { token: null, status: 'scanned' };
+            }
+            if (/确认中|confirming|处理中/.test(text)) {
+                return { token: null, status: 'confirming' };
+            }
+            return { token: null, status: 'waiting' };
+        }
+    """
+
+    # 事件驱动等待：浏览器内按 WAIT_POLLING_MS 轮询，token 出现前返回 null；
+    # 状态变化时通过绑定的 window.__phigrosOnStatus 通知 Python
+    _WAIT_JS = """
+        () => {
+            const poll = (""" + _POLL_JS + """)();
+            if (poll.status !== window.__phigrosLastStatus && window.__phigrosOnStatus) {
+                window.__phigrosLastStatus = poll.status;
+                window.__phigrosOnStatus(poll.status);
+            }
+            return poll.token;
+        }
+    """
+    # 浏览器内的轮询间隔（毫秒）
+    WAIT_POLLING_MS = 500
+    
     def __init__(self, output_dir: Path):
         self.output_dir = output_dir
         self.output_dir.mkdir(exist_ok=True)
@@ -96,6 +167,11 @@ class TapTapLoginManager:
         self._context: Optional[BrowserContext] = None
         self._page: Optional[Page] = None
         
+        # 扫码状态回调（expose_binding 每个页面只能注册一次）
+        self._status_binding_registered = False
+        self._status_callback: Optional[Callable] = None
+        self._last_page_status: Optional[LoginStatus] = None
+
         # 状态
         self._current_status = LoginStatus.INITIALIZING
         self._session_token: Optional[str] = None
@@ -200,43 +276,71 @@ class TapTapLoginManager:
     
     async def _find_and_click(self, selectors: list, timeout: int = 5000) -> bool:
         """查找并点击第一个匹配的元素"""
-        for selector in selectors:
-            if await self._safe_click(selector, timeout):
-                logger.info(f"成功点击: {selector}")
-                return True
-        
-        return False
+        found = await self._wait_for_element(selectors, timeout)
+        if found is None:
+            return False
+
+        selector, element = found
+        try:
+            await element.click()
+            logger.info(f"成功点击: {selector}")
+            return True
+        except Exception as e:
+            logger.debug(f"点击失败 {selector}: {e}")
+            return False
     
     async def _wait_for_element(self, selectors: list, timeout: int = 10000):
-        """等待任意一个元素出现"""
+        """等待任意一个元素出现
+
+        所有选择器合并成一个 locator 同时等待（最坏只等一次 timeout），
+        出现后再按列表顺序取第一个可见的，保持选择器的优先级。
+
+        Returns:
+            (选择器, Locator)，超时返回 None
+        """
         if not self._page:
             return None
 
+        union = self._page.locator(selectors[0])
+        for selector in selectors[1:]:
+            union = union.or_(self._page.locator(selector))
+
+        try:
+            await union.first.wait_for(state="visible", timeout=timeout)
+        except Exception as e:
+            # 记录具体异常类型，便于调试
+            logger.debug(f"等待元素 {selectors} 失败: {type(e).__name__}: {e}")
+            return None
+
         for selector in selectors:
+            element = self._page.locator(selector).first
             try:
-                element = await self._page.wait_for_selector(selector, timeout=timeout)
-                if element:
-                    return element
-            except Exception as e:
-                # 记录具体异常类型，便于调试
-                logger.debug(f"等待元素 {selector} 失败: {type(e).__name__}: {e}")
+                if await element.is_visible():
+                    return selector, element
+            except Exception:
                 continue
 
-        return None
+        return " | ".join(selectors), union.first
     
-    async def _save_screenshot(self, filename: str = "debug.png") -> Optional[str]:
+    async def _save_screenshot(self, filename: str = "debug.png", full_page: bool = True) -> Optional[str]:
         """保存页面截图"""
         if not self._page:
             return None
         
         try:
             path = str(self.output_dir / filename)
-            await self._page.screenshot(path=path, full_page=True)
+            await self._page.screenshot(path=path, full_page=full_page)
             logger.info(f"截图已保存: {path}")
             return path
         except Exception as e:
             logger.error(f"截图失败: {e}")
             return None
+
+    async def _debug_screenshot(self, filename: str) -> Optional[str]:
+        """保存流程步骤截图（仅 DEBUG 日志级别下保存，且只截可视区域）"""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return None
+        return await self._save_screenshot(filename, full_page=False)
     
     async def generate_qr_code(self) -> Optional[str]:
         """
@@ -260,7 +364,7 @@ class TapTapLoginManager:
             await asyncio.sleep(2)
             
             # 保存初始页面截图
-            await self._save_screenshot("step1_initial.png")
+            await self._debug_screenshot("step1_initial.png")
             
             # 点击登录按钮
             logger.info("正在查找登录按钮...")
@@ -285,33 +389,35 @@ class TapTapLoginManager:
                         logger.debug(f"点击按钮 {i} 失败: {e}")
             
             await asyncio.sleep(2)
-            await self._save_screenshot("step2_after_login_click.png")
+            await self._debug_screenshot("step2_after_login_click.png")
             
             # 点击 TapTap 登录选项
             logger.info("正在查找 TapTap 登录选项...")
             await self._find_and_click(self.SELECTORS["taptap_option"])
             
             await asyncio.sleep(3)
-            await self._save_screenshot("step3_after_taptap_click.png")
+            await self._debug_screenshot("step3_after_taptap_click.png")
             
             # 查找二维码
             logger.info("正在查找二维码...")
-            qr_element = await self._wait_for_element(self.SELECTORS["qr_code"], timeout=10000)
+            found = await self._wait_for_element(self.SELECTORS["qr_code"], timeout=10000)
             
-            if qr_element:
+            # 截图直接取 PNG 字节，不再写盘后读回
+            if found:
+                qr_element = found[1]
                 logger.info("找到二维码元素，正在截取...")
-                await qr_element.screenshot(path=str(self.qr_code_path))
+                qr_bytes = await qr_element.screenshot(type="png")
             else:
                 logger.warning("未找到二维码元素，截取整个页面")
-                await self._page.screenshot(path=str(self.qr_code_path))
+                qr_bytes = await self._page.screenshot(type="png")
             
             # 验证截图
-            if not self.qr_code_path.exists():
+            if not qr_bytes:
                 raise Exception("二维码截图未生成")
             
-            # 转换为 base64
-            with open(self.qr_code_path, 'rb') as f:
-                qr_base64 = base64.b64encode(f.read()).decode('utf-8')
+            # 保存文件与 base64 编码都放到线程里，不阻塞事件循环
+            await asyncio.to_thread(self.qr_code_path.write_bytes, qr_bytes)
+            qr_base64 = await asyncio.to_thread(lambda: base64.b64encode(qr_bytes).decode('utf-8'))
             
             self._current_status = LoginStatus.QR_READY
             logger.info("二维码生成成功")
@@ -341,6 +447,93 @@ class TapTapLoginManager:
         
         logger.info(f"开始等待扫码，超时时间: {timeout}秒")
 
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = asyncio.get_event_loop()
+
+        start_time = loop.time()
+        self._status_callback = callback
+        self._last_page_status = None
+
+        # 优先在浏览器内等待 token，Python 侧不再轮询
+        try:
+            session_token = await self._wait_for_token(timeout)
+            if session_token:
+                return self._login_succeeded(session_token, callback)
+        except PlaywrightTimeoutError:
+            pass
+        except Exception as e:
+            # 页面跳转会销毁执行上下文，退回到逐次轮询继续等完剩余时间
+            logger.debug(f"事件驱动等待中断，改为轮询: {type(e).__name__}: {e}")
+            remaining = timeout - (loop.time() - start_time)
+            if remaining > 0:
+                result = await self._poll_for_scan(remaining, callback)
+                if result is not None:
+                    return result
+        finally:
+            self._status_callback = None
+
+        # 超时
+        self._current_status = LoginStatus.TIMEOUT
+        logger.warning("登录超时")
+        
+        if callback:
+            callback(LoginStatus.TIMEOUT, "登录超时，请重试")
+        
+        return LoginResult(success=False, error_message="登录超时")
+    
+    async def _wait_for_token(self, timeout: float) -> Optional[str]:
+        """在浏览器内等待 token 出现（wait_for_function），扫码状态变化经绑定回调通知"""
+        if not self._status_binding_registered:
+            await self._page.expose_binding(
+                "__phigrosOnStatus", lambda source, status: self._on_page_status(status)
+            )
+            self._status_binding_registered = True
+
+        handle = await self._page.wait_for_function(
+            self._WAIT_JS, timeout=timeout * 1000, polling=self.WAIT_POLLING_MS
+        )
+        return await handle.json_value()
+
+    def _on_page_status(self, page_status: str):
+        """处理页面上的扫码状态变化（只在状态改变时回调一次）"""
+        if page_status == "scanned":
+            status, log_message = LoginStatus.SCANNED, "二维码已扫描，等待确认"
+            message = "二维码已扫描，请在手机上确认登录"
+        elif page_status == "confirming":
+            status, log_message = LoginStatus.CONFIRMING, "正在确认登录..."
+            message = "正在确认登录..."
+        else:
+            return
+
+        if self._last_page_status == status:
+            return
+        self._last_page_status = status
+        self._current_status = status
+        logger.info(log_message)
+        if self._status_callback:
+            self._status_callback(status, message)
+
+    def _login_succeeded(self, session_token: str, callback: Optional[Callable]) -> LoginResult:
+        """记录登录成功并构造结果"""
+        self._session_token = session_token
+        self._current_status = LoginStatus.SUCCESS
+        logger.info(f"登录成功，获取到 sessionToken: {session_token[:20]}...")
+        
+        # Token 已通过用户数据管理器保存，不再单独保存到文件
+        
+        if callback:
+            callback(LoginStatus.SUCCESS, "登录成功！")
+        
+        return LoginResult(
+            success=True,
+            session_token=session_token,
+            qr_code_path=str(self.qr_code_path) if self.qr_code_path.exists() else None
+        )
+
+    async def _poll_for_scan(self, timeout: float, callback: Optional[Callable] = None) -> Optional[LoginResult]:
+        """逐次轮询等待扫码（事件驱动等待不可用时的回退），超时返回 None"""
         try:
             loop = asyncio.get_running_loop()
         except RuntimeError:
@@ -348,62 +541,15 @@ class TapTapLoginManager:
 
         start_time = loop.time()
         check_interval = 2
-        last_status = None
 
         while (loop.time() - start_time) < timeout:
             try:
                 # 检查是否已登录 - 尝试多种方式获取 token
-                session_token = await self._page.evaluate("""
-                    () => {
-                        // 尝试所有可能的 key
-                        const keys = [
-                            'sessionToken', 'session_token', 'token', 'accessToken', 'access_token',
-                            'authToken', 'auth_token', 'userToken', 'user_token'
-                        ];
-                        
-                        for (const key of keys) {
-                            let value = localStorage.getItem(key);
-                            if (value) {
-                                console.log('Found token in localStorage:', key);
-                                return value;
-                            }
-                            
-                            value = sessionStorage.getItem(key);
-                            if (value) {
-                                console.log('Found token in sessionStorage:', key);
-                                return value;
-                            }
-                        }
-                        
-                        // 尝试遍历所有 localStorage
-                        for (let i = 0; i < localStorage.length; i++) {
-                            const key = localStorage.key(i);
-                            const value = localStorage.getItem(key);
-                            if (value && (key.toLowerCase().includes('token') || key.toLowerCase().includes('session'))) {
-                                console.log('Found potential token:', key);
-                                return value;
-                            }
-                        }
-                        
-                        return null;
-                    }
-                """)
+                poll = await self._page.evaluate(self._POLL_JS)
+                session_token = poll.get("token")
                 
                 if session_token:
-                    self._session_token = session_token
-                    self._current_status = LoginStatus.SUCCESS
-                    logger.info(f"登录成功，获取到 sessionToken: {session_token[:20]}...")
-                    
-                    # Token 已通过用户数据管理器保存，不再单独保存到文件
-                    
-                    if callback:
-                        callback(LoginStatus.SUCCESS, "登录成功！")
-                    
-                    return LoginResult(
-                        success=True,
-                        session_token=session_token,
-                        qr_code_path=str(self.qr_code_path) if self.qr_code_path.exists() else None
-                    )
+                    return self._login_succeeded(session_token, callback)
                 
                 # 检查页面 URL 变化（可能跳转到了登录后的页面）
                 current_url = self._page.url
@@ -413,28 +559,12 @@ class TapTapLoginManager:
                     await asyncio.sleep(1)
                     continue
                 
-                # 检查页面内容变化
-                page_content = await self._page.content()
+                # 页面文字在浏览器内匹配，只回传状态
+                page_status = poll.get("status")
                 
-                # 检测已扫描状态
-                if any(text in page_content for text in ['已扫描', '已扫码', 'scanned', '确认登录', '请在手机上确认']):
-                    if last_status != LoginStatus.SCANNED:
-                        last_status = LoginStatus.SCANNED
-                        self._current_status = LoginStatus.SCANNED
-                        logger.info("二维码已扫描，等待确认")
-                        
-                        if callback:
-                            callback(LoginStatus.SCANNED, "二维码已扫描，请在手机上确认登录")
-                
-                # 检测确认中状态
-                elif any(text in page_content for text in ['确认中', 'confirming', '处理中']):
-                    if last_status != LoginStatus.CONFIRMING:
-                        last_status = LoginStatus.CONFIRMING
-                        self._current_status = LoginStatus.CONFIRMING
-                        logger.info("正在确认登录...")
-                        
-                        if callback:
-                            callback(LoginStatus.CONFIRMING, "正在确认登录...")
+                # 检测已扫描 / 确认中状态
+                if page_status in ("scanned", "confirming"):
+                    self._on_page_status(page_status)
                 
                 # 等待中
                 else:
@@ -449,15 +579,8 @@ class TapTapLoginManager:
                 logger.error(f"检查登录状态出错: {e}")
                 await asyncio.sleep(check_interval)
         
-        # 超时
-        self._current_status = LoginStatus.TIMEOUT
-        logger.warning("登录超时")
-        
-        if callback:
-            callback(LoginStatus.TIMEOUT, "登录超时，请重试")
-        
-        return LoginResult(success=False, error_message="登录超时")
-    
+        return None
+
     async def login(self, timeout: int = 120, callback: Optional[Callable] = None) -> LoginResult:
         """
         完整的登录流程
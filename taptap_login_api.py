@@ -4,22 +4,33 @@ TapTap 扫码登录模块 (API 版本)
 """
 
 import asyncio
-import base64
+import os
+import re
 from typing import Optional, Callable, Dict, Any
 from pathlib import Path
 from dataclasses import dataclass
 from enum import Enum
 from astrbot.api import logger
+import aiofiles
 import aiohttp
 
-# 尝试导入 qrcode 库
+# 登录状态响应中 "status": "pending" 这一对键值（允许冒号两侧有空白，API 可能返回 Pending）
+_PENDING_STATUS_RE = re.compile(rb'"status"\s*:\s*"([Pp]ending)"')
+
+try:
+    # orjson 直接解析 bytes，比标准库 json 快，用于轮询登录状态的响应
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
 try:
-    import qrcode
-    from PIL import Image as PILImage
-    QRCODE_AVAILABLE = True
+    # pybase64 与标准库 base64 接口一致，装了就用它的 SIMD 解码
+    import pybase64 as _b64
 except ImportError:
-    QRCODE_AVAILABLE = False
-    logger.warning("未安装 qrcode 库，将使用 API 返回的二维码")
+    import base64 as _b64
+
 
 
 class LoginStatus(Enum):
@@ -47,6 +58,15 @@ class LoginResult:
 class TapTapLoginManagerAPI:
     """TapTap 扫码登录管理器 (API 版本)"""
 
+    # API 二维码 base64 分块解码落盘时每块的字符数（4 的倍数，块与块之间无需补齐）
+    QR_BASE64_CHUNK_SIZE = 64 * 1024
+    # 轮询节奏：等待扫码期间按倍数逐步拉长间隔（不超过上限），扫码后改为短间隔尽快拿到确认结果
+    PENDING_BACKOFF_FACTOR = 1.5
+    PENDING_MAX_INTERVAL = 10
+    SCANNED_POLL_INTERVAL = 1
+    # 等待扫码时回调剩余时间的间隔（秒）
+    PENDING_NOTIFY_INTERVAL = 10
+
     def __init__(self, base_url: str, api_token: str, output_dir: Path, session: aiohttp.ClientSession):
         """
         初始化登录管理器
@@ -63,6 +83,11 @@ class TapTapLoginManagerAPI:
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.session = session
 
+        # 请求头只构建一次，生成二维码和每次轮询状态都复用同一个 dict（aiohttp 不会修改传入的 headers）
+        self._headers = {"Content-Type": "application/json"}
+        if api_token:
+            self._headers["X-OpenApi-Token"] = api_token
+
         # 文件路径（使用 Path 确保跨平台兼容）
         self.qr_code_path = self.output_dir / "taptap_qr.png"
         logger.info(f"🔍 二维码保存路径: {self.qr_code_path}")
@@ -72,15 +97,10 @@ class TapTapLoginManagerAPI:
         self._session_token: Optional[str] = None
         self._error_message: Optional[str] = None
         self._qr_id: Optional[str] = None
+        # 轮询状态的 URL，拿到 qrId 时构建一次
+        self._status_url: Optional[str] = None
         self._session_created = False
 
-    def _get_headers(self) -> Dict[str, str]:
-        """获取请求头"""
-        headers = {"Content-Type": "application/json"}
-        if self.api_token:
-            headers["X-OpenApi-Token"] = self.api_token
-        return headers
-
     async def generate_qr_code(self, taptap_version: str = "cn") -> Optional[str]:
         """
         生成二维码
@@ -90,6 +110,10 @@ class TapTapLoginManagerAPI:
 
         Returns:
             str: 二维码图片的 base64 编码
+
+        Note:
+            二维码 PNG 以 "写临时文件 → os.replace" 的方式落盘，
+            返回后 ``qr_code_path`` 要么不存在，要么是完整的文件。
         """
         self._current_status = LoginStatus.QR_GENERATING
 
@@ -126,7 +150,7 @@ class TapTapLoginManagerAPI:
 
             async with self.session.post(
                 url=url,
-                headers=self._get_headers(),
+                headers=self._headers,
                 params=params
             ) as response:
                 if response.status != 200:
@@ -137,6 +161,7 @@ class TapTapLoginManagerAPI:
 
                 # 保存 qrId 用于后续轮询
                 self._qr_id = data.get("qrId")
+                self._status_url = f"{self.base_url}/auth/qrcode/{self._qr_id}/status"
                 qrcode_base64 = data.get("qrcodeBase64")
                 verification_url = data.get("verificationUrl")
 
@@ -146,47 +171,46 @@ class TapTapLoginManagerAPI:
                 logger.info(f"二维码生成成功，qrId: {self._qr_id}")
                 logger.info(f"验证链接: {verification_url}")
 
-                # 强制导入 qrcode 库
-                try:
-                    import sys
-                    import os
-                    # 添加系统 Python 路径（仅 Linux）
-                    if os.name != 'nt':  # 非 Windows 系统
-                        sys.path.insert(0, '/usr/lib/python3/dist-packages')
-                        sys.path.insert(0, '/usr/lib/python3.12/dist-packages')
-                    import qrcode
-                    from PIL import Image as PILImage
-                    logger.info("✅ 成功导入 qrcode 和 PIL")
-                except ImportError as e:
-                    logger.error(f"❌ 导入 qrcode 失败: {e}")
-                    logger.error(f"Python 路径: {sys.path}")
-                    raise Exception(f"qrcode 库导入失败: {e}")
-
-                # 使用 verificationUrl 生成二维码图片（PNG格式）
+                # 二维码库只在真正生成二维码时才导入（segno 优先，直接从模块矩阵写出 PNG，不经过 PIL）
+                segno = qrcode = None
                 if verification_url:
-                    logger.info("使用 qrcode 库生成二维码图片")
                     try:
-                        qr = qrcode.QRCode(
-                            version=1,
-                            error_correction=qrcode.constants.ERROR_CORRECT_H,
-                            box_size=10,
-                            border=4,
-                        )
-                        qr.add_data(verification_url)
-                        qr.make(fit=True)
-                        
-                        # 生成 PNG 图片
-                        img = qr.make_image(fill_color="black", back_color="white")
-                        # 确保目录存在
-                        self.qr_code_path.parent.mkdir(parents=True, exist_ok=True)
-                        img.save(self.qr_code_path, 'PNG')
-                        logger.info(f"✅ 二维码已保存到: {self.qr_code_path}")
-                        logger.info(f"✅ 文件格式: PNG")
+                        import segno
+                    except ImportError:
+                        # 没有 segno 时强制导入 qrcode 库
+                        try:
+                            import sys
+                            import os
+                            # 添加系统 Python 路径（仅 Linux）
+                            if os.name != 'nt':  # 非 Windows 系统
+                                sys.path.insert(0, '/usr/lib/python3/dist-packages')
+                                sys.path.insert(0, '/usr/lib/python3.12/dist-packages')
+                            import qrcode
+                            logger.info("✅ 成功导入 qrcode")
+                        except ImportError as e:
+                            logger.warning(f"未安装 segno / qrcode 库，使用 API 返回的二维码: {e}")
+
+                # 确保目录存在
+                self.qr_code_path.parent.mkdir(parents=True, exist_ok=True)
+                # 均为写临时文件再原子替换，避免调用方读到写了一半的二维码图片
+                if segno is not None or qrcode is not None:
+                    # 使用 verificationUrl 生成二维码图片（PNG格式），编码和写盘放到线程里
+                    engine = "segno" if segno is not None else "qrcode"
+                    logger.info(f"使用 {engine} 生成二维码图片")
+                    try:
+                        if segno is not None:
+                            await asyncio.to_thread(self._render_qr_segno, segno, verification_url)
+                        else:
+                            await asyncio.to_thread(self._render_qr_png, qrcode, verification_url)
                     except Exception as e:
-                        logger.error(f"❌ 使用 qrcode 库生成失败: {e}")
+                        logger.error(f"❌ 使用 {engine} 生成失败: {e}")
                         raise Exception(f"二维码生成失败: {e}")
                 else:
-                    raise Exception("verification_url 为空")
+                    # 没有二维码库或验证链接时，直接把 API 返回的二维码图片解码落盘
+                    logger.info("使用 API 返回的二维码图片")
+                    await self._write_qr_base64(qrcode_base64)
+                logger.info(f"✅ 二维码已保存到: {self.qr_code_path}")
+                logger.info(f"✅ 文件格式: PNG")
 
                 self._current_status = LoginStatus.QR_READY
                 logger.info(f"✅ 二维码生成完成，准备返回")
@@ -203,6 +227,49 @@ class TapTapLoginManagerAPI:
             logger.error(self._error_message)
             return None
 
+    def _render_qr_segno(self, segno, verification_url: str):
+        """用 segno 生成二维码 PNG，写入临时文件后原子替换（同步，供 to_thread 调用）"""
+        qr = segno.make(verification_url, error='h', micro=False)
+        tmp_path = self.qr_code_path.with_name(self.qr_code_path.name + ".tmp")
+        # 临时文件没有 .png 扩展名，需显式指定格式
+        qr.save(str(tmp_path), kind='png', scale=10, border=4)
+        os.replace(tmp_path, self.qr_code_path)
+
+    def _render_qr_png(self, qrcode, verification_url: str):
+        """用 qrcode 库生成二维码 PNG，直接编码进临时文件后原子替换（同步，供 to_thread 调用）"""
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_H,
+            box_size=10,
+            border=4,
+        )
+        qr.add_data(verification_url)
+        qr.make(fit=True)
+
+        # 生成 PNG 图片
+        img = qr.make_image(fill_color="black", back_color="white")
+        tmp_path = self.qr_code_path.with_name(self.qr_code_path.name + ".tmp")
+        img.save(str(tmp_path), 'PNG')
+        os.replace(tmp_path, self.qr_code_path)
+
+    async def _write_qr_base64(self, qrcode_base64: str):
+        """把 API 返回的 base64 二维码按块解码写入临时文件后原子替换，不生成完整的解码副本"""
+        # 兼容 data URI 形式（data:image/png;base64,...）
+        if qrcode_base64.startswith("data:"):
+            qrcode_base64 = qrcode_base64.partition(",")[2]
+        # 转成 bytes 后再去空白、补齐，b64decode 直接吃 bytes，分块用 memoryview 切片不再复制
+        data = b"".join(qrcode_base64.encode("ascii").split())
+        # 只有最后一块可能缺少 '=' 补齐
+        data += b"=" * (-len(data) & 3)
+
+        chunk_size = self.QR_BASE64_CHUNK_SIZE
+        view = memoryview(data)
+        tmp_path = self.qr_code_path.with_name(self.qr_code_path.name + ".tmp")
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            for start in range(0, len(data), chunk_size):
+                await f.write(_b64.b64decode(view[start:start + chunk_size]))
+        os.replace(tmp_path, self.qr_code_path)
+
     async def check_login_status(self) -> Dict[str, Any]:
         """
         检查登录状态
@@ -239,17 +306,23 @@ class TapTapLoginManagerAPI:
                 self._session_created = True
                 logger.info("✅ 新的 aiohttp.ClientSession 创建成功")
 
-            url = f"{self.base_url}/auth/qrcode/{self._qr_id}/status"
-
             async with self.session.get(
-                url=url,
-                headers=self._get_headers()
+                url=self._status_url,
+                headers=self._headers
             ) as response:
                 if response.status != 200:
                     error_text = await response.text()
                     raise Exception(f"检查状态失败: HTTP {response.status} - {error_text}")
 
-                data = await response.json()
+                raw = await response.read()
+                # 等待扫码阶段占了绝大多数轮询：响应体很小，只匹配 status 键值，不做完整的 JSON 解析
+                # （pending 分支只用到 status 和 retryAfter）；带 retryAfter 时仍完整解析，以服从服务端给出的间隔
+                if b'retryAfter' not in raw:
+                    match = _PENDING_STATUS_RE.search(raw)
+                    if match:
+                        return {"status": match.group(1).decode()}
+
+                data = _json_loads(raw)
                 logger.debug(f"登录状态响应: {data}")
                 return data
 
@@ -280,6 +353,9 @@ class TapTapLoginManagerAPI:
 
         start_time = loop.time()
         last_status = None
+        # 连续处于 pending 的轮询次数（用于退避），以及下一次回调剩余时间的时刻
+        pending_count = 0
+        next_notify = start_time + self.PENDING_NOTIFY_INTERVAL
 
         while (loop.time() - start_time) < timeout:
             try:
@@ -287,6 +363,7 @@ class TapTapLoginManagerAPI:
                 result = await self.check_login_status()
                 status = result.get("status")
                 retry_after = result.get("retryAfter", 2)
+                delay = retry_after
                 logger.info(f"登录状态: {status}, 重试间隔: {retry_after}秒")
 
                 # 登录成功（API 返回的状态可能是 success 或 Confirmed）
@@ -311,6 +388,8 @@ class TapTapLoginManagerAPI:
 
                 # 二维码已扫描，等待确认（API 可能返回 Scanned 或 scanned）
                 elif status == "scanned" or status == "Scanned":
+                    pending_count = 0
+                    delay = self.SCANNED_POLL_INTERVAL
                     if last_status != LoginStatus.SCANNED:
                         last_status = LoginStatus.SCANNED
                         self._current_status = LoginStatus.SCANNED
@@ -321,8 +400,13 @@ class TapTapLoginManagerAPI:
 
                 # 等待扫码（API 可能返回 Pending 或 pending）
                 elif status == "pending" or status == "Pending":
-                    remaining = int(timeout - (loop.time() - start_time))
-                    if callback and remaining % 10 == 0:  # 每10秒更新一次
+                    delay = min(retry_after * self.PENDING_BACKOFF_FACTOR ** pending_count,
+                                self.PENDING_MAX_INTERVAL)
+                    pending_count += 1
+                    now = loop.time()
+                    if callback and now >= next_notify:  # 按墙钟每10秒更新一次
+                        next_notify = now + self.PENDING_NOTIFY_INTERVAL
+                        remaining = int(timeout - (now - start_time))
                         callback(LoginStatus.QR_READY, f"等待扫码... ({remaining}秒)")
 
                 # 二维码过期
@@ -348,11 +432,13 @@ class TapTapLoginManagerAPI:
 
                 # 未知状态
                 else:
+                    pending_count = 0
                     logger.warning(f"未知的登录状态: {status}, 完整数据: {result}")
 
-                # 等待后重试
-                logger.debug(f"当前状态: {status}, 等待 {retry_after} 秒后重试...")
-                await asyncio.sleep(retry_after)
+                # 等待后重试（不超过剩余的超时时间）
+                delay = min(delay, max(0, timeout - (loop.time() - start_time)))
+                logger.debug(f"当前状态: {status}, 等待 {delay:.1f} 秒后重试...")
+                await asyncio.sleep(delay)
 
             except Exception as e:
                 logger.error(f"检查登录状态出错: {e}")
@@ -0,0 +1,100 @@
+"""
+测试用户数据管理模块
+"""
+
+import unittest
+import tempfile
+import shutil
+import json
+from pathlib import Path
+import sys
+
+# 模拟astrbot模块
+class MockLogger:
+    def info(self, msg):
+        pass
+    def warning(self, msg):
+        pass
+    def error(self, msg):
+        pass
+    def debug(self, msg):
+        pass
+
+class MockAPI:
+    logger = MockLogger()
+
+class MockAstrBot:
+    api = MockAPI()
+
+# 添加到sys.modules
+sys.modules['astrbot'] = MockAstrBot()
+sys.modules['astrbot.api'] = MockAPI()
+sys.modules['astrbot.api.logger'] = MockLogger()
+
+# 现在导入被测试模块
+from core.user_data_manager import UserDataManager
+
+
+class TestUserDataManager(unittest.TestCase):
+    """测试用户数据的加载与保存"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.data_file = self.temp_dir / "user_data.json"
+
+    def tearDown(self):
+        """清理测试环境"""
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, raw):
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump(raw, f)
+
+    def _read(self):
+        with open(self.data_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_load_save_round_trip(self):
+        """测试加载后再保存，文件内容保持不变（包括未知字段）"""
+        raw = {
+            "qq:10001": {
+                "session_token": "enc:dG9rZW4x",
+                "taptap_version": "cn",
+                "bind_time": "2024-01-01 00:00:00",
+                "nickname": "player"
+            },
+            "wechat:abc:def": {
+                "session_token": "enc:dG9rZW4y",
+                "taptap_version": "global",
+                "bind_time": ""
+            }
+        }
+        self._write(raw)
+
+        manager = UserDataManager(self.temp_dir)
+        self.assertTrue(manager.is_user_bound("wechat", "abc:def"))
+        self.assertEqual(manager.get_user_data("qq", "10001")["session_token"], "token1")
+
+        manager._save_data()
+        self.assertEqual(self._read(), raw)
+
+    def test_invalid_entry_skipped(self):
+        """测试损坏的条目被跳过，其余绑定正常加载并保留"""
+        self._write({
+            "qq:10001": {"session_token": "enc:dG9rZW4x"},
+            "qq:10002": {"taptap_version": "cn"},
+            "qq:10003": "broken"
+        })
+
+        manager = UserDataManager(self.temp_dir)
+        self.assertTrue(manager.is_user_bound("qq", "10001"))
+        self.assertFalse(manager.is_user_bound("qq", "10002"))
+        self.assertFalse(manager.is_user_bound("qq", "10003"))
+
+        manager._save_data()
+        self.assertEqual(list(self._read()), ["qq:10001"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,12 +4,111 @@
 存放各种公共工具函数和类
 """
 
-import re
-import base64
+import asyncio
+import time
+from functools import lru_cache
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, Dict, Any, List
-from astrbot.api import logger
+from typing import Optional, Dict, Any, List, Tuple
+import aiofiles
+
+try:
+    from astrbot.api import logger
+except ImportError:
+    # 渲染器脱离 AstrBot 单独运行时（如本地测试脚本）使用标准日志
+    import logging
+    logger = logging.getLogger(__name__)
+
+try:
+    from .config import PNG_COMPRESS_LEVEL
+except ImportError:
+    from config import PNG_COMPRESS_LEVEL
+
+try:
+    # pybase64 与标准库 base64 接口一致，装了就用它的 SIMD 编解码（大图片 base64 回退发送时更快）
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
+
+# 文件名中不允许出现的字符统一替换为 '_'（str.translate 单遍完成，无需正则）
+_SANITIZE_TABLE = str.maketrans(dict.fromkeys('\\/:*?"<>|', '_'))
+
+
+def save_image(img, output_path, quality: int):
+    """按输出文件扩展名编码并保存渲染结果（各渲染器共用，与 _output_filename 的扩展名对应）
+
+    - .webp: 有损 WebP，使用 quality
+    - .jpg/.jpeg: 基线 JPEG（丢弃透明通道），使用 quality，不做霍夫曼表优化
+    - 其他: 快速 PNG（compress_level=PNG_COMPRESS_LEVEL）
+
+    Args:
+        img: PIL 图片
+        output_path: 输出路径（父目录不存在时自动创建）
+        quality: 有损编码的质量（1-100）
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    suffix = output_path.suffix.lower()
+    if suffix == '.webp':
+        img.save(output_path, 'WEBP', quality=quality, method=4)
+    elif suffix in ('.jpg', '.jpeg'):
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.save(output_path, 'JPEG', quality=quality, optimize=False, progressive=False)
+    else:
+        img.save(output_path, 'PNG', compress_level=PNG_COMPRESS_LEVEL, optimize=False)
+
+
+def draw_text_with_glow(img, x: int, y: int, text: str, text_color, font,
+                        glow_color: Tuple[int, int, int] = (255, 255, 255),
+                        glow_radius: int = 4, anchor: Optional[str] = None):
+    """绘制带发光效果的文字（各渲染器共用）
+
+    Args:
+        img: 目标图片（RGBA）
+        x, y: 文字位置
+        text: 文字内容
+        text_color: 文字颜色（十六进制或颜色名）
+        font: 字体
+        glow_color: 发光颜色 (R, G, B)
+        glow_radius: 发光半径
+        anchor: 文字锚点（如 'mm' 表示中心对齐）
+    """
+    from PIL import Image, ImageDraw, ImageFilter
+
+    draw = ImageDraw.Draw(img)
+
+    # 计算文本边界框，只在文本周围创建发光效果
+    bbox = draw.textbbox((0, 0), text, font=font)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+
+    # 确定发光层的大小和位置
+    padding = glow_radius * 2
+    layer_width = text_width + padding * 2
+    layer_height = text_height + padding * 2
+
+    # 计算发光层的粘贴位置
+    if anchor == 'mm':
+        layer_x = x - layer_width // 2
+        layer_y = y - layer_height // 2
+    else:
+        layer_x = x - padding
+        layer_y = y - padding
+
+    # 绘制发光效果：描边文字只栅格化一次，再整体模糊一次
+    # （近似原先逐个偏移量 ×8 方向重复绘制并逐层模糊的叠加效果，光晕形状和衰减略有不同）
+    glow_alpha = sum(40 - offset * 8 for offset in range(1, glow_radius + 1) if offset < 5)
+    if glow_alpha > 0:
+        glow_layer = Image.new('RGBA', (layer_width, layer_height), (0, 0, 0, 0))
+        ImageDraw.Draw(glow_layer).text((padding, padding), text, fill=(*glow_color, glow_alpha), font=font,
+                                        stroke_width=glow_radius, stroke_fill=(*glow_color, glow_alpha))
+        glow_layer = glow_layer.filter(ImageFilter.GaussianBlur(radius=max(1, glow_radius // 2)))
+        img.paste(glow_layer, (int(layer_x), int(layer_y)), glow_layer)
+
+    if anchor:
+        draw.text((x, y), text, fill=text_color, font=font, anchor=anchor)
+    else:
+        draw.text((x, y), text, fill=text_color, font=font)
 
 
 class SimpleCache:
@@ -20,25 +119,22 @@ class SimpleCache:
         Args:
             ttl: 缓存过期时间（秒），默认 5 分钟
         """
-        self._cache: Dict[str, Dict[str, Any]] = {}
+        # 值为 (过期时间, 缓存值)，过期时间在写入时算好（time.monotonic()，不受系统时间调整影响）
+        self._cache: Dict[str, Tuple[float, Any]] = {}
         self._ttl = ttl
 
     def get(self, key: str) -> Optional[Any]:
         """获取缓存值"""
-        if key in self._cache:
-            item = self._cache[key]
-            if datetime.now().timestamp() - item['timestamp'] < self._ttl:
-                return item['value']
-            else:
-                del self._cache[key]
+        item = self._cache.get(key)
+        if item is not None:
+            if item[0] > time.monotonic():
+                return item[1]
+            del self._cache[key]
         return None
 
     def set(self, key: str, value: Any):
         """设置缓存值"""
-        self._cache[key] = {
-            'value': value,
-            'timestamp': datetime.now().timestamp()
-        }
+        self._cache[key] = (time.monotonic() + self._ttl, value)
 
     def clear(self):
         """清空缓存"""
@@ -46,17 +142,18 @@ class SimpleCache:
 
     def clean_expired(self):
         """清理过期缓存"""
-        now = datetime.now().timestamp()
+        now = time.monotonic()
         expired_keys = [
-            key for key, item in self._cache.items()
-            if now - item['timestamp'] >= self._ttl
+            key for key, (expiry, _) in self._cache.items()
+            if expiry <= now
         ]
         for key in expired_keys:
             del self._cache[key]
 
 
+@lru_cache(maxsize=1024)
 def resolve_illustration_path(base_dir: Path, illustration_path: str) -> Path:
-    """解析曲绘路径，处理相对路径和绝对路径
+    """解析曲绘路径，处理相对路径和绝对路径（纯路径运算，结果按参数缓存）
 
     Args:
         base_dir: 基础目录（插件目录）
@@ -65,12 +162,11 @@ def resolve_illustration_path(base_dir: Path, illustration_path: str) -> Path:
     Returns:
         解析后的 Path 对象
     """
-    clean_path = illustration_path.lstrip("./").lstrip(".\\")
-
     if illustration_path.startswith("/") or (len(illustration_path) > 1 and illustration_path[1] == ":"):
         return Path(illustration_path)
 
-    return base_dir / clean_path
+    # lstrip 按字符集剥离，一次去掉开头所有的 . / \
+    return base_dir / illustration_path.lstrip("./\\")
 
 
 def sanitize_filename(name: str, max_length: int = 50) -> str:
@@ -83,9 +179,7 @@ def sanitize_filename(name: str, max_length: int = 50) -> str:
     Returns:
         清理后的文件名
     """
-    sanitized = re.sub(r'[\\/:*?"<>|]', '_', name)
-    if len(sanitized) > max_length:
-        sanitized = sanitized[:max_length]
+    sanitized = name.translate(_SANITIZE_TABLE)[:max_length]
     if not sanitized:
         sanitized = "unnamed"
     return sanitized
@@ -93,7 +187,7 @@ def sanitize_filename(name: str, max_length: int = 50) -> str:
 
 def encrypt_token(token: str) -> str:
     """对 token 进行简单混淆（非加密，仅增加读取难度）"""
-    encoded = base64.b64encode(token.encode()).decode()
+    encoded = _b64.b64encode(token.encode()).decode('ascii')
     return f"enc:{encoded}"
 
 
@@ -101,7 +195,7 @@ def decrypt_token(encrypted: str) -> str:
     """解密 token"""
     if encrypted.startswith("enc:"):
         encoded = encrypted[4:]
-        return base64.b64decode(encoded.encode()).decode()
+        return _b64.b64decode(encoded.encode()).decode()
     return encrypted
 
 
@@ -118,7 +212,8 @@ async def send_image_with_fallback(event, image_path: Path, plain_text: str = No
     """
     from astrbot.api.message_components import Image, Plain
 
-    if not image_path.exists():
+    # 文件检查和读取都不阻塞事件循环
+    if not await asyncio.to_thread(image_path.exists):
         logger.error(f"图片文件不存在: {image_path}")
         if plain_text:
             yield event.plain_result(f"❌ {plain_text}\n图片文件未找到")
@@ -132,8 +227,9 @@ async def send_image_with_fallback(event, image_path: Path, plain_text: str = No
 
         try:
             # 方法2: 使用 base64
-            with open(image_path, 'rb') as f:
-                img_base64 = base64.b64encode(f.read()).decode()
+            async with aiofiles.open(image_path, 'rb') as f:
+                data = await f.read()
+            img_base64 = _b64.b64encode(data).decode('ascii')
             yield event.chain_result([Image.fromBase64(img_base64)])
         except Exception as e2:
             logger.error(f"方法2发送图片也失败: {e2}")
@@ -148,16 +244,16 @@ def format_score(score: int) -> str:
 
 def format_acc(acc: float) -> str:
     """格式化准确率显示"""
-    return f"{acc:.2f}%"
+    return "%.2f%%" % acc
 
 
 def format_rks(rks: float) -> str:
     """格式化 RKS 显示"""
-    return f"{rks:.4f}"
+    return "%.4f" % rks
 
 
 def truncate_text(text: str, max_length: int, suffix: str = "...") -> str:
     """截断文本"""
-    if len(text) > max_length:
-        return text[:max_length - len(suffix)] + suffix
-    return text
+    if len(text) <= max_length:
+        return text
+    return text[:max_length - len(suffix)] + suffix